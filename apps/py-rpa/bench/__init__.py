@@ -0,0 +1,11 @@
+"""ロボットの操作のベンチマーク
+
+計測結果を JSON で保存し、基準の結果と比較する。
+
+    python -m bench browser --output bench/baselines/browser.json
+    python -m bench image --templates "$IMAGE_PATH" --output bench/baselines/image.json
+    python -m bench routes --output bench/baselines/routes.json
+    python -m bench compare bench/baselines/browser.json bench/results/browser-<日時>.json
+    python -m bench compare --metric recall --higher-is-better \
+      bench/baselines/image.json bench/results/image-<日時>.json
+"""
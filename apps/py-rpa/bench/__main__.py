@@ -0,0 +1,158 @@
+"""`python -m bench` のコマンド
+
+    python -m bench browser [--robot playwright] [--iterations 20] [--output PATH]
+    python -m bench image [--templates IMAGE_PATH] [--trials 3] [--output PATH]
+    python -m bench routes [--profile forms-only] [--iterations 10] [--output PATH]
+    python -m bench compare BASELINE CURRENT [--metric p50_ms] [--threshold 0.2]
+
+compare は退行があれば終了コード 1 で終了する。
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import sys
+from pathlib import Path
+
+from bench.results import (
+  DEFAULT_METRIC,
+  DEFAULT_THRESHOLD,
+  compare_results,
+  format_comparisons,
+  load_results,
+  save_results,
+)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def _default_output(suite: str) -> Path:
+  timestamp = datetime.datetime.now(datetime.UTC).strftime("%Y%m%d%H%M%S")
+  return RESULTS_DIR / f"{suite}-{timestamp}.json"
+
+
+def _run_browser(args: argparse.Namespace) -> int:
+  from bench.browser import ROBOTS, run_browser_bench  # noqa: PLC0415
+
+  robots = tuple(args.robot or ROBOTS)
+  results = run_browser_bench(robots, iterations=args.iterations, warmup=args.warmup)
+  path = save_results(
+    args.output or _default_output("browser"),
+    "browser",
+    results,
+    iterations=args.iterations,
+    warmup=args.warmup,
+  )
+  print(f"saved: {path}")
+  return 0
+
+
+def _run_image(args: argparse.Namespace) -> int:
+  from bench.image import run_image_bench  # noqa: PLC0415
+
+  results = run_image_bench(args.templates, trials=args.trials, seed=args.seed)
+  for mode, cases in results.items():
+    overall = cases["all"]
+    print(
+      f"{mode}: p50={overall['p50_ms']:.2f}ms p95={overall['p95_ms']:.2f}ms "
+      f"captures/lookup={overall['captures_per_lookup']:.2f} "
+      f"hints={overall['hint_hits']}/{overall['hint_misses']}/{overall['hint_cold']} "
+      f"precision={overall['precision']:.3f} recall={overall['recall']:.3f}",
+    )
+  path = save_results(
+    args.output or _default_output("image"),
+    "image",
+    results,
+    templates=None if args.templates is None else str(args.templates),
+    trials=args.trials,
+    seed=args.seed,
+  )
+  print(f"saved: {path}")
+  return 0
+
+
+def _run_routes(args: argparse.Namespace) -> int:
+  from bench.routes import run_route_bench  # noqa: PLC0415
+  from rpa.route_profiles import PROFILES  # noqa: PLC0415
+
+  profiles = tuple(args.profile or PROFILES)
+  results = run_route_bench(profiles, iterations=args.iterations, warmup=args.warmup)
+  path = save_results(
+    args.output or _default_output("routes"),
+    "routes",
+    results,
+    iterations=args.iterations,
+    warmup=args.warmup,
+  )
+  print(f"saved: {path}")
+  return 0
+
+
+def _compare(args: argparse.Namespace) -> int:
+  baseline = load_results(args.baseline)
+  current = load_results(args.current)
+  if baseline["suite"] != current["suite"]:
+    print(f"種類の異なる結果は比較できません: {baseline['suite']} / {current['suite']}")
+    return 2
+  comparisons = compare_results(
+    baseline,
+    current,
+    metric=args.metric,
+    threshold=args.threshold,
+    higher_is_better=args.higher_is_better,
+  )
+  print(format_comparisons(comparisons, args.metric))
+  regressed = [comparison for comparison in comparisons if comparison.regressed]
+  print(f"regressed: {len(regressed)} / {len(comparisons)}")
+  return 1 if len(regressed) > 0 else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+  """コマンドライン引数のパーサーを作る。"""
+  parser = argparse.ArgumentParser(prog="python -m bench")
+  subparsers = parser.add_subparsers(required=True)
+
+  browser = subparsers.add_parser("browser", help="ブラウザ操作ロボットの計測")
+  browser.add_argument("--robot", action="append", choices=("playwright", "selenium"))
+  browser.add_argument("--iterations", type=int, default=20)
+  browser.add_argument("--warmup", type=int, default=2)
+  browser.add_argument("--output", type=Path)
+  browser.set_defaults(handler=_run_browser)
+
+  image = subparsers.add_parser("image", help="画像マッチングの速度と精度の計測")
+  image.add_argument("--templates", type=Path, help="テンプレート画像 (PNG) のディレクトリ")
+  image.add_argument("--trials", type=int, default=3)
+  image.add_argument("--seed", type=int, default=0)
+  image.add_argument("--output", type=Path)
+  image.set_defaults(handler=_run_image)
+
+  routes = subparsers.add_parser("routes", help="ルーティングプロファイルごとの読み込みの計測")
+  routes.add_argument(
+    "--profile",
+    action="append",
+    choices=("pass-through", "no-media", "forms-only"),
+  )
+  routes.add_argument("--iterations", type=int, default=10)
+  routes.add_argument("--warmup", type=int, default=1)
+  routes.add_argument("--output", type=Path)
+  routes.set_defaults(handler=_run_routes)
+
+  compare = subparsers.add_parser("compare", help="保存した結果の比較")
+  compare.add_argument("baseline", type=Path)
+  compare.add_argument("current", type=Path)
+  compare.add_argument("--metric", default=DEFAULT_METRIC)
+  compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+  compare.add_argument("--higher-is-better", action="store_true")
+  compare.set_defaults(handler=_compare)
+  return parser
+
+
+def main() -> None:
+  """コマンドを実行する。"""
+  args = build_parser().parse_args()
+  sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,175 @@
+"""ブラウザ操作ロボットの操作ごとの所要時間を計測するベンチマーク
+
+ローカルの HTTP サーバーで配信した dummy-gui と同じ構成の HTML に対して、
+待機時間を 0 にした PlaywrightBrowserRobot (ヘッドレス) と SeleniumBrowserRobot を操作する。
+計測項目ごとに新しいロボットを作り、準備の操作は計測に含めない。
+"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, NamedTuple
+from urllib.parse import urlencode
+
+from selenium import webdriver
+
+from bench.fixture_server import FixtureServer
+from bench.results import Results, Stats
+from rpa.browser_robot_playwright import PlaywrightBrowserRobot
+from rpa.browser_robot_selenium import BrowserType, SeleniumBrowserRobot
+
+if TYPE_CHECKING:
+  from collections.abc import Callable
+
+ROBOTS = ("playwright", "selenium")
+DEFAULT_ITERATIONS = 20
+DEFAULT_WARMUP = 2
+
+FORM_PATH = "account/form.html"
+CONFIRM_PATH = "account/confirm.html?" + urlencode(
+  {"name": "山田 太郎", "age": "30", "gender": "male"},
+)
+LIST_PATH = "account/list.html"
+
+type BrowserRobot = PlaywrightBrowserRobot | SeleniumBrowserRobot
+# (ロボット, サーバー, 繰り返しの番号) を受け取る
+type Step = Callable[[BrowserRobot, FixtureServer, int], None]
+
+
+class BenchCase(NamedTuple):
+  """計測項目"""
+
+  name: str
+  # 計測する操作
+  action: Step
+  # 最初に 1 回だけ行う準備
+  prepare: Step | None = None
+  # 毎回の計測の前に行う準備
+  setup: Step | None = None
+
+
+def create_robot(name: str) -> BrowserRobot:
+  """待機時間を 0 にしたヘッドレスのロボットを作る。"""
+  if name == "playwright":
+    return PlaywrightBrowserRobot(headless=True, delay_time_sec=0)
+  if name == "selenium":
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    return SeleniumBrowserRobot(
+      browser_type=BrowserType.Chrome,
+      delay_time_sec=0,
+      driver_kwargs={"options": options},
+    )
+  message = f"未対応のロボットです: {name}"
+  raise ValueError(message)
+
+
+def _open(path: str) -> Step:
+  return lambda robot, server, _: robot.open_browser(server.url(path))
+
+
+def _click_submit(robot: BrowserRobot, _server: FixtureServer, _index: int) -> None:
+  # どちらのロボットも遷移先の読み込みまでを計測に含める
+  robot.click("submit-input", expect_navigation=True)
+
+
+def _prepare_tabs(robot: BrowserRobot, server: FixtureServer, _index: int) -> None:
+  robot.open_browser(server.url(FORM_PATH))
+  robot.open_new_tab(server.url(LIST_PATH))
+
+
+CASES = (
+  BenchCase("open_browser", _open(FORM_PATH)),
+  BenchCase(
+    "input",
+    lambda robot, _server, index: robot.input("name", f"山田 太郎 {index}"),
+    prepare=_open(FORM_PATH),
+  ),
+  BenchCase(
+    "input_select",
+    lambda robot, _server, index: robot.input("gender", ("男性", "女性")[index % 2]),
+    prepare=_open(FORM_PATH),
+  ),
+  BenchCase("click", _click_submit, setup=_open(FORM_PATH)),
+  BenchCase(
+    "get_value",
+    lambda robot, _server, _index: robot.get_value("name"),
+    prepare=_open(CONFIRM_PATH),
+  ),
+  BenchCase(
+    "switch_tab",
+    lambda robot, _server, index: robot.switch_tab(index % 2),
+    prepare=_prepare_tabs,
+  ),
+  BenchCase(
+    "scroll_y",
+    lambda robot, _server, index: robot.scroll_y(200 if index % 2 == 0 else -200),
+    prepare=_open(LIST_PATH),
+  ),
+  BenchCase(
+    "scroll_x",
+    lambda robot, _server, index: robot.scroll_x(200 if index % 2 == 0 else -200),
+    prepare=_open(LIST_PATH),
+  ),
+)
+
+
+def run_case(
+  robot_name: str,
+  case: BenchCase,
+  server: FixtureServer,
+  *,
+  iterations: int = DEFAULT_ITERATIONS,
+  warmup: int = DEFAULT_WARMUP,
+) -> Stats:
+  """新しいロボットで計測項目を `warmup` 回実行してから `iterations` 回計測する。"""
+  samples: list[float] = []
+  with create_robot(robot_name) as robot:
+    if case.prepare is not None:
+      case.prepare(robot, server, 0)
+    for index in range(warmup + iterations):
+      if case.setup is not None:
+        case.setup(robot, server, index)
+      started = time.perf_counter()
+      case.action(robot, server, index)
+      elapsed = time.perf_counter() - started
+      if index >= warmup:
+        samples.append(elapsed)
+  return Stats.from_samples(samples)
+
+
+def run_browser_bench(
+  robots: tuple[str, ...] = ROBOTS,
+  *,
+  iterations: int = DEFAULT_ITERATIONS,
+  warmup: int = DEFAULT_WARMUP,
+) -> Results:
+  """すべての計測項目をロボットごとに計測する。失敗した項目はエラーを記録して続ける。"""
+  results: Results = {}
+  with FixtureServer() as server:
+    for robot_name in robots:
+      cases = results.setdefault(robot_name, {})
+      for case in CASES:
+        try:
+          stats = run_case(robot_name, case, server, iterations=iterations, warmup=warmup)
+        except Exception as error:  # noqa: BLE001
+          print(f"{robot_name}.{case.name}: {error}")
+          cases[case.name] = {"error": str(error)}
+          continue
+        print(
+          f"{robot_name}.{case.name}: p50={stats.p50_ms:.2f}ms p95={stats.p95_ms:.2f}ms",
+        )
+        cases[case.name] = stats._asdict()
+  return results
+
+
+__all__ = [
+  "CASES",
+  "DEFAULT_ITERATIONS",
+  "DEFAULT_WARMUP",
+  "ROBOTS",
+  "BenchCase",
+  "create_robot",
+  "run_browser_bench",
+  "run_case",
+]
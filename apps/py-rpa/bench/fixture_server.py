@@ -0,0 +1,130 @@
+"""ベンチマーク用の HTML を配信するローカルの HTTP サーバー"""
+
+from __future__ import annotations
+
+import functools
+import mimetypes
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Self
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+# dummy-gui のアカウント登録・確認・一覧画面と同じ ID を持つ静的な HTML
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+# このパスの下では、拡張子に応じた Content-Type で指定サイズの応答を返す
+SIZED_PREFIX = "/sized/"
+MAX_SIZED_BYTES = 10_000_000
+_SCRIPT_TYPES = frozenset({"text/css", "text/javascript", "application/javascript"})
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+  def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+    """アクセスログを出力しない。"""
+
+  def end_headers(self) -> None:
+    """毎回の読み込みで同じ量を転送するよう、ブラウザにキャッシュさせない。"""
+    self.send_header("Cache-Control", "no-store")
+    super().end_headers()
+
+  def do_GET(self) -> None:
+    """`/sized/<名前>?bytes=<サイズ>&delay_ms=<遅延>` は生成した応答を返す。"""
+    if not self._send_sized(with_body=True):
+      super().do_GET()
+
+  def do_HEAD(self) -> None:
+    """`/sized/` の下は GET と同じヘッダーを遅延なしで返す。"""
+    if not self._send_sized(with_body=False):
+      super().do_HEAD()
+
+  def _send_sized(self, *, with_body: bool) -> bool:
+    url = urlsplit(self.path)
+    if not url.path.startswith(SIZED_PREFIX):
+      return False
+    query = parse_qs(url.query)
+    size = min(int(query.get("bytes", ["0"])[0]), MAX_SIZED_BYTES)
+    delay_ms = int(query.get("delay_ms", ["0"])[0])
+    if with_body and delay_ms > 0:
+      time.sleep(delay_ms / 1000)
+    content_type = mimetypes.guess_type(url.path)[0] or "application/octet-stream"
+    body = _sized_body(content_type, size)
+    self.send_response(200)
+    self.send_header("Content-Type", content_type)
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    if with_body:
+      self.wfile.write(body)
+    return True
+
+
+def _sized_body(content_type: str, size: int) -> bytes:
+  """CSS と JavaScript はコメントで埋め、読み込んでもエラーにならない内容にする。"""
+  comment = b"/**/"
+  if content_type not in _SCRIPT_TYPES or size < len(comment):
+    return bytes(size)
+  return comment[:2] + b" " * (size - len(comment)) + comment[2:]
+
+
+class FixtureServer:
+  """`directory` を別スレッドの HTTP サーバーで配信する。`port` が 0 の場合は空きポートを使う。"""
+
+  def __init__(
+    self,
+    directory: str | Path = FIXTURES_DIR,
+    *,
+    host: str = "127.0.0.1",
+    port: int = 0,
+  ) -> None:
+    self.directory = Path(directory)
+    self.host = host
+    self.port = port
+    self._server: ThreadingHTTPServer | None = None
+    self._thread: threading.Thread | None = None
+
+  @property
+  def base_url(self) -> str:
+    """配信先の URL を返す。"""
+    if self._server is None:
+      message = "サーバーが起動していません。"
+      raise RuntimeError(message)
+    return f"http://{self.host}:{self._server.server_address[1]}/"
+
+  def url(self, path: str) -> str:
+    """`path` の URL を返す。"""
+    return urljoin(self.base_url, path.lstrip("/"))
+
+  def start(self) -> str:
+    """サーバーを起動し、配信先の URL を返す。"""
+    handler = functools.partial(_QuietHandler, directory=str(self.directory))
+    self._server = ThreadingHTTPServer((self.host, self.port), handler)
+    self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+    self._thread.start()
+    return self.base_url
+
+  def stop(self) -> None:
+    """サーバーを停止する。"""
+    if self._server is not None:
+      self._server.shutdown()
+      self._server.server_close()
+    if self._thread is not None:
+      self._thread.join()
+    self._server = None
+    self._thread = None
+
+  def __enter__(self) -> Self:
+    """コンテキストマネージャー開始時にサーバーを起動する。"""
+    self.start()
+    return self
+
+  def __exit__(self, exc_type, exc, tb) -> None:  # noqa: ANN001
+    """コンテキストマネージャー終了時にサーバーを停止する。"""
+    self.stop()
+
+
+__all__ = [
+  "FIXTURES_DIR",
+  "MAX_SIZED_BYTES",
+  "SIZED_PREFIX",
+  "FixtureServer",
+]
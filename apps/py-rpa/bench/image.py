@@ -0,0 +1,331 @@
+"""画像マッチングの速度と精度を計測するベンチマーク
+
+テンプレートを倍率・位置・ノイズを変えて合成した画面に対して、desktop_robot の画像探索
+(位置ヒント、表示倍率から見込んだスケール、全スケールへのフォールバック) をそのまま実行する。
+desktop_robot.capture_backend を ArrayCapture に差し替えて画面を渡すため、実際の画面は
+キャプチャしない (desktop_robot の import に pyautogui などは必要)。
+
+テンプレートのディレクトリを指定しない場合は、ボタンやアイコンに似た画像を生成し、
+位置ヒントが使えるよう一時ディレクトリに PNG で書き出して使う。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+
+import cv2
+import numpy as np
+
+from bench.results import Results, Stats
+from rpa import desktop_robot
+from rpa.image_matcher import DEFAULT_CONFIDENCE, MatchResult, ScaledTemplate
+from rpa.screen_capture import ScreenRect
+from rpa.template_store import TEMPLATE_PATTERN
+
+if TYPE_CHECKING:
+  from collections.abc import Iterator
+
+  from rpa.location_hints import HintStats
+
+DEFAULT_SCREEN_SIZE = (1280, 800)
+DEFAULT_SCALES_UNDER_TEST = (0.5, 0.75, 1.0, 1.25, 1.5)
+DEFAULT_NOISE_LEVELS = (0.0, 8.0, 24.0)
+DEFAULT_TRIALS = 3
+DEFAULT_SEED = 0
+# 一致位置の中心が正解からこの割合 (テンプレートの短辺に対する) 以内なら正解とみなす
+CENTER_TOLERANCE = 0.25
+
+
+class ArrayCapture:
+  """あらかじめ用意した画面の配列を返すキャプチャ。キャプチャの回数を数える。"""
+
+  def __init__(self, screen: np.ndarray) -> None:
+    self.screen = screen
+    self.grab_calls = 0
+
+  def grab(self, region: ScreenRect | None = None, *, gray: bool = False) -> np.ndarray:
+    """画面または指定領域を返す。"""
+    self.grab_calls += 1
+    frame = self.screen
+    if region is not None:
+      frame = frame[
+        region.top : region.top + region.height,
+        region.left : region.left + region.width,
+      ]
+    if gray:
+      return frame
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGRA)
+
+  def logical_rect(self) -> ScreenRect:
+    """画面全体の矩形を返す。"""
+    height, width = self.screen.shape[:2]
+    return ScreenRect(0, 0, width, height)
+
+  def close(self) -> None:
+    """解放するリソースはない。"""
+
+
+class Trial(NamedTuple):
+  """合成した 1 枚の画面と正解"""
+
+  template: str
+  scale: float
+  noise: float
+  screen: np.ndarray
+  # 画面に置いたテンプレートの矩形 (x, y, 幅, 高さ)。置いていない画面は None
+  expected: tuple[int, int, int, int] | None
+
+
+class _Tally:
+  def __init__(self) -> None:
+    self.samples: list[float] = []
+    self.captures = 0
+    self.hint_hits = 0
+    self.hint_misses = 0
+    self.hint_cold = 0
+    self.true_positives = 0
+    self.false_positives = 0
+    self.false_negatives = 0
+
+  def to_dict(self) -> dict[str, float]:
+    found = self.true_positives + self.false_positives
+    present = self.true_positives + self.false_negatives
+    return {
+      **Stats.from_samples(self.samples)._asdict(),
+      "captures_per_lookup": self.captures / max(1, len(self.samples)),
+      "hint_hits": self.hint_hits,
+      "hint_misses": self.hint_misses,
+      "hint_cold": self.hint_cold,
+      "precision": self.true_positives / found if found > 0 else 1.0,
+      "recall": self.true_positives / present if present > 0 else 1.0,
+      "true_positives": self.true_positives,
+      "false_positives": self.false_positives,
+      "false_negatives": self.false_negatives,
+    }
+
+
+def load_templates(
+  directory: str | Path | None,
+  rng: np.random.Generator,
+  work_dir: Path,
+) -> dict[str, Path]:
+  """ディレクトリの PNG のパスを返す。省略した場合は生成して `work_dir` に書き出す。"""
+  if directory is None:
+    paths = {}
+    for name, gray in generate_templates(rng).items():
+      path = work_dir / f"{name}.png"
+      cv2.imwrite(str(path), gray)
+      paths[name] = path
+    return paths
+  paths = sorted(Path(directory).expanduser().glob(TEMPLATE_PATTERN))
+  if len(paths) == 0:
+    message = f"テンプレート画像が見つかりません: {directory}"
+    raise FileNotFoundError(message)
+  return {path.stem: path for path in paths}
+
+
+def generate_templates(rng: np.random.Generator) -> dict[str, np.ndarray]:
+  """ボタンやアイコンに似たテンプレートを生成する。"""
+  templates = {}
+  for index, label in enumerate(("OK", "Cancel", "Submit", "Next")):
+    width = 40 + 18 * len(label)
+    button = np.full((36, width), int(rng.integers(180, 240)), dtype=np.uint8)
+    cv2.rectangle(button, (0, 0), (width - 1, 35), 60, 2)
+    cv2.putText(button, label, (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.7, 20, 2, cv2.LINE_AA)
+    templates[f"button-{index}-{label.lower()}"] = button
+  for index in range(2):
+    icon = np.full((48, 48), 230, dtype=np.uint8)
+    cv2.circle(icon, (24, 24), 18, int(rng.integers(30, 120)), -1)
+    cv2.line(icon, (12, 12 + index * 24), (36, 36 - index * 24), 250, 3)
+    templates[f"icon-{index}"] = icon
+  return templates
+
+
+def compose_background(size: tuple[int, int], rng: np.random.Generator) -> np.ndarray:
+  """ウィンドウや文字が並んだ画面に似た背景を作る。"""
+  width, height = size
+  screen = np.full((height, width), 245, dtype=np.uint8)
+  for _ in range(40):
+    x, y = int(rng.integers(0, width - 20)), int(rng.integers(0, height - 20))
+    w, h = int(rng.integers(20, 300)), int(rng.integers(10, 160))
+    cv2.rectangle(screen, (x, y), (x + w, y + h), int(rng.integers(120, 250)), -1)
+  for _ in range(60):
+    x, y = int(rng.integers(0, width - 100)), int(rng.integers(15, height))
+    text = "".join(chr(int(code)) for code in rng.integers(97, 123, size=int(rng.integers(4, 12))))
+    cv2.putText(screen, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, 40, 1, cv2.LINE_AA)
+  return screen
+
+
+def generate_trials(  # noqa: PLR0913
+  templates: dict[str, np.ndarray],
+  *,
+  scales: tuple[float, ...] = DEFAULT_SCALES_UNDER_TEST,
+  noise_levels: tuple[float, ...] = DEFAULT_NOISE_LEVELS,
+  trials: int = DEFAULT_TRIALS,
+  screen_size: tuple[int, int] = DEFAULT_SCREEN_SIZE,
+  rng: np.random.Generator,
+) -> Iterator[Trial]:
+  """テンプレート・倍率・ノイズの組み合わせごとに、ランダムな位置に置いた画面を作る。
+
+  誤検出を数えるため、ノイズごとにテンプレートを置かない画面も作る。
+  """
+  width, height = screen_size
+  for name, template in templates.items():
+    for noise in noise_levels:
+      for _ in range(trials):
+        background = compose_background(screen_size, rng)
+        yield Trial(name, 0.0, noise, _add_noise(background, noise, rng), None)
+      for scale in scales:
+        scaled = cv2.resize(
+          template,
+          None,
+          fx=scale,
+          fy=scale,
+          interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR,
+        )
+        h, w = scaled.shape[:2]
+        for _ in range(trials):
+          screen = compose_background(screen_size, rng)
+          x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+          screen[y : y + h, x : x + w] = scaled
+          yield Trial(name, scale, noise, _add_noise(screen, noise, rng), (x, y, w, h))
+
+
+def run_image_bench(  # noqa: PLR0913
+  template_dir: str | Path | None = None,
+  *,
+  scales: tuple[float, ...] = DEFAULT_SCALES_UNDER_TEST,
+  noise_levels: tuple[float, ...] = DEFAULT_NOISE_LEVELS,
+  trials: int = DEFAULT_TRIALS,
+  confidence: float = DEFAULT_CONFIDENCE,
+  seed: int = DEFAULT_SEED,
+) -> Results:
+  """合成した画面で画像を探し、探索方法・倍率・ノイズごとに集計する。
+
+  "locate" は move_to_with_image、"resized" は move_to_with_resize_image と同じ探索で、
+  後者は画面に置いたサイズへリサイズしたテンプレートを 1.0 倍だけで探す。
+  位置ヒントは前の試行で見つかった位置が残るため、テンプレートごとに試行をまたいで使われる。
+  """
+  rng = np.random.default_rng(seed)
+  capture = ArrayCapture(np.zeros((1, 1), dtype=np.uint8))
+  tallies: dict[str, dict[str, _Tally]] = {"locate": {}, "resized": {}}
+
+  with tempfile.TemporaryDirectory() as work_dir, _desktop_capture(capture):
+    paths = load_templates(template_dir, rng, Path(work_dir))
+    templates = {name: desktop_robot.template_store.get(path).gray for name, path in paths.items()}
+    for trial in generate_trials(
+      templates,
+      scales=scales,
+      noise_levels=noise_levels,
+      trials=trials,
+      rng=rng,
+    ):
+      capture.screen = trial.screen
+      placed = "absent" if trial.expected is None else f"scale={trial.scale:g}"
+      case = f"{placed} noise={trial.noise:g}"
+      for mode in ("locate", "resized"):
+        calls = capture.grab_calls
+        hints_before = desktop_robot.get_location_hint_stats()
+        started = time.perf_counter()
+        if mode == "locate":
+          match = desktop_robot._locate_image(  # noqa: SLF001
+            str(paths[trial.template]),
+            scales=None,
+            confidence=confidence,
+          )
+        else:
+          match = desktop_robot._locate_image(  # noqa: SLF001
+            _resized_template(templates[trial.template], trial),
+            scales=(1.0,),
+            confidence=confidence,
+          )
+        elapsed = time.perf_counter() - started
+        hints_after = desktop_robot.get_location_hint_stats()
+        for key in (case, "all"):
+          tally = tallies[mode].setdefault(key, _Tally())
+          tally.samples.append(elapsed)
+          tally.captures += capture.grab_calls - calls
+          _count_hints(tally, hints_before, hints_after)
+          _score_match(tally, trial, match)
+  return {
+    mode: {case: tally.to_dict() for case, tally in cases.items()}
+    for mode, cases in tallies.items()
+  }
+
+
+@contextlib.contextmanager
+def _desktop_capture(capture: ArrayCapture) -> Iterator[None]:
+  """desktop_robot のキャプチャを差し替え、位置ヒントと表示倍率を空の状態から始める。"""
+  previous = desktop_robot.capture_backend
+  desktop_robot.capture_backend = capture
+  desktop_robot.location_hints.clear()
+  desktop_robot.location_hints.reset_stats()
+  try:
+    yield
+  finally:
+    desktop_robot.capture_backend = previous
+    desktop_robot.location_hints.clear()
+    desktop_robot.location_hints.reset_stats()
+
+
+def _count_hints(tally: _Tally, before: HintStats, after: HintStats) -> None:
+  tally.hint_hits += after.hits - before.hits
+  tally.hint_misses += after.misses - before.misses
+  tally.hint_cold += after.cold - before.cold
+
+
+def _resized_template(template: np.ndarray, trial: Trial) -> ScaledTemplate:
+  """画面に置いたサイズ (置いていない場合は元のサイズ) にリサイズしたテンプレートを返す。"""
+  if trial.expected is None:
+    return ScaledTemplate(template)
+  _, _, width, height = trial.expected
+  return ScaledTemplate(cv2.resize(template, (width, height), interpolation=cv2.INTER_NEAREST))
+
+
+def _score_match(tally: _Tally, trial: Trial, match: MatchResult | None) -> None:
+  if trial.expected is None:
+    if match is not None:
+      tally.false_positives += 1
+    return
+  if match is None:
+    tally.false_negatives += 1
+    return
+  x, y, width, height = trial.expected
+  center_x, center_y = match.center
+  tolerance = max(2.0, min(width, height) * CENTER_TOLERANCE)
+  if (
+    abs(center_x - (x + width / 2)) <= tolerance and abs(center_y - (y + height / 2)) <= tolerance
+  ):
+    tally.true_positives += 1
+  else:
+    # 別の位置で見つけた場合は誤検出と見逃しの両方に数える
+    tally.false_positives += 1
+    tally.false_negatives += 1
+
+
+def _add_noise(screen: np.ndarray, sigma: float, rng: np.random.Generator) -> np.ndarray:
+  if sigma <= 0:
+    return screen
+  noisy = screen.astype(np.float32) + rng.normal(0.0, sigma, screen.shape).astype(np.float32)
+  return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+__all__ = [
+  "CENTER_TOLERANCE",
+  "DEFAULT_NOISE_LEVELS",
+  "DEFAULT_SCALES_UNDER_TEST",
+  "DEFAULT_SCREEN_SIZE",
+  "DEFAULT_SEED",
+  "DEFAULT_TRIALS",
+  "ArrayCapture",
+  "Trial",
+  "compose_background",
+  "generate_templates",
+  "generate_trials",
+  "load_templates",
+  "run_image_bench",
+]
@@ -0,0 +1,133 @@
+"""ベンチマーク結果の集計・保存・比較"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import platform
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from rpa.tracing import percentile
+
+# 前回の結果からこの割合を超えて悪化したら退行とみなす
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_METRIC = "p50_ms"
+
+
+class Stats(NamedTuple):
+  """1 つの計測項目の所要時間 (ミリ秒)"""
+
+  count: int
+  mean_ms: float
+  p50_ms: float
+  p95_ms: float
+  min_ms: float
+  max_ms: float
+
+  @classmethod
+  def from_samples(cls, samples_sec: list[float]) -> Stats:
+    """計測値 (秒) から集計する。"""
+    values = sorted(sample * 1000 for sample in samples_sec)
+    if len(values) == 0:
+      return cls(0, 0.0, 0.0, 0.0, 0.0, 0.0)
+    return cls(
+      count=len(values),
+      mean_ms=sum(values) / len(values),
+      p50_ms=percentile(values, 50),
+      p95_ms=percentile(values, 95),
+      min_ms=values[0],
+      max_ms=values[-1],
+    )
+
+
+class Comparison(NamedTuple):
+  """計測項目ごとの比較結果"""
+
+  group: str
+  case: str
+  baseline: float
+  current: float
+  # current / baseline
+  ratio: float
+  regressed: bool
+
+
+# group → 計測項目 → 指標名 → 値
+type Results = dict[str, dict[str, dict[str, Any]]]
+
+
+def save_results(path: str | Path, suite: str, results: Results, **settings: Any) -> Path:  # noqa: ANN401
+  """結果を実行環境の情報とともに JSON で保存する。"""
+  path = Path(path)
+  path.parent.mkdir(parents=True, exist_ok=True)
+  data = {
+    "suite": suite,
+    "created_at": datetime.datetime.now(datetime.UTC).isoformat(timespec="seconds"),
+    "environment": {
+      "python": platform.python_version(),
+      "platform": platform.platform(),
+      "machine": platform.machine(),
+    },
+    "settings": settings,
+    "results": results,
+  }
+  path.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+  return path
+
+
+def load_results(path: str | Path) -> dict[str, Any]:
+  """save_results で保存した JSON を読み込む。"""
+  return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def compare_results(
+  baseline: dict[str, Any],
+  current: dict[str, Any],
+  *,
+  metric: str = DEFAULT_METRIC,
+  threshold: float = DEFAULT_THRESHOLD,
+  higher_is_better: bool = False,
+) -> list[Comparison]:
+  """両方に含まれる計測項目の `metric` を比べる。
+
+  `higher_is_better` が False の場合は値が `threshold` の割合を超えて増えたとき、
+  True の場合は減ったときに退行とみなす。
+  """
+  comparisons = []
+  for group, cases in current["results"].items():
+    baseline_cases = baseline["results"].get(group, {})
+    for case, values in cases.items():
+      base_value = baseline_cases.get(case, {}).get(metric)
+      value = values.get(metric)
+      if base_value is None or value is None:
+        continue
+      ratio = value / base_value if base_value else float("inf") if value else 1.0
+      regressed = ratio < 1 - threshold if higher_is_better else ratio > 1 + threshold
+      comparisons.append(Comparison(group, case, base_value, value, ratio, regressed))
+  return comparisons
+
+
+def format_comparisons(comparisons: list[Comparison], metric: str = DEFAULT_METRIC) -> str:
+  """比較結果を表形式の文字列で返す。"""
+  lines = [f"{'group':<12} {'case':<24} {'baseline':>10} {'current':>10} {'ratio':>7}  ({metric})"]
+  lines.extend(
+    f"{comparison.group:<12} {comparison.case:<24} {comparison.baseline:>10.3f} "
+    f"{comparison.current:>10.3f} {comparison.ratio:>6.2f}x"
+    f"{'  REGRESSED' if comparison.regressed else ''}"
+    for comparison in comparisons
+  )
+  return "\n".join(lines)
+
+
+__all__ = [
+  "DEFAULT_METRIC",
+  "DEFAULT_THRESHOLD",
+  "Comparison",
+  "Results",
+  "Stats",
+  "compare_results",
+  "format_comparisons",
+  "load_results",
+  "save_results",
+]
@@ -0,0 +1,103 @@
+"""ルーティングプロファイルごとのページの読み込み時間と受信量を計測するベンチマーク
+
+画像・フォント・スタイルシートを含むページを、プロファイルごとに新しい
+PlaywrightBrowserRobot (ヘッドレス) で繰り返し開く。何も中断しない pass-through を基準とし、
+各プロファイルで短縮できた読み込み時間 (p50) と、1 回の読み込みあたりに削減できた受信量を求める。
+受信量は通過させた応答の Content-Length の合計である。あわせて、中断・差し替えた件数と、
+それらの URL に HEAD を送って見積もった削減量 (saved_bytes) を記録する。
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+from bench.fixture_server import FixtureServer
+from bench.results import Results, Stats
+from rpa.browser_robot_playwright import PlaywrightBrowserRobot
+from rpa.route_profiles import PASS_THROUGH, PROFILES, RouteInterceptor
+
+DEFAULT_ITERATIONS = 10
+DEFAULT_WARMUP = 1
+# 画像・フォント・スタイルシート・スクリプトを読み込むフォーム画面
+MEDIA_FORM_PATH = "account/form-media.html"
+
+
+def measure_profile(
+  profile: str,
+  server: FixtureServer,
+  *,
+  iterations: int = DEFAULT_ITERATIONS,
+  warmup: int = DEFAULT_WARMUP,
+) -> dict[str, Any]:
+  """`profile` でページを `warmup` 回開いてから `iterations` 回計測する。
+
+  ブラウザの起動と、中断した URL への最初の HEAD は最初の読み込みに含まれるため、
+  `warmup` は 1 以上にすること。
+  """
+  samples: list[float] = []
+  received_bytes = 0
+  unsized_responses = 0
+  blocked = 0
+  saved_bytes = 0
+  interceptor = RouteInterceptor(profile, measure_saved_bytes=True)
+  with PlaywrightBrowserRobot(
+    headless=True,
+    delay_time_sec=0,
+    route_profile=interceptor,
+  ) as robot:
+    for index in range(warmup + iterations):
+      before = interceptor.stats()
+      started = time.perf_counter()
+      robot.open_browser(server.url(MEDIA_FORM_PATH))
+      elapsed = time.perf_counter() - started
+      after = interceptor.stats()
+      if index < warmup:
+        continue
+      samples.append(elapsed)
+      received_bytes += after.received_bytes - before.received_bytes
+      unsized_responses += after.unsized_responses - before.unsized_responses
+      blocked += after.blocked - before.blocked
+      saved_bytes += after.saved_bytes - before.saved_bytes
+  interceptor.close()
+  count = max(1, len(samples))
+  return {
+    **Stats.from_samples(samples)._asdict(),
+    "received_bytes": received_bytes / count,
+    "unsized_responses": unsized_responses,
+    "blocked": blocked / count,
+    "saved_bytes": saved_bytes / count,
+  }
+
+
+def run_route_bench(
+  profiles: tuple[str, ...] = tuple(PROFILES),
+  *,
+  iterations: int = DEFAULT_ITERATIONS,
+  warmup: int = DEFAULT_WARMUP,
+) -> Results:
+  """プロファイルごとに計測し、pass-through との差を加える。"""
+  names = (PASS_THROUGH.name, *(name for name in profiles if name != PASS_THROUGH.name))
+  cases: dict[str, dict[str, Any]] = {}
+  with FixtureServer() as server:
+    for name in names:
+      cases[name] = measure_profile(name, server, iterations=iterations, warmup=warmup)
+  baseline = cases[PASS_THROUGH.name]
+  for name, values in cases.items():
+    values["bytes_saved"] = baseline["received_bytes"] - values["received_bytes"]
+    values["time_saved_p50_ms"] = baseline["p50_ms"] - values["p50_ms"]
+    print(
+      f"{name}: p50={values['p50_ms']:.2f}ms received={values['received_bytes']:.0f}B "
+      f"saved={values['bytes_saved']:.0f}B / {values['time_saved_p50_ms']:.2f}ms "
+      f"blocked={values['blocked']:.0f} (HEAD estimate {values['saved_bytes']:.0f}B)",
+    )
+  return {"routes": cases}
+
+
+__all__ = [
+  "DEFAULT_ITERATIONS",
+  "DEFAULT_WARMUP",
+  "MEDIA_FORM_PATH",
+  "measure_profile",
+  "run_route_bench",
+]
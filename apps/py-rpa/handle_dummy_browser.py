@@ -1,13 +1,14 @@
 """サンプル"""
 
 import os
-import time
 from urllib.parse import urljoin
 
 from dotenv import load_dotenv
 
+from rpa import wait
 from rpa.browser_robot_selenium import SeleniumBrowserRobot
 from tools import tester
+from tools.cost import report_costs
 
 load_dotenv()
 imagepath = os.environ["IMAGE_PATH"]
@@ -35,43 +36,49 @@ def handle_dummygui() -> None:
     url_form = urljoin(url_base, "account/form")
     url_confirm = urljoin(url_base, "account/confirm")
     robot.click("menu-register-account")
-    time.sleep(1)
+    wait.sleep(1)
     robot.scroll_y(100)
     robot.scroll_y(-100)
     print(f"url_form: {tester.check(robot.get_current_url(), url_form)}")
-    robot.input("name", name)
-    robot.input("age", age)
-    robot.input("gender", gender)
-    robot.input("address", address)
-    robot.input("email", email)
-    robot.input("phone", phone)
-    robot.input_date("birthday", birthday)
-    time.sleep(1)
+    robot.fill_form(
+      {
+        "name": name,
+        "age": age,
+        "gender": gender,
+        "address": address,
+        "email": email,
+        "phone": phone,
+        "birthday": birthday,
+      },
+    )
+    wait.sleep(1)
     robot.click("submit-input")
-    time.sleep(1)
+    wait.sleep(1)
     print(
       f"url_confirm: {tester.check_start_with(robot.get_current_url(), url_confirm)}",
     )
-    print(f"name: {tester.check(robot.get_value('name'), name)}")
-    print(f"age: {tester.check(robot.get_value('age'), age)}")
-    print(f"gender: {tester.check(robot.get_value('gender'), gender)}")
-    print(f"address: {tester.check(robot.get_value('address'), address)}")
-    print(f"email: {tester.check(robot.get_value('email'), email)}")
-    print(f"phone: {tester.check(robot.get_value('phone'), phone)}")
-    print(
-      f"birthday: {tester.check(robot.get_value('birthday'), birthday)}",
+    values = robot.get_values(
+      ["name", "age", "gender", "address", "email", "phone", "birthday"],
     )
+    print(f"name: {tester.check(values['name'], name)}")
+    print(f"age: {tester.check(values['age'], age)}")
+    print(f"gender: {tester.check(values['gender'], gender)}")
+    print(f"address: {tester.check(values['address'], address)}")
+    print(f"email: {tester.check(values['email'], email)}")
+    print(f"phone: {tester.check(values['phone'], phone)}")
+    print(f"birthday: {tester.check(values['birthday'], birthday)}")
     robot.scroll_y(200)
     robot.scroll_x(200)
-    time.sleep(1)
+    wait.sleep(1)
 
 
 def main() -> None:
   """Main"""
-  time.sleep(1)
-  print("===start===")
-  handle_dummygui()
-  print("===end===")
+  with report_costs():
+    wait.sleep(1)
+    print("===start===")
+    handle_dummygui()
+    print("===end===")
 
 
 if __name__ == "__main__":
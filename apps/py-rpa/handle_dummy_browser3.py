@@ -0,0 +1,58 @@
+"""サンプル (asyncio で複数のコンテキストを並行して操作する)"""
+
+import asyncio
+from urllib.parse import urljoin
+
+from rpa.browser_robot_playwright import WaitPolicy
+from rpa.browser_robot_playwright_async import AsyncPlaywrightBrowserRobot
+from tools import tester
+
+URL_BASE = "http://localhost:3000"
+
+
+async def register_account(robot: AsyncPlaywrightBrowserRobot, no: int) -> None:
+  """アカウントを 1 件登録し、確認画面の値を検証する。"""
+  values = {
+    "name": f"あいう エオ{no}",
+    "age": str(20 + no),
+    "gender": "女性",
+    "address": "宇宙船地球号",
+    "email": f"aiu{no}@examle.com",
+    "phone": "090-1111-2222",
+    "birthday": "1888-09-30",
+  }
+  await robot.open_browser(URL_BASE, 1000, 1000)
+  await robot.click("menu-register-account")
+  url_form = urljoin(URL_BASE, "account/form")
+  print(f"[{no}] url_form: {tester.check(await robot.get_current_url(), url_form)}")
+  await robot.fill_form(values)
+  await robot.click("submit-input")
+  url_confirm = urljoin(URL_BASE, "account/confirm")
+  print(
+    f"[{no}] url_confirm: {tester.check_start_with(await robot.get_current_url(), url_confirm)}",
+  )
+  actual = await robot.get_values(values)
+  for key, expected in values.items():
+    print(f"[{no}] {key}: {tester.check(actual[key], expected)}")
+
+
+async def handle_dummygui(count: int = 3) -> None:
+  """Dummy GUIを複数のコンテキストで並行して操作する。"""
+  async with AsyncPlaywrightBrowserRobot(headless=True, wait_policy=WaitPolicy.Auto) as robot:
+    robots = [robot, *[await robot.spawn() for _ in range(count - 1)]]
+    try:
+      await asyncio.gather(*(register_account(r, no) for no, r in enumerate(robots)))
+    finally:
+      for sibling in robots[1:]:
+        await sibling.close()
+
+
+def main() -> None:
+  """Main"""
+  print("===start===")
+  asyncio.run(handle_dummygui())
+  print("===end===")
+
+
+if __name__ == "__main__":
+  main()
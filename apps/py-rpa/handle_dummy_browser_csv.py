@@ -0,0 +1,72 @@
+"""サンプル (CSV のアカウントを複数のコンテキストで並行して登録する)"""
+
+import asyncio
+import os
+from pathlib import Path
+from urllib.parse import urljoin
+
+from dotenv import load_dotenv
+
+from rpa.browser_robot_playwright import WaitPolicy
+from rpa.browser_robot_playwright_async import AsyncPlaywrightBrowserRobot
+from rpa.context_pool import ContextPoolRunner
+from rpa.csv_source import iter_csv_rows
+from tools.accounts import DEFAULT_DATA_PATH, to_form_values
+
+load_dotenv()
+
+URL_BASE = "http://localhost:3000"
+SESSION_NAME = "dummy-gui-account-form"
+
+
+async def register_account(robot: AsyncPlaywrightBrowserRobot, values: dict[str, str]) -> None:
+  """アカウントを 1 件登録し、確認画面の値が一致しなければ例外を送出する。"""
+  # 前回保存した入力画面のセッションがあれば、メニュー操作を省いて直接開く
+  if not await robot.restore_session(SESSION_NAME):
+    await robot.open_browser(URL_BASE)
+    await robot.click("menu-register-account")
+    await robot.save_session(SESSION_NAME)
+  missing = await robot.fill_form(values)
+  if len(missing) > 0:
+    message = f"入力できなかった要素があります: {missing}"
+    raise RuntimeError(message)
+  await robot.click("submit-input")
+  url_confirm = urljoin(URL_BASE, "account/confirm")
+  if not (await robot.get_current_url()).startswith(url_confirm):
+    message = f"確認画面に遷移しませんでした: {await robot.get_current_url()}"
+    raise RuntimeError(message)
+  actual = await robot.get_values(values)
+  mismatched = [key for key, expected in values.items() if actual[key] != expected]
+  if len(mismatched) > 0:
+    message = f"確認画面の値が一致しません: {mismatched}"
+    raise RuntimeError(message)
+
+
+async def handle_dummygui(data_path: Path, workers: int) -> None:
+  """CSV のアカウントを登録する。"""
+  rows = (to_form_values(row) for row in iter_csv_rows(data_path))
+  async with AsyncPlaywrightBrowserRobot(
+    headless=True,
+    wait_policy=WaitPolicy.Auto,
+    route_profile="forms-only",
+  ) as robot:
+    runner = ContextPoolRunner(robot, workers=workers)
+    report = await runner.run(rows, register_account)
+    route_stats = robot.get_route_stats()
+  print(report.summary())
+  print(f"route: {route_stats}")
+  for result in report.failed:
+    print(f"#{result.index} {result.item['name']}: {result.error}")
+
+
+def main() -> None:
+  """Main"""
+  data_path = Path(os.environ.get("DATA_PATH", DEFAULT_DATA_PATH))
+  workers = int(os.environ.get("WORKERS", "8"))
+  print("===start===")
+  asyncio.run(handle_dummygui(data_path, workers))
+  print("===end===")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,58 @@
+"""サンプル (CSV のアカウントを複数のプロセスの Selenium で並行して登録する)"""
+
+import os
+from pathlib import Path
+from urllib.parse import urljoin
+
+from dotenv import load_dotenv
+
+from rpa.browser_robot_selenium import BrowserType, SeleniumBrowserRobot, WaitPolicy
+from rpa.csv_source import iter_csv_rows
+from rpa.selenium_pool import SeleniumProcessPool
+from tools.accounts import DEFAULT_DATA_PATH, to_form_values
+
+load_dotenv()
+
+URL_BASE = "http://localhost:3000"
+
+
+def create_robot() -> SeleniumBrowserRobot:
+  """ワーカープロセスで使うロボットを作る。"""
+  return SeleniumBrowserRobot(browser_type=BrowserType.Chrome, wait_policy=WaitPolicy.Auto)
+
+
+def register_account(robot: SeleniumBrowserRobot, values: dict[str, str]) -> None:
+  """アカウントを 1 件登録し、確認画面の値が一致しなければ例外を送出する。"""
+  robot.open_browser(URL_BASE)
+  robot.click("menu-register-account", expect_navigation=True)
+  missing = robot.fill_form(values)
+  if len(missing) > 0:
+    message = f"入力できなかった要素があります: {missing}"
+    raise RuntimeError(message)
+  robot.click("submit-input", expect_navigation=True)
+  url_confirm = urljoin(URL_BASE, "account/confirm")
+  if not robot.get_current_url().startswith(url_confirm):
+    message = f"確認画面に遷移しませんでした: {robot.get_current_url()}"
+    raise RuntimeError(message)
+  actual = robot.get_values(values)
+  mismatched = [key for key, expected in values.items() if actual[key] != expected]
+  if len(mismatched) > 0:
+    message = f"確認画面の値が一致しません: {mismatched}"
+    raise RuntimeError(message)
+
+
+def main() -> None:
+  """Main"""
+  data_path = Path(os.environ.get("DATA_PATH", DEFAULT_DATA_PATH))
+  processes = int(os.environ.get("WORKERS", "4"))
+  print("===start===")
+  rows = (to_form_values(row) for row in iter_csv_rows(data_path))
+  report = SeleniumProcessPool(create_robot, processes=processes).run(rows, register_account)
+  print(report.summary())
+  for result in report.failed:
+    print(f"#{result.index} {result.item['name']}: {result.error}")
+  print("===end===")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,87 @@
+"""サンプル (CSV のアカウントを 1 件ずつ登録し、中断しても続きから再開する)"""
+
+import os
+from pathlib import Path
+from urllib.parse import urljoin
+
+from dotenv import load_dotenv
+
+from rpa.browser_robot_playwright import PlaywrightBrowserRobot
+from rpa.browser_robot_playwright import WaitPolicy as PlaywrightWaitPolicy
+from rpa.browser_robot_selenium import BrowserType, SeleniumBrowserRobot
+from rpa.browser_robot_selenium import WaitPolicy as SeleniumWaitPolicy
+from rpa.csv_source import iter_csv_rows
+from rpa.pipeline import run_pipeline
+from rpa.tracing import tracer
+from tools.accounts import DEFAULT_DATA_PATH, to_form_values
+
+load_dotenv()
+
+URL_BASE = "http://localhost:3000"
+OUTPUT_PATH = Path("output/register_account.jsonl")
+
+type BrowserRobot = PlaywrightBrowserRobot | SeleniumBrowserRobot
+
+
+def click(robot: BrowserRobot, attr_id: str) -> None:
+  """画面遷移を伴うクリックをする。"""
+  if isinstance(robot, SeleniumBrowserRobot):
+    robot.click(attr_id, expect_navigation=True)
+  else:
+    robot.click(attr_id)
+
+
+def register_account(robot: BrowserRobot, values: dict[str, str]) -> str:
+  """アカウントを 1 件登録し、確認画面の URL を返す。値が一致しなければ例外を送出する。"""
+  robot.open_browser(URL_BASE)
+  click(robot, "menu-register-account")
+  missing = robot.fill_form(values)
+  if len(missing) > 0:
+    message = f"入力できなかった要素があります: {missing}"
+    raise RuntimeError(message)
+  click(robot, "submit-input")
+  url_confirm = urljoin(URL_BASE, "account/confirm")
+  current_url = robot.get_current_url()
+  if not current_url.startswith(url_confirm):
+    message = f"確認画面に遷移しませんでした: {current_url}"
+    raise RuntimeError(message)
+  actual = robot.get_values(values)
+  mismatched = [key for key, expected in values.items() if actual[key] != expected]
+  if len(mismatched) > 0:
+    message = f"確認画面の値が一致しません: {mismatched}"
+    raise RuntimeError(message)
+  return current_url
+
+
+def create_robot(name: str) -> BrowserRobot:
+  """環境変数 ROBOT で指定したロボットを作る。"""
+  if name == "selenium":
+    return SeleniumBrowserRobot(
+      browser_type=BrowserType.Chrome,
+      wait_policy=SeleniumWaitPolicy.Auto,
+    )
+  return PlaywrightBrowserRobot(headless=True, wait_policy=PlaywrightWaitPolicy.Auto)
+
+
+def main() -> None:
+  """Main"""
+  data_path = Path(os.environ.get("DATA_PATH", DEFAULT_DATA_PATH))
+  # TRACE_PATH を指定すると操作ごとの所要時間を Chrome のトレース形式で保存する
+  trace_path = os.environ.get("TRACE_PATH")
+  if trace_path is not None:
+    tracer.enable()
+  print("===start===")
+  # ジェネレータのまま渡すため、件数が多くても CSV 全体を読み込まない
+  rows = (to_form_values(row) for row in iter_csv_rows(data_path))
+  with create_robot(os.environ.get("ROBOT", "playwright")) as robot:
+    report = run_pipeline(robot, rows, register_account, output_path=OUTPUT_PATH)
+  print(report.summary())
+  print(f"output: {OUTPUT_PATH}")
+  if trace_path is not None:
+    tracer.export_chrome_trace(trace_path)
+    print(tracer.format_summary())
+  print("===end===")
+
+
+if __name__ == "__main__":
+  main()
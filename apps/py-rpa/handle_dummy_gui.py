@@ -1,11 +1,11 @@
 """サンプル"""
 
 import os
-import time
 
 from dotenv import load_dotenv
 
-from rpa import desktop_robot
+from rpa import desktop_robot, wait
+from tools.cost import report_costs
 
 load_dotenv()
 imagepath = os.environ["IMAGE_PATH"]
@@ -21,43 +21,69 @@ def handle_dummygui() -> None:
   # account register
   desktop_robot.move_to_with_image(f"{imagepath}/reg-account-btn.png")
   desktop_robot.click(desktop_robot.ButtonType.Left)
-  time.sleep(0.5)
-  desktop_robot.move_to_with_image(f"{imagepath}/input-name.png")
+  desktop_robot.wait_until_stable(timeout=2)
+  # 入力欄は 1 回のキャプチャでまとめて探す
+  points = desktop_robot.locate_all(
+    {
+      name: f"{imagepath}/{name}.png"
+      for name in (
+        "input-name",
+        "input-age",
+        "input-gender",
+        "input-address",
+        "input-mail",
+        "input-phone",
+        "input-yyyy-MM-dd",
+        "comfirm-input-btn",
+      )
+    },
+  )
+  _move_to(points, "input-name")
   desktop_robot.click(desktop_robot.ButtonType.Left)
   desktop_robot.set_input("あいう えお")
-  desktop_robot.move_to_with_image(f"{imagepath}/input-age.png")
+  _move_to(points, "input-age")
   desktop_robot.click(desktop_robot.ButtonType.Left)
   desktop_robot.set_input("112")
-  desktop_robot.move_to_with_image(f"{imagepath}/input-gender.png")
+  _move_to(points, "input-gender")
   desktop_robot.click(desktop_robot.ButtonType.Left)
   desktop_robot.move_to_with_image(f"{imagepath}/select-male.png")
   desktop_robot.click(desktop_robot.ButtonType.Left)
-  desktop_robot.move_to_with_image(f"{imagepath}/input-address.png")
+  _move_to(points, "input-address")
   desktop_robot.click(desktop_robot.ButtonType.Left)
   desktop_robot.set_input("宇宙船地球号")
-  desktop_robot.move_to_with_image(f"{imagepath}/input-mail.png")
+  _move_to(points, "input-mail")
   desktop_robot.click(desktop_robot.ButtonType.Left)
   desktop_robot.set_input("aiu@example.com")
-  desktop_robot.move_to_with_image(f"{imagepath}/input-phone.png")
+  _move_to(points, "input-phone")
   desktop_robot.click(desktop_robot.ButtonType.Left)
   desktop_robot.set_input("090-1111-2222")
-  desktop_robot.move_to_with_image(f"{imagepath}/input-yyyy-MM-dd.png")
+  _move_to(points, "input-yyyy-MM-dd")
   desktop_robot.click(desktop_robot.ButtonType.Left)
   desktop_robot.typewrite("1800")
   desktop_robot.execute_command("right")
   desktop_robot.typewrite("02")
   desktop_robot.execute_command("right")
   desktop_robot.typewrite("12")
-  desktop_robot.move_to_with_image(f"{imagepath}/comfirm-input-btn.png")
+  _move_to(points, "comfirm-input-btn")
   desktop_robot.click(desktop_robot.ButtonType.Left)
 
 
+def _move_to(points: dict[str, tuple[int, int] | None], name: str) -> None:
+  """まとめて探した座標へ移動する。見つからなかった場合は画像で探し直す。"""
+  point = points[name]
+  if point is None:
+    desktop_robot.move_to_with_image(f"{imagepath}/{name}.png")
+    return
+  desktop_robot.move_to(*point)
+
+
 def main() -> None:
   """Main"""
-  time.sleep(1)
-  print("===start===")
-  handle_dummygui()
-  print("===end===")
+  with report_costs():
+    wait.sleep(1)
+    print("===start===")
+    handle_dummygui()
+    print("===end===")
 
 
 if __name__ == "__main__":
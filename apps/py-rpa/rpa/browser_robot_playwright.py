@@ -5,8 +5,7 @@ from __future__ import annotations
 import atexit
 import contextlib
 import time
-from enum import Enum
-from typing import Self, TypedDict
+from typing import TYPE_CHECKING, Any, Self, TypedDict, Unpack
 
 from playwright.sync_api import (  # type: ignore[import-untyped]
   Browser,
@@ -19,41 +18,70 @@ from playwright.sync_api import (  # type: ignore[import-untyped]
 from playwright.sync_api import (
   Error as PlaywrightError,
 )
+from playwright.sync_api import (
+  TimeoutError as PlaywrightTimeoutError,
+)
 
-DEFAULT_DELAY_TIME_SEC = 0.5
-
-
-class BrowserType(Enum):
-  """ブラウザタイプ"""
+from rpa.element_cache import ElementInfo
+from rpa.form_scripts import (
+  DOM_QUIET_SCRIPT,
+  ELEMENT_INFO_SCRIPT,
+  FILL_FORM_SCRIPT,
+  GET_VALUES_SCRIPT,
+)
+from rpa.playwright_common import (
+  DEFAULT_DELAY_TIME_SEC,
+  DEFAULT_DOM_QUIET_MS,
+  DEFAULT_WAIT_TIMEOUT_SEC,
+  MAX_WAIT_REPORTS,
+  SCROLL_BY_SCRIPT,
+  SCROLL_POSITION_SCRIPT,
+  BrowserType,
+  PlaywrightRobotBase,
+  RobotOptions,
+  WaitPolicy,
+  WaitReport,
+  WaitSignal,
+  check_closable,
+  check_tab_index,
+  get_values_argument,
+  report_missing,
+  viewport_size,
+)
+from rpa.session_store import SESSION_STORAGE_SCRIPT, build_restore_script
+from rpa.tracing import SpanCategory, annotate, traced, tracer
 
-  Edge = "msedge"
-  Chrome = "chrome"
-  Safari = "webkit"
-  FireFox = "firefox"
+if TYPE_CHECKING:
+  from collections.abc import Callable, Iterable, Mapping
 
 
 class _LaunchOptions(TypedDict, total=False):
   headless: bool
 
 
-class PlaywrightBrowserRobot:
-  """Playwright を利用したブラウザ自動化クラス。"""
+class PlaywrightBrowserRobot(
+  PlaywrightRobotBase[Playwright, Browser, BrowserContext, Page, Locator],
+):
+  """Playwright を利用したブラウザ自動化クラス。
 
-  def __init__(
-    self,
-    *,
-    browser_type: BrowserType = BrowserType.Chrome,
-    headless: bool = False,
-    delay_time_sec: float = DEFAULT_DELAY_TIME_SEC,
-  ) -> None:
-    self.delay_time_sec = delay_time_sec
-    self._browser_type = browser_type
-    self._headless = headless
-    self._playwright: Playwright | None = None
-    self._browser: Browser | None = None
-    self._context: BrowserContext | None = None
-    self._page: Page | None = None
-    self._launched_browser_type: BrowserType | None = None
+  `wait_policy` に WaitPolicy.Auto を指定すると、操作後に固定時間待つ代わりに
+  `wait_signals` の状態になるまで待つ。要素の操作可能状態は Playwright が操作前に待つため、
+  その待機時間の上限にも `wait_timeout_sec` を使う。
+
+  `cdp_endpoint` を指定すると、ブラウザを起動せずに rpa.browser_server などで常駐させた
+  ブラウザへ接続し、新しいコンテキストだけを作る。省けるのはブラウザの起動だけで、
+  最初の操作では Playwright の起動と CDP 接続、コンテキストの作成を行う。
+  作成済みのコンテキストを払い出す事前準備 (prewarm) は AsyncPlaywrightBrowserRobot にしかない。
+  `route_profile` ("no-media"、"forms-only" など) を指定すると、画像やフォントなど
+  フォーム操作に不要なリクエストを中断する。"pass-through" は何も中断せず、受信量の比較に使う。
+  削減量も見積もる場合は RouteInterceptor(profile, measure_saved_bytes=True) を渡す。
+
+  `save_session()` で保存したセッションを `restore_session()` で新しいコンテキストに復元すると、
+  ログインやメニュー操作を省いて保存時の URL から操作を始められる。
+  """
+
+  def __init__(self, **options: Unpack[RobotOptions]) -> None:
+    super().__init__(**options)
     atexit.register(self.close)
 
   # ------------------------------------------------------------------
@@ -66,34 +94,32 @@ class PlaywrightBrowserRobot:
     self._browser_type = browser_type
     self._close_browser_only()
 
+  @traced(url="url")
   def open_browser(self, url: str, x: int | None = None, y: int | None = None) -> None:
     """指定したURLを開く。"""
     page = self._ensure_page()
     page.goto(url, wait_until="load")
     if x is not None and y is not None:
       self.set_window_size(x, y)
-    self._wait_after_action(page)
+    self._wait_after_action(page, "open_browser")
 
+  @traced()
   def set_window_size(self, x: int, y: int) -> None:
     """ウィンドウサイズを指定する。"""
     page = self._ensure_page()
     page.set_viewport_size({"width": x, "height": y})
-    self._wait_after_action(page)
+    self._wait_after_action(page, "set_window_size")
 
   def get_window_size(self) -> tuple[int, int]:
     """ウィンドウサイズを取得する。"""
-    page = self._ensure_page()
-    viewport = page.viewport_size
-    if viewport is None:
-      message = "ビューポートサイズを取得できませんでした。"
-      raise RuntimeError(message)
-    return viewport["width"], viewport["height"]
+    return viewport_size(self._ensure_page().viewport_size)
 
   def get_current_window_handle(self) -> str:
     """現在のウィンドウハンドルを取得する。"""
     page = self._ensure_page()
     return f"page-{id(page)}"
 
+  @traced(url="url")
   def open_new_tab(self, url: str) -> None:
     """新しいタブで指定したURLを開く。"""
     page = self._ensure_page()
@@ -101,53 +127,71 @@ class PlaywrightBrowserRobot:
     new_page = context.new_page()
     new_page.goto(url, wait_until="load")
     self._page = new_page
-    self._wait_after_action(new_page)
+    self._wait_after_action(new_page, "open_new_tab")
 
+  @traced(index="index")
   def switch_tab(self, index: int) -> None:
     """指定したindexのタブに切り替える。"""
     page = self._ensure_page()
     context = page.context
     pages = context.pages
-    if index < 0 or index >= len(pages):
-      message = f"指定したタブのインデックスが不正です: {index}"
-      raise IndexError(message)
+    check_tab_index(index, len(pages))
     self._page = pages[index]
-    self._wait_after_action(self._page)
+    self._wait_after_action(self._page, "switch_tab")
 
+  @traced()
   def close_tab(self) -> None:
     """現在のタブを閉じて、前のタブへ切り替える。"""
     page = self._ensure_page()
     context = page.context
     pages = context.pages
-    if len(pages) <= 1:
-      message = "タブが1つしかないため、閉じることができません。"
-      raise RuntimeError(message)
+    check_closable(len(pages))
     current_index = pages.index(page)
     with contextlib.suppress(Exception):
       page.close()
     new_index = current_index - 1 if current_index > 0 else 0
     self._page = context.pages[new_index]
-    self._wait_after_action(self._page)
+    self._wait_after_action(self._page, "close_tab")
 
+  @traced()
   def close_browser(self) -> None:
     """ブラウザと Playwright を終了する。"""
     self._close_if_needed()
 
+  @traced()
   def get_current_url(self) -> str:
     """現在のURLを取得する。"""
     page = self._ensure_page()
     return page.url
 
+  @traced(target="attr_id")
   def input(self, attr_id: str, value: str) -> None:
     """指定したHTML要素に文字列を入力する。"""
     page = self._ensure_page()
     try:
-      locator = page.locator(f"#{attr_id}")
-      self._fill_or_select(locator, value)
-      self._wait_after_action(page)
+      self._fill_or_select(page, attr_id, value)
+      self._wait_after_action(page, "input")
+    except PlaywrightError as error:
+      self._element_cache.invalidate(page, attr_id)
+      print(error)
+
+  @traced()
+  def fill_form(self, values: Mapping[str, str]) -> list[str]:
+    """複数の要素へ 1 回のスクリプト実行でまとめて値を入力する。
+
+    select は表示テキスト、なければ value で選択する。入力できなかった要素の ID を返す。
+    """
+    page = self._ensure_page()
+    try:
+      missing: list[str] = page.evaluate(FILL_FORM_SCRIPT, dict(values))
     except PlaywrightError as error:
       print(error)
+      return list(values)
+    report_missing(missing)
+    self._wait_after_action(page, "fill_form")
+    return missing
 
+  @traced(target="attr_id")
   def input_date(self, attr_id: str, value: str) -> None:
     """日付入力用フィールドに値を入力する。"""
     page = self._ensure_page()
@@ -155,63 +199,105 @@ class PlaywrightBrowserRobot:
       locator = page.locator(f"#{attr_id}")
       locator.fill("")
       locator.fill(value)
-      self._wait_after_action(page)
+      self._wait_after_action(page, "input_date")
     except PlaywrightError as error:
       print(error)
 
-  def click(self, attr_id: str) -> None:
-    """指定したHTML要素をクリックする。"""
+  @traced(target="attr_id")
+  def click(self, attr_id: str, *, expect_navigation: bool = False) -> None:
+    """指定したHTML要素をクリックする。
+
+    `expect_navigation` が True の場合、クリックで始まった遷移先の読み込みが終わるまで待つ。
+    """
     page = self._ensure_page()
     try:
-      page.locator(f"#{attr_id}").click()
-      self._wait_after_action(page)
+      if expect_navigation:
+        with page.expect_navigation(wait_until="load"):
+          page.locator(f"#{attr_id}").click()
+      else:
+        page.locator(f"#{attr_id}").click()
+      self._wait_after_action(page, "click")
     except PlaywrightError as error:
       print(error)
 
+  @traced(target="attr_id")
   def get_value(self, attr_id: str) -> str | None:
     """指定したHTML要素の値を取得する。"""
     page = self._ensure_page()
     try:
-      locator = page.locator(f"#{attr_id}")
-      tag_name = locator.evaluate("el => el.tagName.toLowerCase()")
-      if tag_name in {"input", "textarea"}:
-        return locator.input_value()
-      if tag_name == "select":
-        option = locator.locator("option:checked").first
-        option_text = option.text_content()
-        if option_text:
-          return option_text
-        return locator.input_value()
-      return locator.text_content()
+      return self._with_element(page, attr_id, _read_value)
     except PlaywrightError as error:
+      self._element_cache.invalidate(page, attr_id)
       print(error)
       return None
 
+  @traced()
+  def get_values(self, attr_ids: Iterable[str]) -> dict[str, str | None]:
+    """複数の要素の値を 1 回のスクリプト実行でまとめて取得する。
+
+    要素ごとの値は get_value と同じ規則で取得し、見つからない要素は None になる。
+    """
+    ids = list(attr_ids)
+    page = self._ensure_page()
+    try:
+      return page.evaluate(GET_VALUES_SCRIPT, get_values_argument(ids))
+    except PlaywrightError as error:
+      print(error)
+      return dict.fromkeys(ids)
+
+  @traced()
   def get_current_scroll_position(self) -> tuple[int, int]:
     """現在のスクロール位置を取得する。"""
     page = self._ensure_page()
-    scroll_y = page.evaluate("() => window.pageYOffset")
-    scroll_x = page.evaluate("() => window.pageXOffset")
+    scroll_x, scroll_y = page.evaluate(SCROLL_POSITION_SCRIPT)
     return int(scroll_x), int(scroll_y)
 
+  @traced()
   def scroll_x(self, delta_x: int) -> None:
     """水平スクロール"""
-    page = self._ensure_page()
-    current_x, current_y = self.get_current_scroll_position()
-    page.evaluate(
-      "([targetX, targetY]) => window.scrollTo(targetX, targetY)",
-      [delta_x + current_x, current_y],
-    )
+    self._ensure_page().evaluate(SCROLL_BY_SCRIPT, [delta_x, 0])
 
+  @traced()
   def scroll_y(self, delta_y: int) -> None:
     """垂直スクロール"""
+    self._ensure_page().evaluate(SCROLL_BY_SCRIPT, [0, delta_y])
+
+  @traced(session="name")
+  def save_session(self, name: str) -> None:
+    """Cookie・localStorage・sessionStorage と現在の URL をスナップショットとして保存する。"""
     page = self._ensure_page()
-    current_x, current_y = self.get_current_scroll_position()
-    page.evaluate(
-      "([targetX, targetY]) => window.scrollTo(targetX, targetY)",
-      [current_x, delta_y + current_y],
+    origin, session_storage = page.evaluate(SESSION_STORAGE_SCRIPT)
+    self._get_session_store().save(
+      name,
+      page.context.storage_state(),
+      {origin: session_storage},
+      page.url,
     )
 
+  @traced(session="name")
+  def restore_session(self, name: str, *, goto: bool = True) -> bool:
+    """保存したスナップショットから新しいコンテキストを作る。
+
+    `goto` が True の場合は保存時の URL を開く。スナップショットがないか期限切れの場合は
+    何もせずに False を返す。
+    """
+    snapshot = self._get_session_store().load(name)
+    if snapshot is None:
+      return False
+    self._ensure_page()
+    if self._browser is None:
+      message = "ブラウザを起動できませんでした。"
+      raise RuntimeError(message)
+    self._close_context()
+    context = self._new_context(self._browser, storage_state=snapshot["storage_state"])
+    context.add_init_script(script=build_restore_script(snapshot["session_storage"]))
+    self._context = context
+    page = self._ensure_page()
+    if goto and snapshot["url"]:
+      page.goto(snapshot["url"], wait_until="load")
+      self._wait_after_action(page, "restore_session")
+    return True
+
   def close(self) -> None:
     """リソースを解放する。"""
     self._close_if_needed()
@@ -233,14 +319,29 @@ class PlaywrightBrowserRobot:
       self._browser = self._launch_browser()
       self._launched_browser_type = self._browser_type
 
-    if self._context is None or getattr(self._context, "is_closed", lambda: True)():
-      self._context = self._browser.new_context()
+    if self._context is None:
+      self._context = self._new_context(self._browser)
 
     if self._page is None or self._page.is_closed():
       self._page = self._context.new_page()
+      self._configure_page(self._page)
 
     return self._page
 
+  def _new_context(self, browser: Browser, **kwargs: Any) -> BrowserContext:  # noqa: ANN401
+    context = browser.new_context(**kwargs)
+    if self._route_interceptor is not None:
+      context.route("**/*", self._route_interceptor.handle)
+      context.on("response", self._route_interceptor.record_response)
+    return context
+
+  def _close_context(self) -> None:
+    with contextlib.suppress(Exception):
+      if self._context is not None:
+        self._context.close()
+    self._page = None
+    self._context = None
+
   def _start_playwright(self) -> Playwright:
     if self._playwright is None:
       self._playwright = sync_playwright().start()
@@ -248,34 +349,55 @@ class PlaywrightBrowserRobot:
 
   def _launch_browser(self) -> Browser:
     playwright = self._start_playwright()
+    if self._cdp_endpoint is not None:
+      return playwright.chromium.connect_over_cdp(self._cdp_endpoint)
+    engine, channel = self._browser_engine()
+    launcher = getattr(playwright, engine)
     launch_kwargs: _LaunchOptions = {"headless": self._headless}
-
-    if self._browser_type in {BrowserType.Edge, BrowserType.Chrome}:
-      return self._launch_chromium(playwright, launch_kwargs=launch_kwargs)
-    if self._browser_type is BrowserType.Safari:
-      return playwright.webkit.launch(**launch_kwargs)
-    if self._browser_type is BrowserType.FireFox:
-      return playwright.firefox.launch(**launch_kwargs)
-    unsupported_msg = f"未対応のブラウザタイプです: {self._browser_type}"
-    raise ValueError(unsupported_msg)
-
-  def _launch_chromium(
-    self,
-    playwright: Playwright,
-    *,
-    launch_kwargs: _LaunchOptions,
-  ) -> Browser:
-    channel = self._browser_type.value
-    if isinstance(channel, str):
+    if channel is not None:
       with contextlib.suppress(PlaywrightError):
-        return playwright.chromium.launch(channel=channel, **launch_kwargs)
-    return playwright.chromium.launch(**launch_kwargs)
+        return launcher.launch(channel=channel, **launch_kwargs)
+    return launcher.launch(**launch_kwargs)
 
-  def _wait_after_action(self, page: Page | None = None) -> None:
-    if page is not None and not page.is_closed():
-      page.wait_for_timeout(self.delay_time_sec * 1000)
+  def _wait_after_action(self, page: Page | None = None, action: str = "") -> None:
+    if self.wait_policy is WaitPolicy.Auto and page is not None and not page.is_closed():
+      self._wait_for_signals(page, action)
       return
-    time.sleep(self.delay_time_sec)
+    self._wait_fixed(page)
+
+  def _wait_fixed(self, page: Page | None = None) -> None:
+    with tracer.span("wait_fixed", category=SpanCategory.FixedDelay):
+      if page is not None and not page.is_closed():
+        page.wait_for_timeout(self.delay_time_sec * 1000)
+        return
+      time.sleep(self.delay_time_sec)
+
+  def _wait_for_signals(self, page: Page, action: str) -> None:
+    """wait_signals を順に待つ。タイムアウトした場合は固定時間の待機にフォールバックする。"""
+    started = time.perf_counter()
+    timed_out: WaitSignal | None = None
+    for signal in self.wait_signals:
+      if not self._wait_for_signal(page, signal, self._remaining_ms(started)):
+        timed_out = signal
+        break
+
+    if timed_out is not None:
+      self._report_wait_timeout(action, timed_out)
+      self._wait_fixed(page)
+    self._record_wait(action, started, timed_out)
+
+  def _wait_for_signal(self, page: Page, signal: WaitSignal, timeout_ms: float) -> bool:
+    try:
+      if signal is WaitSignal.DomQuiet:
+        return bool(page.evaluate(DOM_QUIET_SCRIPT, [self.dom_quiet_ms, timeout_ms]))
+      page.wait_for_load_state(signal.value, timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+      return False
+    except PlaywrightError:
+      # 待機中に遷移して実行コンテキストが破棄された場合は遷移先の読み込みを待つ
+      with contextlib.suppress(PlaywrightError):
+        page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
+    return True
 
   def _close_browser_only(self) -> None:
     with contextlib.suppress(Exception):
@@ -306,22 +428,78 @@ class PlaywrightBrowserRobot:
     self._playwright = None
     self._launched_browser_type = None
 
-  def _fill_or_select(self, locator: Locator, value: str) -> None:
-    tag_name = locator.evaluate("el => el.tagName.toLowerCase()")
-    if tag_name == "select":
-      self._select_option(locator, value)
-      return
-    locator.fill(value)
+  def _with_element[T](
+    self,
+    page: Page,
+    attr_id: str,
+    action: Callable[[Locator, ElementInfo], T],
+  ) -> T:
+    """要素に `action` を実行する。
+
+    キャッシュしたメタデータで失敗した場合は、遷移や DOM の置き換えで古くなったとみなして
+    問い合わせ直し、1 回だけ再実行する。要素が見つからないタイムアウトは再実行しない。
+    """
+    cached = self._element_cache.get(page, attr_id)
+    if cached is not None:
+      try:
+        return action(*cached)
+      except PlaywrightTimeoutError:
+        raise
+      except PlaywrightError:
+        self._element_cache.invalidate(page, attr_id)
+        annotate(retries=1)
+    return action(*self._probe_element(page, attr_id))
+
+  def _probe_element(self, page: Page, attr_id: str) -> tuple[Locator, ElementInfo]:
+    """要素の Locator とメタデータをブラウザに問い合わせてキャッシュする。"""
+    if self._element_cache.add_scope(page):
+      self._watch_page(page)
+    locator = page.locator(f"#{attr_id}")
+    info = ElementInfo.from_probe(locator.evaluate(ELEMENT_INFO_SCRIPT))
+    self._element_cache.put(page, attr_id, locator, info)
+    return locator, info
+
+  def _fill_or_select(self, page: Page, attr_id: str, value: str) -> None:
+    def fill(locator: Locator, info: ElementInfo) -> None:
+      if info.tag == "select":
+        self._select_option(locator, value, info)
+        return
+      locator.fill(value)
+
+    self._with_element(page, attr_id, fill)
 
-  def _select_option(self, locator: Locator, value: str) -> None:
+  def _select_option(self, locator: Locator, value: str, info: ElementInfo) -> None:
+    option_value = info.option_value(value)
+    if option_value is not None:
+      locator.select_option(value=option_value)
+      return
     try:
       locator.select_option(label=value)
     except PlaywrightError:
       locator.select_option(value=value)
 
 
+def _read_value(locator: Locator, info: ElementInfo) -> str | None:
+  """要素の種類に応じて入力値、選択中の表示テキスト、またはテキストを返す。"""
+  if info.tag in {"input", "textarea"}:
+    return locator.input_value()
+  if info.tag == "select":
+    option = locator.locator("option:checked").first
+    option_text = option.text_content()
+    if option_text:
+      return option_text
+    return locator.input_value()
+  return locator.text_content()
+
+
 __all__ = [
   "DEFAULT_DELAY_TIME_SEC",
+  "DEFAULT_DOM_QUIET_MS",
+  "DEFAULT_WAIT_TIMEOUT_SEC",
+  "MAX_WAIT_REPORTS",
   "BrowserType",
   "PlaywrightBrowserRobot",
+  "WaitPolicy",
+  "WaitReport",
+  "WaitSignal",
 ]
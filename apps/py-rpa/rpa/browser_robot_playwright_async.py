@@ -0,0 +1,538 @@
+"""Playwright の asyncio API を利用したブラウザ操作モジュール。
+
+1 つのイベントループで複数のページ・コンテキストを並行して操作するためのもので、
+公開 API は PlaywrightBrowserRobot と同じ名前のコルーチンとして提供する。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Self, Unpack
+
+from playwright.async_api import (  # type: ignore[import-untyped]
+  Browser,
+  BrowserContext,
+  Locator,
+  Page,
+  Playwright,
+  async_playwright,
+)
+from playwright.async_api import (
+  Error as PlaywrightError,
+)
+from playwright.async_api import (
+  TimeoutError as PlaywrightTimeoutError,
+)
+
+from rpa.element_cache import ElementInfo
+from rpa.form_scripts import (
+  DOM_QUIET_SCRIPT,
+  ELEMENT_INFO_SCRIPT,
+  FILL_FORM_SCRIPT,
+  GET_VALUES_SCRIPT,
+)
+from rpa.playwright_common import (
+  SCROLL_BY_SCRIPT,
+  SCROLL_POSITION_SCRIPT,
+  BrowserType,
+  PlaywrightRobotBase,
+  RobotOptions,
+  WaitPolicy,
+  WaitSignal,
+  check_closable,
+  check_tab_index,
+  get_values_argument,
+  report_missing,
+  viewport_size,
+)
+from rpa.session_store import SESSION_STORAGE_SCRIPT, build_restore_script
+from rpa.tracing import SpanCategory, annotate, traced, tracer
+
+if TYPE_CHECKING:
+  from collections.abc import Awaitable, Callable, Iterable, Mapping
+
+
+class AsyncPlaywrightBrowserRobot(
+  PlaywrightRobotBase[Playwright, Browser, BrowserContext, Page, Locator],
+):
+  """Playwright の asyncio API を利用したブラウザ自動化クラス。
+
+  `spawn()` で同じブラウザを共有し、BrowserContext だけを分けたロボットを作れる。
+  ブラウザの起動・終了は最初に作ったロボットが受け持ち、spawn したロボットの close() は
+  自身のコンテキストだけを閉じる。`prewarm()` でページを開いたコンテキストを用意しておくと、
+  spawn はそれを払い出してすぐに返る。
+
+  `cdp_endpoint` を指定すると、ブラウザを起動せずに常駐させたブラウザへ接続する。
+  セッションの保存・復元は PlaywrightBrowserRobot と同じく
+  `save_session()` / `restore_session()` で行う。
+  `get_route_stats()` は spawn したロボットの分も合わせて集計する。
+  """
+
+  def __init__(self, **options: Unpack[RobotOptions]) -> None:
+    super().__init__(**options)
+    self._owns_browser = True
+    self._lock = asyncio.Lock()
+    self._warm: deque[tuple[BrowserContext, Page]] = deque()
+    self._warm_size = 0
+    self._warm_tasks: set[asyncio.Task[None]] = set()
+
+  # ------------------------------------------------------------------
+  # パブリックAPI
+  # ------------------------------------------------------------------
+  @traced()
+  async def spawn(self) -> AsyncPlaywrightBrowserRobot:
+    """同じブラウザを共有し、新しい BrowserContext で操作するロボットを作る。"""
+    await self._ensure_page()
+    robot = AsyncPlaywrightBrowserRobot(**self._options())
+    robot._playwright = self._playwright
+    robot._browser = self._browser
+    # 集計は共有元とまとめる
+    robot._route_interceptor = self._route_interceptor
+    robot._launched_browser_type = self._launched_browser_type
+    robot._owns_browser = False
+    if self._warm:
+      robot._context, robot._page = self._warm.popleft()
+      robot._configure_page(robot._page)
+      self._refill_warm()
+    return robot
+
+  @traced(count="count")
+  async def prewarm(self, count: int) -> None:
+    """ページを開いたコンテキストを `count` 個用意し、spawn で払い出すたびに補充する。"""
+    await self._ensure_page()
+    self._warm_size = count
+    await asyncio.gather(*(self._add_warm() for _ in range(count - len(self._warm))))
+
+  async def set_browser_type(self, browser_type: BrowserType) -> None:
+    """使用するブラウザタイプを切り替える。"""
+    if self._browser_type == browser_type:
+      return
+    if not self._owns_browser:
+      message = "spawn したロボットではブラウザタイプを切り替えられません。"
+      raise RuntimeError(message)
+    self._browser_type = browser_type
+    await self._close_browser_only()
+
+  @traced(url="url")
+  async def open_browser(self, url: str, x: int | None = None, y: int | None = None) -> None:
+    """指定したURLを開く。"""
+    page = await self._ensure_page()
+    await page.goto(url, wait_until="load")
+    if x is not None and y is not None:
+      await self.set_window_size(x, y)
+    await self._wait_after_action(page, "open_browser")
+
+  @traced()
+  async def set_window_size(self, x: int, y: int) -> None:
+    """ウィンドウサイズを指定する。"""
+    page = await self._ensure_page()
+    await page.set_viewport_size({"width": x, "height": y})
+    await self._wait_after_action(page, "set_window_size")
+
+  async def get_window_size(self) -> tuple[int, int]:
+    """ウィンドウサイズを取得する。"""
+    return viewport_size((await self._ensure_page()).viewport_size)
+
+  async def get_current_window_handle(self) -> str:
+    """現在のウィンドウハンドルを取得する。"""
+    page = await self._ensure_page()
+    return f"page-{id(page)}"
+
+  @traced(url="url")
+  async def open_new_tab(self, url: str) -> None:
+    """新しいタブで指定したURLを開く。"""
+    page = await self._ensure_page()
+    new_page = await page.context.new_page()
+    self._configure_page(new_page)
+    await new_page.goto(url, wait_until="load")
+    self._page = new_page
+    await self._wait_after_action(new_page, "open_new_tab")
+
+  @traced(index="index")
+  async def switch_tab(self, index: int) -> None:
+    """指定したindexのタブに切り替える。"""
+    page = await self._ensure_page()
+    pages = page.context.pages
+    check_tab_index(index, len(pages))
+    self._page = pages[index]
+    await self._wait_after_action(self._page, "switch_tab")
+
+  @traced()
+  async def close_tab(self) -> None:
+    """現在のタブを閉じて、前のタブへ切り替える。"""
+    page = await self._ensure_page()
+    context = page.context
+    pages = context.pages
+    check_closable(len(pages))
+    current_index = pages.index(page)
+    with contextlib.suppress(Exception):
+      await page.close()
+    new_index = current_index - 1 if current_index > 0 else 0
+    self._page = context.pages[new_index]
+    await self._wait_after_action(self._page, "close_tab")
+
+  @traced()
+  async def close_browser(self) -> None:
+    """ブラウザと Playwright を終了する。spawn したロボットではコンテキストだけを閉じる。"""
+    await self._close_if_needed()
+
+  @traced()
+  async def get_current_url(self) -> str:
+    """現在のURLを取得する。"""
+    page = await self._ensure_page()
+    return page.url
+
+  @traced(target="attr_id")
+  async def input(self, attr_id: str, value: str) -> None:
+    """指定したHTML要素に文字列を入力する。"""
+    page = await self._ensure_page()
+    try:
+      await self._fill_or_select(page, attr_id, value)
+      await self._wait_after_action(page, "input")
+    except PlaywrightError as error:
+      self._element_cache.invalidate(page, attr_id)
+      print(error)
+
+  @traced()
+  async def fill_form(self, values: Mapping[str, str]) -> list[str]:
+    """複数の要素へ 1 回のスクリプト実行でまとめて値を入力する。
+
+    select は表示テキスト、なければ value で選択する。入力できなかった要素の ID を返す。
+    """
+    page = await self._ensure_page()
+    try:
+      missing: list[str] = await page.evaluate(FILL_FORM_SCRIPT, dict(values))
+    except PlaywrightError as error:
+      print(error)
+      return list(values)
+    report_missing(missing)
+    await self._wait_after_action(page, "fill_form")
+    return missing
+
+  @traced(target="attr_id")
+  async def input_date(self, attr_id: str, value: str) -> None:
+    """日付入力用フィールドに値を入力する。"""
+    page = await self._ensure_page()
+    try:
+      locator = page.locator(f"#{attr_id}")
+      await locator.fill("")
+      await locator.fill(value)
+      await self._wait_after_action(page, "input_date")
+    except PlaywrightError as error:
+      print(error)
+
+  @traced(target="attr_id")
+  async def click(self, attr_id: str, *, expect_navigation: bool = False) -> None:
+    """指定したHTML要素をクリックする。
+
+    `expect_navigation` が True の場合、クリックで始まった遷移先の読み込みが終わるまで待つ。
+    """
+    page = await self._ensure_page()
+    try:
+      if expect_navigation:
+        async with page.expect_navigation(wait_until="load"):
+          await page.locator(f"#{attr_id}").click()
+      else:
+        await page.locator(f"#{attr_id}").click()
+      await self._wait_after_action(page, "click")
+    except PlaywrightError as error:
+      print(error)
+
+  @traced(target="attr_id")
+  async def get_value(self, attr_id: str) -> str | None:
+    """指定したHTML要素の値を取得する。"""
+    page = await self._ensure_page()
+    try:
+      return await self._with_element(page, attr_id, _read_value)
+    except PlaywrightError as error:
+      self._element_cache.invalidate(page, attr_id)
+      print(error)
+      return None
+
+  @traced()
+  async def get_values(self, attr_ids: Iterable[str]) -> dict[str, str | None]:
+    """複数の要素の値を 1 回のスクリプト実行でまとめて取得する。
+
+    要素ごとの値は get_value と同じ規則で取得し、見つからない要素は None になる。
+    """
+    ids = list(attr_ids)
+    page = await self._ensure_page()
+    try:
+      return await page.evaluate(GET_VALUES_SCRIPT, get_values_argument(ids))
+    except PlaywrightError as error:
+      print(error)
+      return dict.fromkeys(ids)
+
+  @traced()
+  async def get_current_scroll_position(self) -> tuple[int, int]:
+    """現在のスクロール位置を取得する。"""
+    page = await self._ensure_page()
+    scroll_x, scroll_y = await page.evaluate(SCROLL_POSITION_SCRIPT)
+    return int(scroll_x), int(scroll_y)
+
+  @traced()
+  async def scroll_x(self, delta_x: int) -> None:
+    """水平スクロール"""
+    page = await self._ensure_page()
+    await page.evaluate(SCROLL_BY_SCRIPT, [delta_x, 0])
+
+  @traced()
+  async def scroll_y(self, delta_y: int) -> None:
+    """垂直スクロール"""
+    page = await self._ensure_page()
+    await page.evaluate(SCROLL_BY_SCRIPT, [0, delta_y])
+
+  @traced(session="name")
+  async def save_session(self, name: str) -> None:
+    """Cookie・localStorage・sessionStorage と現在の URL をスナップショットとして保存する。"""
+    page = await self._ensure_page()
+    origin, session_storage = await page.evaluate(SESSION_STORAGE_SCRIPT)
+    self._get_session_store().save(
+      name,
+      await page.context.storage_state(),
+      {origin: session_storage},
+      page.url,
+    )
+
+  @traced(session="name")
+  async def restore_session(self, name: str, *, goto: bool = True) -> bool:
+    """保存したスナップショットから新しいコンテキストを作る。
+
+    `goto` が True の場合は保存時の URL を開く。スナップショットがないか期限切れの場合は
+    何もせずに False を返す。
+    """
+    snapshot = self._get_session_store().load(name)
+    if snapshot is None:
+      return False
+    await self._ensure_page()
+    if self._browser is None:
+      message = "ブラウザを起動できませんでした。"
+      raise RuntimeError(message)
+    with contextlib.suppress(Exception):
+      if self._context is not None:
+        await self._context.close()
+    context = await self._new_context(self._browser, storage_state=snapshot["storage_state"])
+    await context.add_init_script(script=build_restore_script(snapshot["session_storage"]))
+    self._context = context
+    self._page = None
+    page = await self._ensure_page()
+    if goto and snapshot["url"]:
+      await page.goto(snapshot["url"], wait_until="load")
+      await self._wait_after_action(page, "restore_session")
+    return True
+
+  async def close(self) -> None:
+    """リソースを解放する。"""
+    await self._close_if_needed()
+
+  async def __aenter__(self) -> Self:
+    """非同期コンテキストマネージャー開始時に自身を返す。"""
+    return self
+
+  async def __aexit__(self, exc_type, exc, tb) -> None:  # noqa: ANN001
+    """非同期コンテキストマネージャー終了時に後始末を行う。"""
+    await self.close()
+
+  # ------------------------------------------------------------------
+  # 内部ユーティリティ
+  # ------------------------------------------------------------------
+  async def _ensure_page(self) -> Page:
+    # 複数のタスクから同時に呼ばれてもブラウザやページを二重に作らないようにする
+    async with self._lock:
+      if self._browser is None or self._launched_browser_type != self._browser_type:
+        if not self._owns_browser:
+          message = "共有元のブラウザが閉じられています。"
+          raise RuntimeError(message)
+        await self._close_browser_only()
+        self._browser = await self._launch_browser()
+        self._launched_browser_type = self._browser_type
+
+      if self._context is None:
+        self._context = await self._new_context(self._browser)
+
+      if self._page is None or self._page.is_closed():
+        self._page = await self._context.new_page()
+        self._configure_page(self._page)
+
+      return self._page
+
+  async def _new_context(self, browser: Browser, **kwargs: Any) -> BrowserContext:  # noqa: ANN401
+    context = await browser.new_context(**kwargs)
+    if self._route_interceptor is not None:
+      await context.route("**/*", self._route_interceptor.handle_async)
+      context.on("response", self._route_interceptor.record_response)
+    return context
+
+  async def _add_warm(self) -> None:
+    browser = self._browser
+    if browser is None:
+      return
+    with contextlib.suppress(PlaywrightError):
+      context = await self._new_context(browser)
+      self._warm.append((context, await context.new_page()))
+
+  def _refill_warm(self) -> None:
+    # 払い出した分をバックグラウンドで補充する
+    if len(self._warm) + len(self._warm_tasks) >= self._warm_size:
+      return
+    task = asyncio.create_task(self._add_warm())
+    self._warm_tasks.add(task)
+    task.add_done_callback(self._warm_tasks.discard)
+
+  async def _start_playwright(self) -> Playwright:
+    if self._playwright is None:
+      self._playwright = await async_playwright().start()
+    return self._playwright
+
+  async def _launch_browser(self) -> Browser:
+    playwright = await self._start_playwright()
+    if self._cdp_endpoint is not None:
+      return await playwright.chromium.connect_over_cdp(self._cdp_endpoint)
+    engine, channel = self._browser_engine()
+    launcher = getattr(playwright, engine)
+    if channel is not None:
+      with contextlib.suppress(PlaywrightError):
+        return await launcher.launch(channel=channel, headless=self._headless)
+    return await launcher.launch(headless=self._headless)
+
+  async def _wait_after_action(self, page: Page | None = None, action: str = "") -> None:
+    if self.wait_policy is WaitPolicy.Auto and page is not None and not page.is_closed():
+      await self._wait_for_signals(page, action)
+      return
+    await self._wait_fixed()
+
+  async def _wait_fixed(self) -> None:
+    # 他のページの操作を止めないよう、イベントループを譲って待つ
+    with tracer.span("wait_fixed", category=SpanCategory.FixedDelay):
+      await asyncio.sleep(self.delay_time_sec)
+
+  async def _wait_for_signals(self, page: Page, action: str) -> None:
+    """wait_signals を順に待つ。タイムアウトした場合は固定時間の待機にフォールバックする。"""
+    started = time.perf_counter()
+    timed_out: WaitSignal | None = None
+    for signal in self.wait_signals:
+      if not await self._wait_for_signal(page, signal, self._remaining_ms(started)):
+        timed_out = signal
+        break
+
+    if timed_out is not None:
+      self._report_wait_timeout(action, timed_out)
+      await self._wait_fixed()
+    self._record_wait(action, started, timed_out)
+
+  async def _wait_for_signal(self, page: Page, signal: WaitSignal, timeout_ms: float) -> bool:
+    try:
+      if signal is WaitSignal.DomQuiet:
+        return bool(await page.evaluate(DOM_QUIET_SCRIPT, [self.dom_quiet_ms, timeout_ms]))
+      await page.wait_for_load_state(signal.value, timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+      return False
+    except PlaywrightError:
+      # 待機中に遷移して実行コンテキストが破棄された場合は遷移先の読み込みを待つ
+      with contextlib.suppress(PlaywrightError):
+        await page.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
+    return True
+
+  async def _close_browser_only(self) -> None:
+    # 補充中のコンテキストが閉じた後に _warm へ追加されないよう、取り消しの完了まで待つ
+    tasks = list(self._warm_tasks)
+    for task in tasks:
+      task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    while self._warm:
+      context, _ = self._warm.popleft()
+      with contextlib.suppress(Exception):
+        await context.close()
+
+    with contextlib.suppress(Exception):
+      if self._context is not None:
+        await self._context.close()
+
+    with contextlib.suppress(Exception):
+      if self._browser is not None and self._owns_browser:
+        await self._browser.close()
+
+    self._page = None
+    self._context = None
+    self._browser = None
+
+  async def _close_if_needed(self) -> None:
+    await self._close_browser_only()
+
+    with contextlib.suppress(Exception):
+      if self._playwright is not None and self._owns_browser:
+        await self._playwright.stop()
+
+    self._playwright = None
+    self._launched_browser_type = None
+
+  async def _with_element[T](
+    self,
+    page: Page,
+    attr_id: str,
+    action: Callable[[Locator, ElementInfo], Awaitable[T]],
+  ) -> T:
+    """要素に `action` を実行する。
+
+    キャッシュしたメタデータで失敗した場合は、遷移や DOM の置き換えで古くなったとみなして
+    問い合わせ直し、1 回だけ再実行する。要素が見つからないタイムアウトは再実行しない。
+    """
+    cached = self._element_cache.get(page, attr_id)
+    if cached is not None:
+      try:
+        return await action(*cached)
+      except PlaywrightTimeoutError:
+        raise
+      except PlaywrightError:
+        self._element_cache.invalidate(page, attr_id)
+        annotate(retries=1)
+    return await action(*await self._probe_element(page, attr_id))
+
+  async def _probe_element(self, page: Page, attr_id: str) -> tuple[Locator, ElementInfo]:
+    """要素の Locator とメタデータをブラウザに問い合わせてキャッシュする。"""
+    if self._element_cache.add_scope(page):
+      self._watch_page(page)
+    locator = page.locator(f"#{attr_id}")
+    info = ElementInfo.from_probe(await locator.evaluate(ELEMENT_INFO_SCRIPT))
+    self._element_cache.put(page, attr_id, locator, info)
+    return locator, info
+
+  async def _fill_or_select(self, page: Page, attr_id: str, value: str) -> None:
+    async def fill(locator: Locator, info: ElementInfo) -> None:
+      if info.tag == "select":
+        await self._select_option(locator, value, info)
+        return
+      await locator.fill(value)
+
+    await self._with_element(page, attr_id, fill)
+
+  async def _select_option(self, locator: Locator, value: str, info: ElementInfo) -> None:
+    option_value = info.option_value(value)
+    if option_value is not None:
+      await locator.select_option(value=option_value)
+      return
+    try:
+      await locator.select_option(label=value)
+    except PlaywrightError:
+      await locator.select_option(value=value)
+
+
+async def _read_value(locator: Locator, info: ElementInfo) -> str | None:
+  """要素の種類に応じて入力値、選択中の表示テキスト、またはテキストを返す。"""
+  if info.tag in {"input", "textarea"}:
+    return await locator.input_value()
+  if info.tag == "select":
+    option = locator.locator("option:checked").first
+    option_text = await option.text_content()
+    if option_text:
+      return option_text
+    return await locator.input_value()
+  return await locator.text_content()
+
+
+__all__ = [
+  "AsyncPlaywrightBrowserRobot",
+]
@@ -4,18 +4,49 @@ from __future__ import annotations
 
 import atexit
 import time
+from collections import deque
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Self
+from typing import TYPE_CHECKING, Any, NamedTuple, Self
 
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import (
+  JavascriptException,
+  NoSuchElementException,
+  StaleElementReferenceException,
+  TimeoutException,
+)
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import Select
+from selenium.webdriver.support import expected_conditions as ec
+from selenium.webdriver.support.ui import Select, WebDriverWait
+
+from rpa.element_cache import ElementCache, ElementCacheStats, ElementInfo
+from rpa.form_scripts import (
+  ELEMENT_INFO_SCRIPT,
+  FILL_FORM_SCRIPT,
+  GET_VALUES_SCRIPT,
+  as_selenium_script,
+)
+from rpa.tracing import annotate, traced
+from rpa.wait import sleep
 
 if TYPE_CHECKING:
+  from collections.abc import Callable, Iterable, Mapping
+
+  from selenium.webdriver.common.options import ArgOptions
   from selenium.webdriver.remote.webdriver import WebDriver
+  from selenium.webdriver.remote.webelement import WebElement
 
 DEFAULT_DELAY_TIME_SEC = 0.5
+DEFAULT_WAIT_TIMEOUT_SEC = 5.0
+DEFAULT_POLL_FREQUENCY_SEC = 0.05
+MAX_WAIT_REPORTS = 1000
+
+# 要素のメタデータと、キャッシュのスコープを決めるドキュメントの作成時刻を 1 回で取得する。
+# performance.timeOrigin は遷移 (再読み込みを含む) のたびに変わる
+_PROBE_SCRIPT = f"return [({ELEMENT_INFO_SCRIPT.strip()})(arguments[0]), performance.timeOrigin];"
+
+# 要素キャッシュのスコープ。ウィンドウハンドルとドキュメントの作成時刻の組
+type _Scope = tuple[str, float]
 
 
 class BrowserType(Enum):
@@ -27,20 +58,80 @@ class BrowserType(Enum):
   FireFox = "firefox"
 
 
+class PageLoadStrategy(Enum):
+  """ページ読み込み戦略"""
+
+  # load イベントまで待つ
+  Normal = "normal"
+  # DOMContentLoaded まで待つ
+  Eager = "eager"
+  # 待たない
+  NoWait = "none"
+
+
+class WaitPolicy(Enum):
+  """操作後の待機方法"""
+
+  # 常に delay_time_sec だけ待つ
+  Fixed = "fixed"
+  # 操作ごとの条件を WebDriverWait で待ち、タイムアウトした場合だけ delay_time_sec 待つ
+  Auto = "auto"
+
+
+class WaitReport(NamedTuple):
+  """操作ごとの待機結果"""
+
+  action: str
+  condition: str
+  elapsed_sec: float
+  timed_out: bool
+
+
+class _Condition(NamedTuple):
+  name: str
+  predicate: Callable[[WebDriver], Any]
+  # タイムアウトしたときに記録する、最後に確認した状態
+  last_state: Callable[[], str | None] = lambda: None
+
+
+type _ElementAction[T] = Callable[[WebElement, ElementInfo], T]
+
+
 class SeleniumBrowserRobot:
-  """Selenium を利用したブラウザ自動化クラス。"""
+  """Selenium を利用したブラウザ自動化クラス。
+
+  `wait_policy` に WaitPolicy.Auto を指定すると、固定時間待つ代わりに操作ごとの条件を待つ。
+  操作前は要素の表示・クリック可能状態、入力後は値の反映、遷移後は document.readyState を待つ。
 
-  def __init__(
+  `debugger_address` (例: "127.0.0.1:9222") を指定すると、ブラウザを起動せずに
+  rpa.browser_server などで常駐させた Chrome / Edge へ接続する。省けるのはブラウザの起動だけで、
+  ドライバーは毎回起動する。新しいコンテキストは作らず常駐ブラウザの既存のタブを操作するため、
+  Cookie やストレージは同じブラウザに接続した他のスクリプトと共有される。
+  """
+
+  def __init__(  # noqa: PLR0913
     self,
     *,
     browser_type: BrowserType = BrowserType.Edge,
     delay_time_sec: float = DEFAULT_DELAY_TIME_SEC,
     driver_kwargs: dict[str, Any] | None = None,
+    wait_policy: WaitPolicy = WaitPolicy.Fixed,
+    wait_timeout_sec: float = DEFAULT_WAIT_TIMEOUT_SEC,
+    page_load_strategy: PageLoadStrategy | None = None,
+    debugger_address: str | None = None,
   ) -> None:
     self.delay_time_sec = delay_time_sec
+    self.wait_policy = wait_policy
+    self.wait_timeout_sec = wait_timeout_sec
+    self._page_load_strategy = page_load_strategy
+    self._debugger_address = debugger_address
+    self._wait_reports: deque[WaitReport] = deque(maxlen=MAX_WAIT_REPORTS)
     self._browser_type = browser_type
     self._driver_kwargs = driver_kwargs or {}
     self._driver: WebDriver | None = None
+    self._element_cache: ElementCache[WebElement] = ElementCache()
+    # 最後に要素を問い合わせたドキュメント。キャッシュはこのスコープにだけ持つ
+    self._scope: _Scope | None = None
     atexit.register(self.close)
 
   # ------------------------------------------------------------------
@@ -53,19 +144,22 @@ class SeleniumBrowserRobot:
     self._browser_type = browser_type
     self._close_driver()
 
+  @traced(url="url")
   def open_browser(self, url: str, x: int | None = None, y: int | None = None) -> None:
     """指定したURLを開く。"""
     driver = self._ensure_driver()
+    self._clear_element_cache()
     driver.get(url)
     if x is not None and y is not None:
       self.set_window_size(x, y)
-    self._wait_after_action()
+    self._wait_after_action("open_browser", self._document_ready())
 
+  @traced()
   def set_window_size(self, x: int, y: int) -> None:
     """ウィンドウサイズを指定値に設定する。"""
     driver = self._ensure_driver()
     driver.set_window_size(x, y)
-    self._wait_after_action()
+    self._wait_after_action("set_window_size")
 
   def get_window_size(self) -> tuple[int, int]:
     """現在のウィンドウサイズを (幅, 高さ) で返す。"""
@@ -78,14 +172,17 @@ class SeleniumBrowserRobot:
     driver = self._ensure_driver()
     return driver.current_window_handle
 
+  @traced(url="url")
   def open_new_tab(self, url: str) -> None:
     """新しいタブで指定したURLを開く。"""
     driver = self._ensure_driver()
+    self._clear_element_cache()
     driver.execute_script("window.open('');")
     driver.switch_to.window(driver.window_handles[-1])
     driver.get(url)
-    self._wait_after_action()
+    self._wait_after_action("open_new_tab", self._document_ready())
 
+  @traced(index="index")
   def switch_tab(self, index: int) -> None:
     """指定したインデックスのタブへ切り替える。"""
     driver = self._ensure_driver()
@@ -93,9 +190,11 @@ class SeleniumBrowserRobot:
     if index < 0 or index >= len(handles):
       message = f"指定したインデックスのタブは存在しません: {index}"
       raise IndexError(message)
+    self._clear_element_cache()
     driver.switch_to.window(handles[index])
-    self._wait_after_action()
+    self._wait_after_action("switch_tab", self._document_ready())
 
+  @traced()
   def close_tab(self) -> None:
     """現在のタブを閉じて、前のタブへ切り替える。"""
     driver = self._ensure_driver()
@@ -104,69 +203,129 @@ class SeleniumBrowserRobot:
       message = "タブが1つしかないため、閉じることができません。"
       raise RuntimeError(message)
     current_handle = driver.current_window_handle
+    self._clear_element_cache()
     driver.close()
     for i, handle in enumerate(handles):
       if handle == current_handle:
         new_index = max(0, i - 1)
         driver.switch_to.window(handles[new_index])
         break
-    self._wait_after_action()
+    self._wait_after_action("close_tab", self._document_ready())
+
+  @traced()
+  def start_driver(self) -> None:
+    """ドライバとブラウザを起動する。起動済みの場合は何もしない。"""
+    self._ensure_driver()
 
+  @traced()
   def close_browser(self) -> None:
     """ブラウザを閉じてドライバを破棄する。"""
     self._close_driver()
 
+  @traced()
   def get_current_url(self) -> str:
     """現在表示している URL を返す。"""
     driver = self._ensure_driver()
     return driver.current_url
 
+  @traced(target="attr_id")
   def input(self, attr_id: str, value: str) -> None:
     """ID 指定した要素へ文字列または選択値を入力する。"""
-    driver = self._ensure_driver()
     try:
-      element = driver.find_element(By.ID, attr_id)
-      self._fill_or_select(element, value)
-      self._wait_after_action()
+
+      def fill(element: WebElement, info: ElementInfo) -> _Condition:
+        before = self._value_before_fill(element, info)
+        self._fill_or_select(element, info, value)
+        return _value_committed(attr_id, element, info, value, before)
+
+      committed = self._with_element(attr_id, ec.visibility_of_element_located, fill)
+      self._wait_after_action("input", committed)
     except NoSuchElementException as error:
       print(error.msg)
 
+  @traced()
+  def fill_form(self, values: Mapping[str, str]) -> list[str]:
+    """複数の要素へ 1 回のスクリプト実行でまとめて値を入力する。
+
+    select は表示テキスト、なければ value で選択する。入力できなかった要素の ID を返す。
+    """
+    driver = self._ensure_driver()
+    try:
+      missing: list[str] = driver.execute_script(
+        as_selenium_script(FILL_FORM_SCRIPT),
+        dict(values),
+      )
+    except JavascriptException as error:
+      print(error.msg)
+      return list(values)
+    if len(missing) > 0:
+      print(f"入力できなかった要素: {missing}")
+    self._wait_after_action("fill_form")
+    return missing
+
+  @traced(target="attr_id")
   def input_date(self, attr_id: str, value: str) -> None:
     """ID 指定した日付入力要素へ文字列を入力する。"""
-    driver = self._ensure_driver()
     try:
-      element = driver.find_element(By.ID, attr_id)
-      element.clear()
-      element.send_keys(value)
-      self._wait_after_action()
+
+      def fill(element: WebElement, info: ElementInfo) -> _Condition:
+        before = self._value_before_fill(element, info)
+        element.clear()
+        element.send_keys(value)
+        return _value_committed(attr_id, element, info, value, before)
+
+      committed = self._with_element(attr_id, ec.visibility_of_element_located, fill)
+      self._wait_after_action("input_date", committed)
     except NoSuchElementException as error:
       print(error.msg)
 
-  def click(self, attr_id: str) -> None:
-    """ID 指定した要素をクリックする。"""
+  @traced(target="attr_id")
+  def click(self, attr_id: str, *, expect_navigation: bool = False) -> None:
+    """ID 指定した要素をクリックする。
+
+    `expect_navigation` が True の場合、Auto 待機では URL が変わって読み込まれるまで待つ。
+    """
     driver = self._ensure_driver()
     try:
-      driver.find_element(By.ID, attr_id).click()
-      self._wait_after_action()
+      wait_navigation = expect_navigation and self.wait_policy is WaitPolicy.Auto
+      previous_url = driver.current_url if wait_navigation else None
+      self._with_element(attr_id, ec.element_to_be_clickable, lambda element, _: element.click())
+      if expect_navigation:
+        self._clear_element_cache()
+      if previous_url is not None:
+        self._wait_for("click", _Condition("url_changes", ec.url_changes(previous_url)))
+      self._wait_after_action("click", self._document_ready())
     except NoSuchElementException as error:
       print(error.msg)
 
+  @traced(target="attr_id")
   def get_value(self, attr_id: str) -> str | None:
     """ID 指定した要素の表示値または入力値を取得する。"""
-    driver = self._ensure_driver()
     try:
-      element = driver.find_element(By.ID, attr_id)
-      tag_name = element.tag_name.lower()
-      if tag_name in {"input", "textarea"}:
-        return element.get_attribute("value")
-      if tag_name == "select":
-        selected = Select(element).first_selected_option
-        return selected.text
-      return element.text
+      return self._with_element(attr_id, ec.presence_of_element_located, _read_value)
     except NoSuchElementException as error:
       print(error.msg)
       return None
 
+  @traced()
+  def get_values(self, attr_ids: Iterable[str]) -> dict[str, str | None]:
+    """複数の要素の値を 1 回のスクリプト実行でまとめて取得する。
+
+    要素ごとの値は get_value と同じ規則 (表示テキストは innerText) で取得し、
+    見つからない要素は None になる。
+    """
+    ids = list(attr_ids)
+    driver = self._ensure_driver()
+    try:
+      return driver.execute_script(
+        as_selenium_script(GET_VALUES_SCRIPT),
+        {"ids": ids, "textProperty": "innerText", "trimText": True},
+      )
+    except JavascriptException as error:
+      print(error.msg)
+      return dict.fromkeys(ids)
+
+  @traced()
   def get_current_scroll_position(self) -> tuple[int, int]:
     """現在のスクロール位置を (X, Y) で返す。"""
     driver = self._ensure_driver()
@@ -174,6 +333,7 @@ class SeleniumBrowserRobot:
     scroll_x = driver.execute_script("return window.pageXOffset;")
     return int(scroll_x), int(scroll_y)
 
+  @traced()
   def scroll_x(self, delta_x: int) -> None:
     """指定量だけ水平方向にスクロールする。"""
     driver = self._ensure_driver()
@@ -184,6 +344,7 @@ class SeleniumBrowserRobot:
       current_y,
     )
 
+  @traced()
   def scroll_y(self, delta_y: int) -> None:
     """指定量だけ垂直方向にスクロールする。"""
     driver = self._ensure_driver()
@@ -194,6 +355,14 @@ class SeleniumBrowserRobot:
       delta_y + current_y,
     )
 
+  def get_element_cache_stats(self) -> ElementCacheStats:
+    """要素のメタデータキャッシュの命中統計を返す。"""
+    return self._element_cache.stats
+
+  def get_wait_reports(self) -> list[WaitReport]:
+    """Auto 待機での操作ごとの待機結果を古い順に返す。"""
+    return list(self._wait_reports)
+
   def close(self) -> None:
     """保持しているドライバを明示的に解放する。"""
     self._close_driver()
@@ -218,21 +387,131 @@ class SeleniumBrowserRobot:
   def _create_driver(self) -> WebDriver:
     """ブラウザタイプに応じて WebDriver を生成する。"""
     if self._browser_type is BrowserType.Edge:
-      return webdriver.Edge(**self._driver_kwargs)
+      return webdriver.Edge(**self._build_driver_kwargs(webdriver.EdgeOptions))
     if self._browser_type is BrowserType.Chrome:
-      return webdriver.Chrome(**self._driver_kwargs)
+      return webdriver.Chrome(**self._build_driver_kwargs(webdriver.ChromeOptions))
     if self._browser_type is BrowserType.FireFox:
-      return webdriver.Firefox(**self._driver_kwargs)
+      return webdriver.Firefox(**self._build_driver_kwargs(webdriver.FirefoxOptions))
     if self._browser_type is BrowserType.Safari:
-      return webdriver.Safari(**self._driver_kwargs)
+      return webdriver.Safari(**self._build_driver_kwargs(webdriver.SafariOptions))
     message = f"未対応のブラウザタイプです: {self._browser_type}"
     raise ValueError(message)
 
-  def _fill_or_select(self, element, value: str) -> None:  # noqa: ANN001
+  def _build_driver_kwargs(self, options_cls: Callable[[], ArgOptions]) -> dict[str, Any]:
+    """ページ読み込み戦略や接続先のブラウザが指定されていればオプションに反映する。"""
+    if self._page_load_strategy is None and self._debugger_address is None:
+      return self._driver_kwargs
+    options = self._driver_kwargs.get("options") or options_cls()
+    if self._page_load_strategy is not None:
+      options.page_load_strategy = self._page_load_strategy.value
+    if self._debugger_address is not None:
+      if not hasattr(options, "debugger_address"):
+        message = (
+          f"常駐ブラウザへの接続は Chrome / Edge だけに対応しています: {self._browser_type}"
+        )
+        raise ValueError(message)
+      options.debugger_address = self._debugger_address
+    return {**self._driver_kwargs, "options": options}
+
+  def _find_element(
+    self,
+    attr_id: str,
+    condition: Callable[[tuple[str, str]], Callable[[WebDriver], Any]],
+  ) -> WebElement:
+    """ID 指定した要素を取得する。Auto 待機では `condition` を満たすまで待つ。"""
+    driver = self._ensure_driver()
+    if self.wait_policy is WaitPolicy.Fixed:
+      return driver.find_element(By.ID, attr_id)
+    try:
+      return WebDriverWait(
+        driver,
+        self.wait_timeout_sec,
+        poll_frequency=DEFAULT_POLL_FREQUENCY_SEC,
+      ).until(condition((By.ID, attr_id)))
+    except TimeoutException as error:
+      message = f"要素が操作可能になりませんでした: #{attr_id}"
+      raise NoSuchElementException(message) from error
+
+  def _with_element[T](
+    self,
+    attr_id: str,
+    condition: Callable[[tuple[str, str]], Callable[[WebDriver], Any]],
+    action: _ElementAction[T],
+  ) -> T:
+    """要素に `action` を実行する。要素が古くなっていた場合は取得し直して 1 回だけ再実行する。"""
+    element, info = self._element(attr_id, condition)
+    try:
+      return action(element, info)
+    except StaleElementReferenceException:
+      # 1 つの要素が古くなっていれば、遷移や再描画で他の要素も置き換わっている
+      self._element_cache.invalidate(self._scope)
+    annotate(retries=1)
+    element, info = self._element(attr_id, condition)
+    try:
+      return action(element, info)
+    except StaleElementReferenceException as error:
+      message = f"要素が置き換わったため操作できませんでした: #{attr_id}"
+      raise NoSuchElementException(message) from error
+
+  def _element(
+    self,
+    attr_id: str,
+    condition: Callable[[tuple[str, str]], Callable[[WebDriver], Any]],
+  ) -> tuple[WebElement, ElementInfo]:
+    """要素とメタデータを返す。キャッシュにあれば探し直さず、Auto 待機では状態だけを待つ。"""
+    cached = self._element_cache.get(self._scope, attr_id)
+    if cached is not None and self._wait_cached_element(attr_id, cached[0], condition):
+      return cached
+    element = self._find_element(attr_id, condition)
+    driver = self._ensure_driver()
+    probe, time_origin = driver.execute_script(_PROBE_SCRIPT, element)
+    info = ElementInfo.from_probe(probe)
+    scope = (driver.current_window_handle, float(time_origin))
+    if scope != self._scope:
+      # 遷移やウィンドウの切り替えで、前のドキュメントの要素はもう使えない
+      self._element_cache.drop(self._scope)
+      self._scope = scope
+    self._element_cache.put(scope, attr_id, element, info)
+    return element, info
+
+  def _wait_cached_element(
+    self,
+    attr_id: str,
+    element: WebElement,
+    condition: Callable[[tuple[str, str]], Callable[[WebDriver], Any]],
+  ) -> bool:
+    """キャッシュした要素が `condition` を満たすまで待つ。要素が古くなっていれば False を返す。"""
+    element_condition = _ELEMENT_CONDITIONS.get(condition)
+    if self.wait_policy is WaitPolicy.Fixed or element_condition is None:
+      return True
+    try:
+      WebDriverWait(
+        self._ensure_driver(),
+        self.wait_timeout_sec,
+        poll_frequency=DEFAULT_POLL_FREQUENCY_SEC,
+      ).until(element_condition(element))
+    except StaleElementReferenceException:
+      self._element_cache.invalidate(self._scope)
+      return False
+    except TimeoutException as error:
+      message = f"要素が操作可能になりませんでした: #{attr_id}"
+      raise NoSuchElementException(message) from error
+    return True
+
+  def _value_before_fill(self, element: WebElement, info: ElementInfo) -> str | None:
+    """入力前の値を返す。反映の確認に使うため、Auto 待機の input / textarea だけ取得する。"""
+    if self.wait_policy is WaitPolicy.Fixed or info.tag == "select":
+      return None
+    return element.get_attribute("value")
+
+  def _fill_or_select(self, element: WebElement, info: ElementInfo, value: str) -> None:
     """要素のタイプに応じて入力または選択操作を行う。"""
-    tag_name = element.tag_name.lower()
-    if tag_name == "select":
+    if info.tag == "select":
       select = Select(element)
+      option_value = info.option_value(value)
+      if option_value is not None:
+        select.select_by_value(option_value)
+        return
       try:
         select.select_by_visible_text(value)
       except Exception:  # noqa: BLE001
@@ -241,6 +520,10 @@ class SeleniumBrowserRobot:
     element.clear()
     element.send_keys(value)
 
+  def _clear_element_cache(self) -> None:
+    self._element_cache.clear()
+    self._scope = None
+
   def _close_driver(self) -> None:
     """WebDriver が存在する場合に終了処理を行う。"""
     if self._driver is None:
@@ -251,14 +534,126 @@ class SeleniumBrowserRobot:
       print("WebDriver quit error.")
     finally:
       self._driver = None
+      self._clear_element_cache()
+
+  def _wait_after_action(self, action: str = "", condition: _Condition | None = None) -> None:
+    """操作後の待機時間を設ける。Auto 待機では `condition` を満たすまで待つ。"""
+    if self.wait_policy is WaitPolicy.Fixed:
+      sleep(self.delay_time_sec)
+      return
+    if condition is not None and not self._wait_for(action, condition):
+      sleep(self.delay_time_sec)
+
+  def _wait_for(self, action: str, condition: _Condition) -> bool:
+    """条件を満たすまで待ち、結果を記録する。タイムアウトした場合は False を返す。"""
+    driver = self._ensure_driver()
+    started = time.perf_counter()
+    timed_out = False
+
+    def predicate(driver: WebDriver) -> Any:  # noqa: ANN401
+      try:
+        return condition.predicate(driver)
+      except StaleElementReferenceException:
+        # 再描画などで要素が置き換わったため、キャッシュした要素は使えない
+        self._element_cache.invalidate(self._scope)
+        raise
+
+    try:
+      WebDriverWait(
+        driver,
+        self.wait_timeout_sec,
+        poll_frequency=DEFAULT_POLL_FREQUENCY_SEC,
+        ignored_exceptions=(StaleElementReferenceException,),
+      ).until(predicate)
+    except TimeoutException:
+      timed_out = True
+      state = condition.last_state()
+      if state is None:
+        print(f"wait timeout: {action} ({condition.name})")
+        annotate(wait_timeout=condition.name)
+      else:
+        print(f"wait timeout: {action} ({condition.name}: {state})")
+        annotate(wait_timeout=condition.name, wait_state=state)
+    self._wait_reports.append(
+      WaitReport(
+        action=action,
+        condition=condition.name,
+        elapsed_sec=time.perf_counter() - started,
+        timed_out=timed_out,
+      ),
+    )
+    return not timed_out
+
+  def _document_ready(self) -> _Condition:
+    """ページ読み込み戦略に応じた document.readyState の条件を返す。"""
+    states = {"complete"}
+    if self._page_load_strategy in {PageLoadStrategy.Eager, PageLoadStrategy.NoWait}:
+      states.add("interactive")
+    return _Condition(
+      "document.readyState",
+      lambda driver: driver.execute_script("return document.readyState;") in states,
+    )
+
+
+# 要素の位置から探す条件 → 取得済みの要素に対する条件
+_ELEMENT_CONDITIONS: dict[Any, Callable[[WebElement], Callable[[WebDriver], Any]]] = {
+  ec.visibility_of_element_located: ec.visibility_of,
+  ec.element_to_be_clickable: ec.element_to_be_clickable,
+}
+
+
+def _read_value(element: WebElement, info: ElementInfo) -> str | None:
+  """要素の種類に応じて入力値または表示値を返す。"""
+  if info.tag in {"input", "textarea"}:
+    return element.get_attribute("value")
+  if info.tag == "select":
+    return element.find_element(By.CSS_SELECTOR, "option:checked").text
+  return element.text
+
+
+def _value_committed(
+  attr_id: str,
+  element: WebElement,
+  info: ElementInfo,
+  value: str,
+  before: str | None,
+) -> _Condition:
+  """入力した値が要素に反映されたことを確認する条件を返す。
+
+  input / textarea は、値が `value` と一致するか、空でなく入力前の値 `before` から変わったら
+  反映されたとみなす。日付の書式や数値の桁区切りなど、ページ側で値が整形される場合があるため。
+  要素が置き換わった場合は ID で探し直し、次の確認から新しい要素を使う。
+  """
+  target = element
+  observed: str | None = None
+
+  def predicate(driver: WebDriver) -> bool:
+    nonlocal target, observed
+    try:
+      if info.tag == "select":
+        selected = target.find_element(By.CSS_SELECTOR, "option:checked")
+        observed = selected.text
+        return value in {selected.text, selected.get_attribute("value")}
+      observed = target.get_attribute("value") or ""
+      return observed == value or observed not in {"", before}
+    except StaleElementReferenceException:
+      target = driver.find_element(By.ID, attr_id)
+      raise
+
+  def last_state() -> str | None:
+    if observed is None:
+      return None
+    return f"期待値 {value!r} / 現在値 {observed!r}"
 
-  def _wait_after_action(self) -> None:
-    """操作後の待機時間を設ける。"""
-    time.sleep(self.delay_time_sec)
+  return _Condition("value_committed", predicate, last_state)
 
 
 __all__ = [
   "DEFAULT_DELAY_TIME_SEC",
+  "DEFAULT_WAIT_TIMEOUT_SEC",
   "BrowserType",
+  "PageLoadStrategy",
   "SeleniumBrowserRobot",
+  "WaitPolicy",
+  "WaitReport",
 ]
@@ -0,0 +1,149 @@
+"""常駐させたブラウザに CDP (Chrome DevTools Protocol) で接続するためのモジュール。
+
+`python -m rpa.browser_server [port]` でブラウザを起動したまま待機し、
+各スクリプトは起動済みのブラウザに接続して新しいコンテキストだけを作る。
+
+    PlaywrightBrowserRobot(cdp_endpoint="http://127.0.0.1:9222")
+    SeleniumBrowserRobot(browser_type=BrowserType.Chrome, debugger_address="127.0.0.1:9222")
+
+Playwright の Python 版には launch_server がないため、Chromium 系のブラウザを
+--remote-debugging-port 付きで起動し、connect_over_cdp で接続する。
+
+接続で省けるのはブラウザの起動時間だけである。作成済みのコンテキストをすぐに払い出せるのは
+同じプロセスで AsyncPlaywrightBrowserRobot.prewarm() を使う場合だけで、
+PlaywrightBrowserRobot は接続のたびに Playwright の起動と CDP 接続、コンテキストの作成を行い、
+SeleniumBrowserRobot は分離したコンテキストを作らず既存のタブを共有する。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import TYPE_CHECKING, Self
+
+from playwright.sync_api import Error as PlaywrightError  # type: ignore[import-untyped]
+from playwright.sync_api import sync_playwright
+
+from rpa.browser_robot_playwright import BrowserType
+from rpa.wait import poll_until
+
+if TYPE_CHECKING:
+  from playwright.sync_api import Browser, Playwright
+
+DEFAULT_CDP_PORT = 9222
+DEFAULT_STARTUP_TIMEOUT_SEC = 30.0
+
+
+def cdp_version(endpoint: str) -> dict[str, str] | None:
+  """CDP エンドポイントのバージョン情報を返す。接続できない場合は None を返す。"""
+  try:
+    with urllib.request.urlopen(f"{endpoint}/json/version", timeout=1) as response:  # noqa: S310
+      return json.load(response)
+  except (OSError, urllib.error.URLError, ValueError):
+    return None
+
+
+def wait_for_endpoint(endpoint: str, timeout_sec: float = DEFAULT_STARTUP_TIMEOUT_SEC) -> bool:
+  """CDP エンドポイントに接続できるようになるまで待つ。"""
+  return poll_until(lambda: cdp_version(endpoint), timeout_sec) is not None
+
+
+class BrowserServer:
+  """CDP のポートを開いたブラウザを起動し、終了するまで保持する。"""
+
+  def __init__(
+    self,
+    *,
+    port: int = DEFAULT_CDP_PORT,
+    browser_type: BrowserType = BrowserType.Chrome,
+    headless: bool = True,
+  ) -> None:
+    if browser_type not in {BrowserType.Chrome, BrowserType.Edge}:
+      message = f"CDP で接続できるのは Chromium 系のブラウザだけです: {browser_type}"
+      raise ValueError(message)
+    self.port = port
+    self.browser_type = browser_type
+    self.headless = headless
+    self._playwright: Playwright | None = None
+    self._browser: Browser | None = None
+
+  @property
+  def endpoint(self) -> str:
+    """接続先の URL を返す。"""
+    return f"http://127.0.0.1:{self.port}"
+
+  def start(self) -> str:
+    """ブラウザを起動し、接続できるようになったら接続先の URL を返す。"""
+    if cdp_version(self.endpoint) is not None:
+      message = f"ポート {self.port} は既に使用されています。"
+      raise RuntimeError(message)
+    self._playwright = sync_playwright().start()
+    args = [f"--remote-debugging-port={self.port}"]
+    try:
+      self._browser = self._playwright.chromium.launch(
+        channel=self.browser_type.value,
+        headless=self.headless,
+        args=args,
+      )
+    except PlaywrightError:
+      self._browser = self._playwright.chromium.launch(headless=self.headless, args=args)
+    if not wait_for_endpoint(self.endpoint):
+      self.stop()
+      message = f"ブラウザの CDP エンドポイントに接続できませんでした: {self.endpoint}"
+      raise RuntimeError(message)
+    return self.endpoint
+
+  def serve_forever(self) -> None:
+    """ブラウザが終了するか Ctrl+C が押されるまで待機する。"""
+    try:
+      while self._browser is not None and self._browser.is_connected():
+        time.sleep(1)
+    except KeyboardInterrupt:
+      pass
+    finally:
+      self.stop()
+
+  def stop(self) -> None:
+    """ブラウザと Playwright を終了する。"""
+    with contextlib.suppress(Exception):
+      if self._browser is not None:
+        self._browser.close()
+    with contextlib.suppress(Exception):
+      if self._playwright is not None:
+        self._playwright.stop()
+    self._browser = None
+    self._playwright = None
+
+  def __enter__(self) -> Self:
+    """コンテキストマネージャー開始時にブラウザを起動する。"""
+    self.start()
+    return self
+
+  def __exit__(self, exc_type, exc, tb) -> None:  # noqa: ANN001
+    """コンテキストマネージャー終了時にブラウザを終了する。"""
+    self.stop()
+
+
+def main() -> None:
+  """`python -m rpa.browser_server [port]` でブラウザを常駐させる。"""
+  port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CDP_PORT
+  server = BrowserServer(port=port)
+  print(f"endpoint: {server.start()}")
+  server.serve_forever()
+
+
+__all__ = [
+  "DEFAULT_CDP_PORT",
+  "DEFAULT_STARTUP_TIMEOUT_SEC",
+  "BrowserServer",
+  "cdp_version",
+  "wait_for_endpoint",
+]
+
+
+if __name__ == "__main__":
+  main()
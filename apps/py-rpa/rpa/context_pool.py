@@ -0,0 +1,183 @@
+"""1 つのブラウザの複数の BrowserContext にデータを振り分けて処理するモジュール。"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+  from collections.abc import Awaitable, Callable, Iterable
+
+  from rpa.browser_robot_playwright_async import AsyncPlaywrightBrowserRobot
+
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 1
+
+
+class JobResult(NamedTuple):
+  """1 件のデータの処理結果"""
+
+  index: int
+  item: Any
+  ok: bool
+  error: str | None
+  attempts: int
+  worker: int
+  elapsed_sec: float
+  value: Any = None
+
+
+class RunReport(NamedTuple):
+  """全体の処理結果"""
+
+  results: list[JobResult]
+  workers: int
+  elapsed_sec: float
+
+  @property
+  def total(self) -> int:
+    """処理したデータの件数を返す。"""
+    return len(self.results)
+
+  @property
+  def succeeded(self) -> int:
+    """成功した件数を返す。"""
+    return sum(1 for result in self.results if result.ok)
+
+  @property
+  def failed(self) -> list[JobResult]:
+    """失敗したデータの処理結果を返す。"""
+    return [result for result in self.results if not result.ok]
+
+  @property
+  def throughput(self) -> float:
+    """1 秒あたりの処理件数を返す。"""
+    if self.elapsed_sec <= 0:
+      return 0.0
+    return self.total / self.elapsed_sec
+
+  def summary(self) -> str:
+    """集計結果を 1 行の文字列で返す。"""
+    return (
+      f"total={self.total} succeeded={self.succeeded} failed={len(self.failed)} "
+      f"workers={self.workers} elapsed={self.elapsed_sec:.1f}s "
+      f"throughput={self.throughput:.2f}/s"
+    )
+
+
+type Job[T] = Callable[[AsyncPlaywrightBrowserRobot, T], Awaitable[Any]]
+
+_STOP = object()
+
+
+class ContextPoolRunner:
+  """データを `workers` 個の BrowserContext に振り分けて並行に処理する。
+
+  各ワーカーは `robot.spawn()` で作った専用のロボット (コンテキスト) を使う。
+  キューの長さを `queue_size` に制限するため、データは処理に合わせて少しずつ読み出される。
+  ジョブが例外を送出した場合は、ワーカーのコンテキストを作り直して `retries` 回まで再実行し、
+  それでも失敗したデータは失敗として記録して次のデータへ進む。
+  """
+
+  def __init__(
+    self,
+    robot: AsyncPlaywrightBrowserRobot,
+    *,
+    workers: int = DEFAULT_WORKERS,
+    queue_size: int | None = None,
+    retries: int = DEFAULT_RETRIES,
+  ) -> None:
+    if workers < 1:
+      message = f"workers は 1 以上を指定してください: {workers}"
+      raise ValueError(message)
+    self.robot = robot
+    self.workers = workers
+    self.queue_size = queue_size if queue_size is not None else workers * 2
+    self.retries = retries
+
+  async def run[T](self, items: Iterable[T], job: Job[T]) -> RunReport:
+    """すべてのデータを処理し、入力順に並べた処理結果を返す。
+
+    ジョブの戻り値は JobResult.value に入る。
+    """
+    started = time.perf_counter()
+    queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=self.queue_size)
+    results: list[JobResult] = []
+
+    async def produce() -> None:
+      for index, item in enumerate(items):
+        await queue.put((index, item))
+      for _ in range(self.workers):
+        await queue.put(_STOP)
+
+    tasks = [
+      asyncio.create_task(self._work(no, queue, job, results)) for no in range(self.workers)
+    ]
+    tasks.append(asyncio.create_task(produce()))
+    try:
+      await asyncio.gather(*tasks)
+    finally:
+      for task in tasks:
+        task.cancel()
+
+    results.sort(key=lambda result: result.index)
+    return RunReport(results, self.workers, time.perf_counter() - started)
+
+  async def _work[T](
+    self,
+    no: int,
+    queue: asyncio.Queue[Any],
+    job: Job[T],
+    results: list[JobResult],
+  ) -> None:
+    robot: AsyncPlaywrightBrowserRobot | None = None
+    try:
+      while (entry := await queue.get()) is not _STOP:
+        index, item = entry
+        started = time.perf_counter()
+        error: str | None = None
+        value: Any = None
+        attempts = 0
+        while attempts <= self.retries:
+          attempts += 1
+          try:
+            if robot is None:
+              robot = await self.robot.spawn()
+            value = await job(robot, item)
+          except Exception as exc:  # noqa: BLE001
+            error = f"{type(exc).__name__}: {exc}"
+            # 途中の状態が残らないよう、次の試行は新しいコンテキストで行う
+            if robot is not None:
+              await robot.close()
+            robot = None
+          else:
+            error = None
+            break
+        if error is not None:
+          print(f"[worker {no}] #{index} failed: {error}")
+        results.append(
+          JobResult(
+            index=index,
+            item=item,
+            ok=error is None,
+            error=error,
+            attempts=attempts,
+            worker=no,
+            elapsed_sec=time.perf_counter() - started,
+            value=value,
+          ),
+        )
+    finally:
+      if robot is not None:
+        await robot.close()
+
+
+__all__ = [
+  "DEFAULT_RETRIES",
+  "DEFAULT_WORKERS",
+  "ContextPoolRunner",
+  "Job",
+  "JobResult",
+  "RunReport",
+]
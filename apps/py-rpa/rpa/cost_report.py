@@ -0,0 +1,154 @@
+"""トレースしたスパンから、実行時間を分類ごとに集計するモジュール。
+
+スパンの所要時間から子スパンの時間を引いた自身の時間を、スパンの分類 (SpanCategory) に振り分ける。
+どのスパンにも含まれない時間はスクリプト自体の処理として数える。
+手順 (rpa.tracing.step) ごとにも集計し、固定時間の待機が長い手順から順に並べる。
+手順の外で呼んだ操作は、最上位のスパンの名前を手順名として扱う。
+
+asyncio などで操作を並行して実行した場合、分類ごとの時間の合計は実行時間を超える。
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple
+
+from rpa.tracing import Span, SpanCategory, tracer
+
+if TYPE_CHECKING:
+  from collections.abc import Iterable
+
+# format() で表示する手順の数の既定値
+DEFAULT_TOP_STEPS = 10
+
+
+class StepCost(NamedTuple):
+  """手順ごとの時間の内訳"""
+
+  name: str
+  count: int
+  total_sec: float
+  by_category: dict[SpanCategory, float]
+
+  @property
+  def fixed_delay_sec(self) -> float:
+    """固定時間の待機の合計を返す。"""
+    return self.by_category.get(SpanCategory.FixedDelay, 0.0)
+
+  @property
+  def fixed_delay_ratio(self) -> float:
+    """手順の時間に占める固定時間の待機の割合を返す。"""
+    if self.total_sec <= 0:
+      return 0.0
+    return self.fixed_delay_sec / self.total_sec
+
+
+class CostReport(NamedTuple):
+  """実行時間の内訳"""
+
+  wall_sec: float
+  by_category: dict[SpanCategory, float]
+  # 固定時間の待機が長い順
+  steps: list[StepCost]
+
+  def format(self, top: int = DEFAULT_TOP_STEPS) -> str:
+    """内訳を表形式の文字列で返す。手順は固定時間の待機が長い順に `top` 件まで表示する。"""
+    total = sum(self.by_category.values()) or 1.0
+    lines = [f"wall: {self.wall_sec:.3f}s"]
+    lines.extend(
+      f"  {category.value:<14} {self.by_category.get(category, 0.0):>9.3f}s "
+      f"({self.by_category.get(category, 0.0) / total:>6.1%})"
+      for category in SpanCategory
+    )
+    header = "".join(f" {category.value:>13}" for category in SpanCategory)
+    lines.append(f"{'step':<40} {'count':>6} {'total':>10}{header} {'fixed%':>7}")
+    for step in self.steps[:top]:
+      columns = "".join(
+        f" {step.by_category.get(category, 0.0):>12.3f}s" for category in SpanCategory
+      )
+      lines.append(
+        f"{step.name:<40} {step.count:>6} {step.total_sec:>9.3f}s{columns} "
+        f"{step.fixed_delay_ratio:>7.1%}",
+      )
+    return "\n".join(lines)
+
+
+def build_cost_report(
+  spans: Iterable[Span] | None = None,
+  *,
+  wall_sec: float | None = None,
+) -> CostReport:
+  """スパンから実行時間の内訳を作る。
+
+  `spans` を省略した場合は rpa.tracing.tracer が記録したスパンを使い、
+  `wall_sec` を省略した場合は tracer の経過時間を実行時間とする。
+  """
+  if spans is None:
+    spans = tracer.spans
+  if wall_sec is None:
+    wall_sec = tracer.elapsed_sec
+  by_id = {span.span_id: span for span in spans}
+
+  child_sec: dict[int, float] = {}
+  for span in by_id.values():
+    if span.parent_id in by_id:
+      child_sec[span.parent_id] = child_sec.get(span.parent_id, 0.0) + span.duration_sec
+
+  categories: dict[int, SpanCategory] = {}
+  by_category = dict.fromkeys(SpanCategory, 0.0)
+  steps: dict[str, dict[SpanCategory, float]] = {}
+  step_spans: dict[str, set[int]] = {}
+  root_sec = 0.0
+  for span in by_id.values():
+    category = _resolve_category(span, by_id, categories)
+    self_sec = max(0.0, span.duration_sec - child_sec.get(span.span_id, 0.0))
+    by_category[category] += self_sec
+    step = _find_step(span, by_id)
+    step_costs = steps.setdefault(step.name, dict.fromkeys(SpanCategory, 0.0))
+    step_costs[category] += self_sec
+    step_spans.setdefault(step.name, set()).add(step.span_id)
+    if span.parent_id not in by_id:
+      root_sec += span.duration_sec
+
+  # どのスパンにも含まれない時間はスクリプトの処理とみなす
+  by_category[SpanCategory.Script] += max(0.0, wall_sec - root_sec)
+
+  step_costs_list = [
+    StepCost(name, len(step_spans[name]), sum(costs.values()), costs)
+    for name, costs in steps.items()
+  ]
+  step_costs_list.sort(key=lambda step: (step.fixed_delay_sec, step.total_sec), reverse=True)
+  return CostReport(wall_sec, by_category, step_costs_list)
+
+
+def _resolve_category(
+  span: Span,
+  by_id: dict[int, Span],
+  resolved: dict[int, SpanCategory],
+) -> SpanCategory:
+  """分類のないスパンは親の分類を引き継ぐ。最上位まで分類がなければスクリプトの処理とする。"""
+  if span.span_id in resolved:
+    return resolved[span.span_id]
+  if span.category is not None:
+    category = span.category
+  elif span.parent_id in by_id:
+    category = _resolve_category(by_id[span.parent_id], by_id, resolved)
+  else:
+    category = SpanCategory.Script
+  resolved[span.span_id] = category
+  return category
+
+
+def _find_step(span: Span, by_id: dict[int, Span]) -> Span:
+  """スパンを含む最も内側の手順を返す。手順がなければ最上位のスパンを返す。"""
+  current = span
+  while not current.attributes.get("step") and current.parent_id in by_id:
+    current = by_id[current.parent_id]
+  return current
+
+
+__all__ = [
+  "DEFAULT_TOP_STEPS",
+  "CostReport",
+  "StepCost",
+  "build_cost_report",
+]
@@ -0,0 +1,32 @@
+"""CSV の行を 1 行ずつ読み出すモジュール。"""
+
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+  from collections.abc import Iterator
+
+# Excel などが付ける BOM を取り除く
+DEFAULT_ENCODING = "utf-8-sig"
+
+
+def iter_csv_rows(
+  path: str | Path,
+  *,
+  encoding: str = DEFAULT_ENCODING,
+) -> Iterator[dict[str, str]]:
+  """ヘッダー行をキーにした辞書として CSV の行を順に返す。
+
+  ファイル全体を読み込まずに 1 行ずつ返すため、大きなファイルでもメモリを消費しない。
+  """
+  with Path(path).open(encoding=encoding, newline="") as file:
+    yield from csv.DictReader(file)
+
+
+__all__ = [
+  "DEFAULT_ENCODING",
+  "iter_csv_rows",
+]
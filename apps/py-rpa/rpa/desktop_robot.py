@@ -3,21 +3,66 @@
 pyautogui, pyperclip, pywinctlのラッパー
 """
 
+from __future__ import annotations
+
+import atexit
 import datetime
 import shutil
 import subprocess
 import time
 from enum import Enum
 from pathlib import Path
-from typing import NamedTuple
+from typing import TYPE_CHECKING, NamedTuple
 
+import cv2
 import pyautogui
 import pyperclip
 import pywinctl
-from PIL import Image
+
+from rpa.image_locator import ImageLocator, TemplateSource
+from rpa.image_matcher import (
+  DEFAULT_CONFIDENCE,
+  DEFAULT_SCALES,
+  MatchResult,
+  ScaledTemplate,
+  hash_distance,
+  perceptual_hash,
+)
+from rpa.location_hints import HintStats, LocationHintCache
+from rpa.screen_capture import CaptureBackend, ScreenRect, create_capture_backend
+from rpa.template_store import TemplateStore
+from rpa.tracing import SpanCategory, annotate, traced, tracer
+from rpa.wait import Deadline, PollScheduler, poll_until
+from rpa.window_registry import WindowHandle, WindowRegistry
+
+if TYPE_CHECKING:
+  from collections.abc import Mapping
+
+  import numpy as np
 
 is_smooth = True
 delay_time_sec = 0.5
+# wait_until_stable で画面が止まったとみなすまでの時間
+DEFAULT_STABLE_SEC = 0.2
+# 差分ハッシュのハミング距離がこれ以下なら画面は変化していないとみなす
+DEFAULT_HASH_THRESHOLD = 2
+# move_to_with_image などが使うテンプレートのキャッシュ
+# IMAGE_PATH のバンドルは template_store.load_bundle() で事前に読み込める
+template_store = TemplateStore()
+# 前回見つかった位置の周辺から探すためのヒント
+# location_hints.load("hints.json") で次回の実行にも引き継げる
+location_hints = LocationHintCache()
+atexit.register(location_hints.close)
+# テンプレート画像を撮影したディスプレイの表示倍率 (None の場合は実行中のディスプレイと同じ)
+template_display_scale: float | None = None
+# active_window で最後にアクティブ化したアプリ名 (ヒントのキーに使う)
+_active_app_name: str | None = None
+# アプリ名とタイトルで索引したウィンドウ一覧のキャッシュ
+window_registry = WindowRegistry()
+# 画面キャプチャのバックエンド (mss が使えない環境では pyautogui)。最初のキャプチャで作成する
+capture_backend: CaptureBackend | None = None
+# モニタの論理座標での矩形ごとの表示倍率
+_display_scales: dict[ScreenRect, DisplayScale] = {}
 
 
 class ButtonType(Enum):
@@ -28,6 +73,13 @@ class ButtonType(Enum):
   Middle = "middle"
 
 
+class DisplayScale(NamedTuple):
+  """論理座標に対するスクリーンショットの実ピクセルの倍率"""
+
+  x: float
+  y: float
+
+
 class WindowRect(NamedTuple):
   """ウィンドウサイズ情報"""
 
@@ -37,6 +89,7 @@ class WindowRect(NamedTuple):
   height: int
 
 
+@traced(app="app_path")
 def start_app(app_path: str) -> None:
   """指定したアプリを起動する。"""
   path = Path(app_path).expanduser().resolve()
@@ -57,28 +110,130 @@ def start_app(app_path: str) -> None:
   subprocess.run([open_cmd, str(path)], check=True)
 
 
-def wait_for_window(app_name: str, timeout: int = 30) -> bool:
-  """指定アプリのウィンドウが出るまで待機する。"""
-  script = f"""
-    tell application "System Events"
-        count (windows of process "{app_name}")
-    end tell
-    """
-  for _ in range(timeout):
-    result = subprocess.run(
-      ["osascript", "-e", script],
-      check=False,
-      capture_output=True,
-      text=True,
-    )
-    try:
-      count = int(result.stdout.strip())
-      if count > 0:
-        return True
-    except ValueError:
-      pass
-    time.sleep(1)
-  return False
+@traced(app="app_name")
+def wait_for_window(
+  app_name: str,
+  timeout: float = 30,
+  *,
+  deadline: Deadline | None = None,
+) -> bool:
+  """指定アプリのウィンドウが出るまで待機する。
+
+  数十ミリ秒から始めて徐々に間隔を伸ばしながらウィンドウ一覧を確認する。
+  """
+  window = poll_until(lambda: _find_fresh_window(app_name=app_name), timeout, deadline=deadline)
+  return window is not None
+
+
+@traced(title="title")
+def wait_for_title(
+  title: str,
+  timeout: float = 30,
+  *,
+  exact: bool = False,
+  deadline: Deadline | None = None,
+) -> WindowHandle | None:
+  """指定したタイトルのウィンドウが出るまで待機し、そのハンドルを返す。
+
+  `exact` が False の場合はタイトルの部分一致で判定する。
+  """
+  return poll_until(
+    lambda: _find_fresh_window(title=title, exact_title=exact),
+    timeout,
+    deadline=deadline,
+  )
+
+
+@traced(template="image_path")
+def wait_for_image(
+  image_path: str,
+  timeout: float = 30,
+  *,
+  confidence: float = DEFAULT_CONFIDENCE,
+  deadline: Deadline | None = None,
+) -> tuple[int, int] | None:
+  """指定した画像が画面に表示されるまで待機し、その中心座標を返す。
+
+  待機中は位置ヒントと表示倍率から見込んだスケールだけを評価し、全スケールの評価は
+  期限までに見つからなかった場合に 1 回だけ行う。
+  """
+  match = poll_until(
+    lambda: _locate_image(image_path, scales=None, confidence=confidence, fallback=False),
+    timeout,
+    deadline=deadline,
+  )
+  if match is None:
+    match = _locate_image(image_path, scales=None, confidence=confidence)
+  return None if match is None else _to_screen_point(match)
+
+
+@traced(region="region")
+def wait_until_stable(
+  region: tuple[int, int, int, int] | None = None,
+  timeout: float = 5,
+  *,
+  stable_sec: float = DEFAULT_STABLE_SEC,
+  threshold: int = DEFAULT_HASH_THRESHOLD,
+  deadline: Deadline | None = None,
+) -> bool:
+  """画面 (または領域) の変化が `stable_sec` の間止まるまで待機する。
+
+  `region` は (x, y, 幅, 高さ) の論理座標。縮小したフレームの差分ハッシュを比べ、
+  ハミング距離が `threshold` 以下なら変化していないとみなす。
+  """
+  last_hash: int | None = None
+  since = time.monotonic()
+
+  def is_stable() -> bool:
+    nonlocal last_hash, since
+    current = _frame_hash(region)
+    now = time.monotonic()
+    if last_hash is None or hash_distance(current, last_hash) > threshold:
+      last_hash = current
+      since = now
+      return False
+    return now - since >= stable_sec
+
+  scheduler = PollScheduler(max_interval_sec=stable_sec / 2)
+  return poll_until(is_stable, timeout, deadline=deadline, scheduler=scheduler) is not None
+
+
+@traced(region="region")
+def wait_until_changed(
+  region: tuple[int, int, int, int] | None = None,
+  timeout: float = 5,
+  *,
+  threshold: int = DEFAULT_HASH_THRESHOLD,
+  deadline: Deadline | None = None,
+) -> bool:
+  """画面 (または領域) が呼び出し時点から変化するまで待機する。"""
+  baseline = _frame_hash(region)
+
+  def is_changed() -> bool:
+    return hash_distance(_frame_hash(region), baseline) > threshold
+
+  return poll_until(is_changed, timeout, deadline=deadline) is not None
+
+
+@traced("frame_hash", category=SpanCategory.ImageSearch)
+def _frame_hash(region: tuple[int, int, int, int] | None) -> int:
+  if region is None:
+    return perceptual_hash(get_capture_backend().grab(gray=True))
+  origin = get_capture_backend().logical_rect()
+  x, y, width, height = region
+  rect = ScreenRect(x - origin.left, y - origin.top, width, height)
+  return perceptual_hash(get_capture_backend().grab(rect, gray=True))
+
+
+def _find_fresh_window(
+  app_name: str | None = None,
+  title: str | None = None,
+  *,
+  exact_title: bool = True,
+) -> WindowHandle | None:
+  # 待機中は毎回最新のウィンドウ一覧で判定する
+  window_registry.invalidate()
+  return window_registry.find(app_name, title, exact_title=exact_title)
 
 
 def get_active_window_title() -> str | None:
@@ -89,46 +244,45 @@ def get_active_window_title() -> str | None:
   return win.title
 
 
+@traced(app="app_name")
 def active_window(app_name: str) -> None:
   """指定したアプリのウィンドウをアクティブ化する。"""
-  windows = pywinctl.getAllWindows()
-  if len(windows) == 0:
+  global _active_app_name  # noqa: PLW0603
+  _active_app_name = app_name
+  window = get_window(app_name)
+  if window is None:
     return
 
-  for window in windows:
-    if window.getAppName() == app_name:
-      window.moveTo(0, 0)
-      window.activate()
-      return
+  window.move_to(0, 0)
+  window.activate()
 
 
+@traced(app="app_name")
 def resize_window(app_name: str, width: int, height: int) -> None:
   """指定したアプリのウィンドウをリサイズする。"""
-  windows = pywinctl.getAllWindows()
-  if len(windows) == 0:
+  window = get_window(app_name)
+  if window is None:
     return
 
-  for window in windows:
-    if window.getAppName() == app_name:
-      window.resizeTo(width, height)
-      return
+  window.resize_to(width, height)
 
 
 def get_window_size(app_name: str) -> WindowRect | None:
   """指定したアプリのウィンドウサイズを取得する。"""
-  windows = pywinctl.getAllWindows()
-  if len(windows) == 0:
+  window = get_window(app_name)
+  if window is None:
     return None
 
-  for window in windows:
-    if window.getAppName() == app_name:
-      x = window.topleft.x
-      y = window.topleft.y
-      w = window.width
-      h = window.height
-      return WindowRect(x=x, y=y, width=w, height=h)
+  x, y, w, h = window.bounds()
+  return WindowRect(x=x, y=y, width=w, height=h)
+
 
-  return None
+def get_window(app_name: str | None = None, title: str | None = None) -> WindowHandle | None:
+  """アプリ名またはタイトルでウィンドウのハンドルを取得する。
+
+  ハンドルは閉じられるまで使い回せるため、以降の操作でウィンドウを列挙し直す必要はない。
+  """
+  return window_registry.find(app_name, title)
 
 
 def get_display_size() -> tuple[int, int]:
@@ -152,6 +306,7 @@ def set_clipboard(s: str) -> None:
   pyperclip.copy(s)
 
 
+@traced(window="window_name")
 def save_screenshot(
   window_name: str | None,
   file_path: str | None = None,
@@ -162,17 +317,23 @@ def save_screenshot(
     f_path = file_path
 
   if window_name is None:
-    screenshot = pyautogui.screenshot()
+    screenshot = get_capture_backend().grab()
   else:
-    window = pywinctl.getWindowsWithTitle(window_name)[0]
+    window = get_window(title=window_name)
+    if window is None:
+      message = f"指定したウィンドウが見つかりません: {window_name}"
+      raise ValueError(message)
     window.activate()
-    x, y = window.topleft
-    width, height = window.size
-    screenshot = pyautogui.screenshot(region=(x, y, width, height))
+    x, y, width, height = window.bounds()
+    origin = get_capture_backend().logical_rect()
+    region = ScreenRect(x - origin.left, y - origin.top, width, height)
+    screenshot = get_capture_backend().grab(region)
 
-  screenshot.save(f_path)
+  # キャプチャは BGRA のため、アルファチャンネルを除いて保存する
+  cv2.imwrite(f_path, cv2.cvtColor(screenshot, cv2.COLOR_BGRA2BGR))
 
 
+@traced()
 def get_input() -> str:
   """現在の入力フィールドの内容を取得する。"""
   pyautogui.hotkey("command", "a")
@@ -180,6 +341,7 @@ def get_input() -> str:
   return get_clipboard()
 
 
+@traced()
 def set_input(s: str) -> None:
   """現在の入力フィールドに指定した文字列を入力する。"""
   tmp = get_clipboard()
@@ -189,106 +351,212 @@ def set_input(s: str) -> None:
   pyautogui.hotkey("escape")
 
 
+@traced()
 def typewrite(s: str) -> None:
   """指定した文字列をタイピングする(US配列キーボード)"""
   pyautogui.typewrite(s)
 
 
+@traced()
 def delete_input() -> None:
   """現在の入力フィールドの内容を削除する。"""
   pyautogui.hotkey("command", "a")
   pyautogui.press("backspace")
 
 
+@traced()
 def move_to(x: int, y: int) -> None:
   """指定した座標 (x, y) にマウスカーソルを移動する。"""
   if is_smooth:
-    pyautogui.moveTo(x, y, delay_time_sec)
+    with tracer.span("smooth_move", category=SpanCategory.FixedDelay):
+      pyautogui.moveTo(x, y, delay_time_sec)
   else:
     pyautogui.moveTo(x, y)
 
 
+@traced(template="image_path")
 def move_to_with_resize_image(image_path: str, x: int, y: int) -> None:
   """指定した画像をリサイズしてマウスカーソルを移動する。"""
-  image = Image.open(image_path)
-  image = image.resize((x, y), resample=Image.Resampling.NEAREST)
-  is_success = _move_to_image(image)
+  gray = template_store.get(image_path).gray
+  resized = cv2.resize(gray, (x, y), interpolation=cv2.INTER_NEAREST)
+  is_success = _move_to_image(ScaledTemplate(resized), scales=(1.0,))
   print(f"is_success: {is_success}")
 
 
+@traced(template="image_path")
 def move_to_with_image(image_path: str) -> None:
-  """指定した画像にマウスカーソルを移動する。"""
-  image = Image.open(image_path)
-  image_org = image.copy()
-
-  count = 0
-  max_count = 20
-  ratio = 1
-  is_success = _move_to_image(image)
+  """指定した画像にマウスカーソルを移動する。
+
+  画面を 1 回だけキャプチャし、表示倍率から見込んだスケールを先に評価する。
+  見つからなければ同じキャプチャに対して 0.05〜2.0 倍の全スケールを評価する。
+  """
+  is_success = _move_to_image(image_path, scales=None)
   print(f"is_success: {is_success}")
-  while not is_success and count < max_count - 1:
-    count += 1
-    ratio -= 0.05
-    print(f"count: {count}, ratio: {ratio}")
-    image = image.resize(((int)(image_org.width * ratio), (int)(image_org.height * ratio)))
-    is_success = _move_to_image(image)
-    print(f"is_success: {is_success}")
-
-  count = 0
-  ratio = 1
-  while not is_success and count < max_count:
-    count += 1
-    ratio += 0.05
-    print(f"count: {count}, ratio: {ratio}")
-    image = image.resize(((int)(image_org.width * ratio), (int)(image_org.height * ratio)))
-    is_success = _move_to_image(image)
-    print(f"is_success: {is_success}")
-
-
-def _move_to_image(img: Image.Image) -> bool:
-  try:
-    img_location = pyautogui.locateOnScreen(
-      image=img,
-      confidence=0.9,
-    )
-    if img_location is not None:
-      img_x, img_y = pyautogui.center(img_location)
-      # retinaディスプレイだと、2倍の値の座標が取得されるので、1/2する。
-      move_to((int)(img_x / 2), (int)(img_y / 2))
-  except pyautogui.ImageNotFoundException as e:
-    print(e.with_traceback(None))
+
+
+@traced(category=SpanCategory.ImageSearch)
+def locate_all(
+  image_paths: Mapping[str, str],
+  confidence: float = DEFAULT_CONFIDENCE,
+) -> dict[str, tuple[int, int] | None]:
+  """1 回のキャプチャで複数の画像を探し、名前ごとの中心座標を返す。
+
+  見つからなかった画像は None になる。返した座標は move_to にそのまま渡せる。
+  """
+  screen = _capture_gray()
+  matches = _locator.locate_all(
+    image_paths,
+    scales=_preferred_scales(),
+    fallback_scales=DEFAULT_SCALES,
+    confidence=confidence,
+    screen=screen,
+    hint_scope=_hint_scope(),
+  )
+  return {
+    name: None if match is None else _to_screen_point(match) for name, match in matches.items()
+  }
+
+
+def get_capture_backend() -> CaptureBackend:
+  """画面キャプチャのバックエンドを返す。未作成の場合は利用可能な中で最も速いものを作る。"""
+  global capture_backend  # noqa: PLW0603
+  if capture_backend is None:
+    capture_backend = create_capture_backend()
+  return capture_backend
+
+
+def calibrate_display_scale(*, force: bool = False) -> DisplayScale:
+  """キャプチャ対象のモニタについて、実ピクセル数と論理座標から表示倍率を求める。
+
+  結果はモニタの論理座標での矩形ごとにキャッシュし、配置や解像度が変わったときだけ計測し直す。
+  """
+  rect = get_capture_backend().logical_rect()
+  if force or rect not in _display_scales:
+    height, width = get_capture_backend().grab(gray=True).shape[:2]
+    _remember_display_scale((width, height), force=True)
+  return _display_scales[rect]
+
+
+def _move_to_image(template: TemplateSource, scales: tuple[float, ...] | None) -> bool:
+  match = _locate_image(template, scales=scales, confidence=DEFAULT_CONFIDENCE)
+  if match is None:
+    annotate(found=False)
     return False
+  print(f"score: {match.score:.3f}, scale: {match.scale}")
+  annotate(found=True, score=round(match.score, 3), scale=match.scale)
+  move_to(*_to_screen_point(match))
   return True
 
 
+@traced("locate_image", category=SpanCategory.ImageSearch)
+def _locate_image(
+  template: TemplateSource,
+  *,
+  scales: tuple[float, ...] | None,
+  confidence: float,
+  fallback: bool = True,
+) -> MatchResult | None:
+  """画面をキャプチャしてテンプレートを探す。
+
+  `scales` が None の場合は表示倍率から見込んだスケールを先に評価し、
+  見つからず `fallback` が True なら同じキャプチャに対して全スケールを評価する。
+  """
+  screen = _capture_gray()
+  return _locator.locate(
+    template,
+    scales=_preferred_scales() if scales is None else scales,
+    fallback_scales=DEFAULT_SCALES if scales is None and fallback else None,
+    confidence=confidence,
+    screen=screen,
+    hint_scope=_hint_scope(),
+  )
+
+
+def get_location_hint_stats() -> HintStats:
+  """位置ヒントの命中統計を取得する。"""
+  return location_hints.stats
+
+
+def _hint_scope() -> str:
+  """ヒントのキーに使うウィンドウ配置を返す。"""
+  if _active_app_name is None:
+    return "screen"
+  rect = get_window_size(_active_app_name)
+  if rect is None:
+    return _active_app_name
+  return f"{_active_app_name}:{rect.x},{rect.y},{rect.width},{rect.height}"
+
+
+def _preferred_scales() -> tuple[float, ...]:
+  """表示倍率から見込んだテンプレートの倍率とその前後を返す。"""
+  scale = calibrate_display_scale()
+  base = scale.x / (template_display_scale or scale.x)
+  return tuple(round(base * ratio, 2) for ratio in (1.0, 0.95, 1.05))
+
+
+def _to_screen_point(match: MatchResult) -> tuple[int, int]:
+  """スクリーンショット上の座標を pyautogui の論理座標に変換する。"""
+  img_x, img_y = match.center
+  scale = calibrate_display_scale()
+  origin = get_capture_backend().logical_rect()
+  return origin.left + int(img_x / scale.x), origin.top + int(img_y / scale.y)
+
+
+def _remember_display_scale(physical_size: tuple[int, int], *, force: bool = False) -> None:
+  rect = get_capture_backend().logical_rect()
+  if force or rect not in _display_scales:
+    width, height = physical_size
+    _display_scales[rect] = DisplayScale(width / rect.width, height / rect.height)
+
+
+def _capture_gray() -> np.ndarray:
+  screen = get_capture_backend().grab(gray=True)
+  # キャプチャのついでに表示倍率を求めておき、計測用の余分なキャプチャを省く
+  height, width = screen.shape[:2]
+  _remember_display_scale((width, height))
+  return screen
+
+
+_locator = ImageLocator(_capture_gray, template_store, hints=location_hints)
+# locate_all のスレッドプールを、プロセスの終了前に照合を終えてから閉じる
+atexit.register(_locator.close)
+
+
+@traced(button="button")
 def click(button: ButtonType) -> None:
   """指定したボタンでクリック操作を行う。"""
   pyautogui.click(button=button.value)
 
 
+@traced(button="button")
 def double_click(button: ButtonType) -> None:
   """指定したボタンでダブルクリック操作を行う。"""
   pyautogui.doubleClick(button=button.value)
 
 
+@traced(button="button")
 def drag_to(x: int, y: int, button: ButtonType) -> None:
   """指定した座標 (x, y) まで指定したボタンでドラッグ操作を行う。"""
   if is_smooth:
-    pyautogui.dragTo(x, y, delay_time_sec, button=button.value)
+    with tracer.span("smooth_move", category=SpanCategory.FixedDelay):
+      pyautogui.dragTo(x, y, delay_time_sec, button=button.value)
   else:
     pyautogui.dragTo(x, y, button=button.value)
 
 
+@traced()
 def scroll_vertical(y: int) -> None:
   """垂直方向にスクロールする。"""
   pyautogui.vscroll(y)
 
 
+@traced()
 def scroll_horizontal(x: int) -> None:
   """水平方向にスクロールする。"""
   pyautogui.hscroll(x)
 
 
+@traced()
 def execute_command(*args: str) -> None:
   """ショートカットコマンドを実行する。
 
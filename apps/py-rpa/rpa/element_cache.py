@@ -0,0 +1,118 @@
+"""ページごとに要素の種類などのメタデータを覚えておくキャッシュ。
+
+同じページの同じ要素を繰り返し操作するときに、tagName などを毎回ブラウザへ
+問い合わせないために使う。
+ページ (Playwright の Page、Selenium のウィンドウ) をスコープとし、遷移や DOM の置き換えを
+検知したロボットがスコープごと、または要素ごとに無効化する。
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+  from collections.abc import Hashable
+
+
+class ElementInfo(NamedTuple):
+  """要素のメタデータ"""
+
+  tag: str
+  # input 要素の type 属性
+  input_type: str | None
+  # select 要素の (value, 表示テキスト) の一覧
+  options: tuple[tuple[str, str], ...]
+
+  @classmethod
+  def from_probe(cls, data: dict[str, Any]) -> ElementInfo:
+    """ELEMENT_INFO_SCRIPT の結果から作る。"""
+    options = tuple((value, label) for value, label in data.get("options") or ())
+    return cls(data["tag"], data.get("type"), options)
+
+  def option_value(self, value: str) -> str | None:
+    """表示テキスト、なければ value が一致する option の value を返す。"""
+    for option_value, label in self.options:
+      if label == value:
+        return option_value
+    for option_value, _ in self.options:
+      if option_value == value:
+        return option_value
+    return None
+
+
+class ElementCacheStats(NamedTuple):
+  """キャッシュの命中統計"""
+
+  hits: int
+  misses: int
+
+
+class ElementCache[T]:
+  """スコープ (ページ) ごとに、要素 ID → (ハンドル, メタデータ) を保持する。
+
+  ロボットを複数のスレッドから使う場合でも件数や統計が壊れないよう、すべての操作をロックで守る。
+  """
+
+  def __init__(self) -> None:
+    self._scopes: dict[Hashable, dict[str, tuple[T, ElementInfo]]] = {}
+    self._hits = 0
+    self._misses = 0
+    self._lock = threading.Lock()
+
+  def add_scope(self, scope: Hashable) -> bool:
+    """スコープを作成する。新しく作成した場合は True を返す。"""
+    with self._lock:
+      if scope in self._scopes:
+        return False
+      self._scopes[scope] = {}
+      return True
+
+  def get(self, scope: Hashable, attr_id: str) -> tuple[T, ElementInfo] | None:
+    """キャッシュしたハンドルとメタデータを返す。"""
+    with self._lock:
+      entry = self._scopes.get(scope, {}).get(attr_id)
+      if entry is None:
+        self._misses += 1
+      else:
+        self._hits += 1
+      return entry
+
+  def put(self, scope: Hashable, attr_id: str, handle: T, info: ElementInfo) -> None:
+    """ハンドルとメタデータを登録する。"""
+    with self._lock:
+      self._scopes.setdefault(scope, {})[attr_id] = (handle, info)
+
+  def invalidate(self, scope: Hashable, attr_id: str | None = None) -> None:
+    """スコープ内の要素 (`attr_id` が None の場合はすべて) を無効化する。"""
+    with self._lock:
+      entries = self._scopes.get(scope)
+      if entries is None:
+        return
+      if attr_id is None:
+        entries.clear()
+      else:
+        entries.pop(attr_id, None)
+
+  def drop(self, scope: Hashable) -> None:
+    """スコープを削除する。"""
+    with self._lock:
+      self._scopes.pop(scope, None)
+
+  def clear(self) -> None:
+    """すべてのスコープを削除する。"""
+    with self._lock:
+      self._scopes.clear()
+
+  @property
+  def stats(self) -> ElementCacheStats:
+    """命中統計を返す。"""
+    with self._lock:
+      return ElementCacheStats(self._hits, self._misses)
+
+
+__all__ = [
+  "ElementCache",
+  "ElementCacheStats",
+  "ElementInfo",
+]
@@ -0,0 +1,148 @@
+"""ブラウザ内で実行するフォーム操作・待機用の JavaScript。
+
+Playwright では `page.evaluate(SCRIPT, arg)`、Selenium では
+`driver.execute_script(as_selenium_script(SCRIPT), arg)` で実行する。
+"""
+
+# {id: 値} の各要素に値を設定し、input / change イベントを発火する。
+# React などの制御コンポーネントにも反映されるよう、プロトタイプの value setter を使う。
+# select はラベル (表示テキスト) で一致する option を優先し、なければ value で探す。
+# checkbox / radio は checked を設定する。"true"・"on"・"1"・"checked" またはその要素の value で
+# チェックし、"false"・"off"・"0"・"" で外す。それ以外の値は設定できなかったものとして扱う。
+# 戻り値は値を設定できなかった要素の id の配列。
+FILL_FORM_SCRIPT = """
+(values) => {
+  const missing = [];
+  const CHECKED = ["true", "on", "1", "checked"];
+  const UNCHECKED = ["false", "off", "0", ""];
+  const setProperty = (el, name, value) => {
+    const descriptor = Object.getOwnPropertyDescriptor(Object.getPrototypeOf(el), name);
+    if (descriptor && descriptor.set) {
+      descriptor.set.call(el, value);
+    } else {
+      el[name] = value;
+    }
+  };
+  const toChecked = (el, value) => {
+    const text = String(value).toLowerCase();
+    if (CHECKED.includes(text) || value === el.value) {
+      return true;
+    }
+    return UNCHECKED.includes(text) ? false : null;
+  };
+  for (const [id, value] of Object.entries(values)) {
+    const el = document.getElementById(id);
+    if (el === null) {
+      missing.push(id);
+      continue;
+    }
+    const tag = el.tagName.toLowerCase();
+    if (tag === "select") {
+      const options = Array.from(el.options);
+      const option =
+        options.find((o) => o.label === value || o.text === value) ??
+        options.find((o) => o.value === value);
+      if (option === undefined) {
+        missing.push(id);
+        continue;
+      }
+      setProperty(el, "value", option.value);
+    } else if (tag === "input" && (el.type === "checkbox" || el.type === "radio")) {
+      const checked = toChecked(el, value);
+      if (checked === null) {
+        missing.push(id);
+        continue;
+      }
+      setProperty(el, "checked", checked);
+    } else if (tag === "input" || tag === "textarea") {
+      setProperty(el, "value", value);
+    } else if (el.isContentEditable) {
+      el.textContent = value;
+    } else {
+      missing.push(id);
+      continue;
+    }
+    el.dispatchEvent(new Event("input", { bubbles: true }));
+    el.dispatchEvent(new Event("change", { bubbles: true }));
+  }
+  return missing;
+}
+"""
+
+# {ids, textProperty, trimText} を受け取り、{id: 値} を返す。見つからない要素は null。
+# input / textarea は value、select は選択中の option の表示テキスト (空なら value)、
+# それ以外は textProperty (textContent または innerText) の値を返す。
+# trimText が true の場合、表示テキストの前後の空白を取り除く。
+GET_VALUES_SCRIPT = """
+({ ids, textProperty, trimText }) => {
+  const result = {};
+  const textOf = (el) => {
+    const text = el[textProperty] ?? "";
+    return trimText ? text.trim() : text;
+  };
+  for (const id of ids) {
+    const el = document.getElementById(id);
+    if (el === null) {
+      result[id] = null;
+      continue;
+    }
+    const tag = el.tagName.toLowerCase();
+    if (tag === "input" || tag === "textarea") {
+      result[id] = el.value;
+    } else if (tag === "select") {
+      const option = el.selectedOptions[0];
+      const text = option === undefined ? "" : textOf(option);
+      result[id] = text ? text : el.value;
+    } else {
+      result[id] = textOf(el);
+    }
+  }
+  return result;
+}
+"""
+
+# 要素を受け取り、{tag, type, options} を返す。options は select の [value, 表示テキスト] の配列。
+ELEMENT_INFO_SCRIPT = """
+(el) => ({
+  tag: el.tagName.toLowerCase(),
+  type: el.tagName === "INPUT" ? el.type : null,
+  options: el.tagName === "SELECT" ? Array.from(el.options, (o) => [o.value, o.label]) : null,
+})
+"""
+
+# DOM の変更が quietMs の間止まったら true、timeoutMs を過ぎたら false を返す
+DOM_QUIET_SCRIPT = """
+([quietMs, timeoutMs]) => new Promise((resolve) => {
+  let quietTimer = null;
+  let limitTimer = null;
+  const observer = new MutationObserver(() => {
+    clearTimeout(quietTimer);
+    quietTimer = setTimeout(done, quietMs, true);
+  });
+  function done(result) {
+    observer.disconnect();
+    clearTimeout(quietTimer);
+    clearTimeout(limitTimer);
+    resolve(result);
+  }
+  observer.observe(document, {
+    subtree: true, childList: true, attributes: true, characterData: true,
+  });
+  quietTimer = setTimeout(done, quietMs, true);
+  limitTimer = setTimeout(done, timeoutMs, false);
+})
+"""
+
+
+def as_selenium_script(script: str) -> str:
+  """関数式のスクリプトを、arguments[0] を渡して結果を返す Selenium 用の形に変換する。"""
+  return f"return ({script.strip()})(arguments[0]);"
+
+
+__all__ = [
+  "DOM_QUIET_SCRIPT",
+  "ELEMENT_INFO_SCRIPT",
+  "FILL_FORM_SCRIPT",
+  "GET_VALUES_SCRIPT",
+  "as_selenium_script",
+]
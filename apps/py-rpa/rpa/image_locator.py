@@ -0,0 +1,191 @@
+"""画面キャプチャとテンプレートマッチングを組み合わせて画像を探すモジュール。"""
+
+from __future__ import annotations
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from rpa.image_matcher import (
+  DEFAULT_CONFIDENCE,
+  DEFAULT_SCALES,
+  MatchResult,
+  ScaledTemplate,
+  find_best_match,
+)
+from rpa.location_hints import LocationHint
+
+if TYPE_CHECKING:
+  from collections.abc import Callable, Mapping, Sequence
+
+  import numpy as np
+
+  from rpa.location_hints import LocationHintCache
+  from rpa.template_store import TemplateStore
+
+TemplateSource = str | Path | ScaledTemplate
+
+
+class ImageLocator:
+  """1 回のキャプチャに対して 1 つまたは複数のテンプレートを探すクラス。
+
+  `capture` はグレースケールの画面配列を返す関数。
+  OpenCV のマッチング中は GIL が解放されるため、複数テンプレートはスレッドプールで並列に探す。
+  `hints` を指定すると、前回の一致位置の周辺を先に探し、外れた場合だけ画面全体を探す。
+  """
+
+  def __init__(
+    self,
+    capture: Callable[[], np.ndarray],
+    store: TemplateStore,
+    *,
+    hints: LocationHintCache | None = None,
+    max_workers: int | None = None,
+  ) -> None:
+    self.capture = capture
+    self.store = store
+    self.hints = hints
+    self._max_workers = max_workers
+    self._executor: ThreadPoolExecutor | None = None
+
+  def locate(  # noqa: PLR0913
+    self,
+    template: TemplateSource,
+    *,
+    scales: Sequence[float] = DEFAULT_SCALES,
+    fallback_scales: Sequence[float] | None = None,
+    confidence: float = DEFAULT_CONFIDENCE,
+    screen: np.ndarray | None = None,
+    hint_scope: str | None = None,
+  ) -> MatchResult | None:
+    """画面からテンプレートを探す。`screen` を省略した場合はキャプチャする。
+
+    `scales` で見つからなければ、同じキャプチャに対して `fallback_scales` で探し直す。
+    `hint_scope` はウィンドウ配置などを表す文字列で、ヒントのキーの一部になる。
+    """
+    if screen is None:
+      screen = self.capture()
+    scaled = self._resolve(template)
+    key = self._hint_key(template, hint_scope, screen)
+    if self.hints is None or key is None:
+      return _search(screen, scaled, scales, fallback_scales, confidence)
+
+    hint = self.hints.lookup(key)
+    if hint is not None:
+      match = self._locate_near(screen, scaled, hint, confidence)
+      if match is not None:
+        self.hints.record(key, _to_hint(match), hit=True)
+        return match
+
+    match = _search(screen, scaled, scales, fallback_scales, confidence)
+    if match is None:
+      self.hints.record_miss(key, cold=hint is None)
+    else:
+      self.hints.record(key, _to_hint(match), hit=False, cold=hint is None)
+    return match
+
+  def locate_all(  # noqa: PLR0913
+    self,
+    templates: Mapping[str, TemplateSource],
+    *,
+    scales: Sequence[float] = DEFAULT_SCALES,
+    fallback_scales: Sequence[float] | None = None,
+    confidence: float = DEFAULT_CONFIDENCE,
+    screen: np.ndarray | None = None,
+    hint_scope: str | None = None,
+  ) -> dict[str, MatchResult | None]:
+    """1 回のキャプチャで複数のテンプレートを探し、名前ごとの結果を返す。"""
+    if len(templates) == 0:
+      return {}
+    if screen is None:
+      screen = self.capture()
+    executor = self._ensure_executor()
+    # 呼び出し元のスパンを親として引き継ぐため、コンテキストをコピーして実行する
+    futures = {
+      name: executor.submit(
+        contextvars.copy_context().run,
+        self.locate,
+        template,
+        scales=scales,
+        fallback_scales=fallback_scales,
+        confidence=confidence,
+        screen=screen,
+        hint_scope=hint_scope,
+      )
+      for name, template in templates.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+  def close(self) -> None:
+    """スレッドプールを終了する。実行中の照合が終わるまで待つ。"""
+    if self._executor is not None:
+      self._executor.shutdown(wait=True)
+      self._executor = None
+
+  def _resolve(self, template: TemplateSource) -> ScaledTemplate:
+    if isinstance(template, ScaledTemplate):
+      return template
+    return self.store.get(template)
+
+  def _hint_key(
+    self,
+    template: TemplateSource,
+    hint_scope: str | None,
+    screen: np.ndarray,
+  ) -> str | None:
+    # リサイズ済みなど、パスを持たないテンプレートはヒントの対象外
+    if self.hints is None or hint_scope is None or isinstance(template, ScaledTemplate):
+      return None
+    template_id = str(Path(template).expanduser().resolve())
+    height, width = screen.shape[:2]
+    return self.hints.make_key(template_id, f"{hint_scope}@{width}x{height}")
+
+  def _locate_near(
+    self,
+    screen: np.ndarray,
+    template: ScaledTemplate,
+    hint: LocationHint,
+    confidence: float,
+  ) -> MatchResult | None:
+    if self.hints is None:
+      return None
+    height, width = screen.shape[:2]
+    left, top, right, bottom = self.hints.region(hint, (width, height))
+    roi = screen[top:bottom, left:right]
+    match = find_best_match(roi, template, scales=(hint.scale,), confidence=confidence)
+    if match is None:
+      return None
+    return match._replace(x=match.x + left, y=match.y + top)
+
+  def _ensure_executor(self) -> ThreadPoolExecutor:
+    if self._executor is None:
+      self._executor = ThreadPoolExecutor(
+        max_workers=self._max_workers,
+        thread_name_prefix="image-locator",
+      )
+    return self._executor
+
+
+def _search(
+  screen: np.ndarray,
+  template: ScaledTemplate,
+  scales: Sequence[float],
+  fallback_scales: Sequence[float] | None,
+  confidence: float,
+) -> MatchResult | None:
+  match = find_best_match(screen, template, scales=scales, confidence=confidence)
+  if match is not None or fallback_scales is None:
+    return match
+  remaining = [scale for scale in fallback_scales if scale not in scales]
+  return find_best_match(screen, template, scales=remaining, confidence=confidence)
+
+
+def _to_hint(match: MatchResult) -> LocationHint:
+  return LocationHint(match.x, match.y, match.width, match.height, match.scale)
+
+
+__all__ = [
+  "ImageLocator",
+  "TemplateSource",
+]
@@ -0,0 +1,263 @@
+"""OpenCV を利用したマルチスケールテンプレートマッチングモジュール。
+
+1 回のキャプチャから作ったグレースケール画像ピラミッドに対して、
+候補となる全スケールのテンプレートをまとめて評価する。
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, NamedTuple
+
+import cv2
+import numpy as np
+
+if TYPE_CHECKING:
+  from collections.abc import Sequence
+
+  from PIL import Image
+
+DEFAULT_CONFIDENCE = 0.9
+
+# move_to_with_image の旧実装と同じ探索順 (1.0 → 0.05 → 1.05 → 2.0)
+DEFAULT_SCALES: tuple[float, ...] = (
+  1.0,
+  *(round(1 - 0.05 * i, 2) for i in range(1, 20)),
+  *(round(1 + 0.05 * i, 2) for i in range(1, 21)),
+)
+
+# 画像ピラミッドの最も粗いレベルの長辺の目安ピクセル数
+PYRAMID_MIN_SIDE = 480
+# 粗いレベルで評価するときにテンプレートの短辺が保つべきピクセル数
+COARSE_MIN_SIDE = 10
+# 辺の長さがこのピクセル数未満になるテンプレートは評価しない
+MIN_TEMPLATE_SIDE = 8
+# 粗いレベルの上位何候補を原寸で再評価するか
+REFINE_TOP_K = 3
+# 画面の変化検出に使う差分ハッシュの一辺のサイズ
+DEFAULT_HASH_SIZE = 16
+
+
+class MatchResult(NamedTuple):
+  """テンプレートマッチングの結果 (画面のピクセル座標)"""
+
+  x: int
+  y: int
+  width: int
+  height: int
+  score: float
+  scale: float
+
+  @property
+  def center(self) -> tuple[int, int]:
+    """一致領域の中心座標を返す。"""
+    return self.x + self.width // 2, self.y + self.height // 2
+
+
+def to_gray(image: Image.Image | np.ndarray) -> np.ndarray:
+  """PIL 画像または RGB/RGBA 配列を uint8 のグレースケール配列に変換する。"""
+  array = np.asarray(image)
+  if array.ndim == 2:  # noqa: PLR2004
+    return np.ascontiguousarray(array, dtype=np.uint8)
+  if array.shape[2] == 4:  # noqa: PLR2004
+    return cv2.cvtColor(array, cv2.COLOR_RGBA2GRAY)
+  return cv2.cvtColor(array, cv2.COLOR_RGB2GRAY)
+
+
+def resize_template(template: np.ndarray, scale: float) -> np.ndarray | None:
+  """テンプレートを指定倍率に縮小・拡大する。小さすぎる場合は None を返す。"""
+  height, width = template.shape[:2]
+  new_w = int(width * scale)
+  new_h = int(height * scale)
+  if min(new_w, new_h) < MIN_TEMPLATE_SIDE:
+    return None
+  if new_w == width and new_h == height:
+    return template
+  interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+  return cv2.resize(template, (new_w, new_h), interpolation=interpolation)
+
+
+class ScaledTemplate:
+  """グレースケールのテンプレートと、倍率ごとのリサイズ結果のキャッシュ。
+
+  ImageLocator.locate_all のスレッドから同じテンプレートが同時に使われるため、
+  キャッシュの参照と登録はロックの内側で行う。
+  """
+
+  def __init__(self, gray: np.ndarray) -> None:
+    self.gray = gray
+    self._scaled: dict[float, np.ndarray | None] = {}
+    self._lock = threading.Lock()
+
+  @property
+  def shape(self) -> tuple[int, ...]:
+    """元画像の形状を返す。"""
+    return self.gray.shape
+
+  def at(self, scale: float) -> np.ndarray | None:
+    """指定倍率のテンプレートを返す。一度作ったものは使い回す。"""
+    key = round(scale, 6)
+    with self._lock:
+      if key in self._scaled:
+        return self._scaled[key]
+    # リサイズはロックの外で行う。競合した場合は先に登録された結果を使う
+    scaled = resize_template(self.gray, key)
+    with self._lock:
+      return self._scaled.setdefault(key, scaled)
+
+
+def perceptual_hash(gray: np.ndarray, hash_size: int = DEFAULT_HASH_SIZE) -> int:
+  """縮小したグレースケール画像の隣接画素の大小から差分ハッシュ (dHash) を求める。"""
+  small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+  bits = (small[:, 1:] > small[:, :-1]).flatten()
+  return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hash_distance(a: int, b: int) -> int:
+  """2 つのハッシュのハミング距離を返す。"""
+  return (a ^ b).bit_count()
+
+
+def find_best_match(
+  screen: np.ndarray,
+  template: np.ndarray | ScaledTemplate,
+  *,
+  scales: Sequence[float] = DEFAULT_SCALES,
+  confidence: float = DEFAULT_CONFIDENCE,
+) -> MatchResult | None:
+  """画面から最も一致度の高い位置とスケールを探す。
+
+  画面の画像ピラミッドを作り、各スケールをテンプレートが潰れない範囲で
+  最も粗いレベルで評価する。上位の候補だけを原寸画面の周辺領域で再評価する。
+  `confidence` 未満の場合は None を返す。
+  """
+  if not isinstance(template, ScaledTemplate):
+    template = ScaledTemplate(template)
+  pyramid = build_pyramid(screen)
+  min_side = min(template.shape[:2])
+
+  candidates: list[_Candidate] = []
+  coarse: list[tuple[_Candidate, int]] = []
+  for scale in scales:
+    level = _select_level(pyramid, min_side * scale)
+    candidate = _score(pyramid[level], template, scale, factor=0.5**level)
+    if candidate is None:
+      continue
+    if level == 0:
+      candidates.append(candidate)
+    else:
+      coarse.append((candidate, level))
+
+  coarse.sort(reverse=True)
+  for candidate, level in coarse[:REFINE_TOP_K]:
+    refined = _refine(screen, template, candidate, factor=0.5**level)
+    if refined is not None:
+      candidates.append(refined)
+  return _to_result(max(candidates, default=None), confidence)
+
+
+def build_pyramid(screen: np.ndarray) -> list[np.ndarray]:
+  """画面を 1/2 ずつ縮小した画像ピラミッドを作る。先頭が原寸。"""
+  pyramid = [screen]
+  while max(pyramid[-1].shape[:2]) > PYRAMID_MIN_SIDE * 2:
+    pyramid.append(cv2.pyrDown(pyramid[-1]))
+  return pyramid
+
+
+class _Candidate(NamedTuple):
+  score: float
+  scale: float
+  x: int
+  y: int
+  width: int
+  height: int
+
+
+def _select_level(pyramid: list[np.ndarray], template_side: float) -> int:
+  """テンプレートが COARSE_MIN_SIDE 以上を保てる最も粗いレベルを返す。"""
+  level = 0
+  while level + 1 < len(pyramid) and template_side * 0.5 ** (level + 1) >= COARSE_MIN_SIDE:
+    level += 1
+  return level
+
+
+def _score(
+  screen: np.ndarray,
+  template: ScaledTemplate,
+  scale: float,
+  *,
+  factor: float,
+) -> _Candidate | None:
+  scaled = template.at(scale * factor)
+  if scaled is None:
+    return None
+  height, width = scaled.shape[:2]
+  if width > screen.shape[1] or height > screen.shape[0]:
+    return None
+  score, (x, y) = _match(screen, scaled)
+  return _Candidate(score, scale, x, y, width, height)
+
+
+def _refine(
+  screen: np.ndarray,
+  template: ScaledTemplate,
+  candidate: _Candidate,
+  *,
+  factor: float,
+) -> _Candidate | None:
+  """粗いレベルの候補位置の周辺だけを原寸で再評価する。"""
+  scaled = template.at(candidate.scale)
+  if scaled is None:
+    return None
+  height, width = scaled.shape[:2]
+  screen_h, screen_w = screen.shape[:2]
+  if width > screen_w or height > screen_h:
+    return None
+
+  margin = int(2 / factor) + 2
+  left = max(0, int(candidate.x / factor) - margin)
+  top = max(0, int(candidate.y / factor) - margin)
+  right = min(screen_w, int(candidate.x / factor) + width + margin)
+  bottom = min(screen_h, int(candidate.y / factor) + height + margin)
+  roi = screen[top:bottom, left:right]
+  if roi.shape[0] < height or roi.shape[1] < width:
+    return None
+
+  score, (x, y) = _match(roi, scaled)
+  return _Candidate(score, candidate.scale, left + x, top + y, width, height)
+
+
+def _match(screen: np.ndarray, template: np.ndarray) -> tuple[float, tuple[int, int]]:
+  result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+  # 無地のテンプレートでは NaN/inf になるため 0 に丸める
+  np.nan_to_num(result, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+  _, max_val, _, max_loc = cv2.minMaxLoc(result)
+  return float(max_val), max_loc
+
+
+def _to_result(candidate: _Candidate | None, confidence: float) -> MatchResult | None:
+  if candidate is None or candidate.score < confidence:
+    return None
+  return MatchResult(
+    x=candidate.x,
+    y=candidate.y,
+    width=candidate.width,
+    height=candidate.height,
+    score=candidate.score,
+    scale=candidate.scale,
+  )
+
+
+__all__ = [
+  "DEFAULT_CONFIDENCE",
+  "DEFAULT_HASH_SIZE",
+  "DEFAULT_SCALES",
+  "MatchResult",
+  "ScaledTemplate",
+  "build_pyramid",
+  "find_best_match",
+  "hash_distance",
+  "perceptual_hash",
+  "resize_template",
+  "to_gray",
+]
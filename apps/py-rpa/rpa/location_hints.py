@@ -0,0 +1,154 @@
+"""前回見つかった位置を覚えておき、次回はその周辺から探すためのキャッシュ。"""
+
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+DEFAULT_MARGIN = 120
+
+
+class LocationHint(NamedTuple):
+  """前回の一致位置 (画面のピクセル座標) とスケール"""
+
+  x: int
+  y: int
+  width: int
+  height: int
+  scale: float
+
+
+class HintStats(NamedTuple):
+  """ヒントの命中統計"""
+
+  hits: int
+  misses: int
+  # ヒントがなく画面全体を探した回数。命中率には含めない
+  cold: int = 0
+
+  @property
+  def hit_rate(self) -> float:
+    """ヒントがあった探索のうち、ヒントの周辺で見つかった割合を返す。"""
+    total = self.hits + self.misses
+    return self.hits / total if total > 0 else 0.0
+
+
+class LocationHintCache:
+  """テンプレートとウィンドウ配置ごとに前回の一致位置を保持するキャッシュ。
+
+  `load` でファイルを指定すると、`save` または `close` で内容を保存して次回の実行に引き継ぐ。
+  rpa.desktop_robot の location_hints はプロセス終了時に close する。
+  """
+
+  def __init__(self, margin: int = DEFAULT_MARGIN) -> None:
+    self.margin = margin
+    self.path: Path | None = None
+    self._hints: dict[str, LocationHint] = {}
+    self._hits = 0
+    self._misses = 0
+    self._cold = 0
+    self._dirty = False
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def make_key(template_id: str, scope: str) -> str:
+    """テンプレートと配置情報からキーを作る。"""
+    return f"{template_id}@{scope}"
+
+  def load(self, path: str | Path) -> None:
+    """保存先を設定し、既存のヒントがあれば読み込む。"""
+    self.path = Path(path).expanduser()
+    if not self.path.exists():
+      return
+    data = json.loads(self.path.read_text(encoding="utf-8"))
+    with self._lock:
+      self._hints.update({key: LocationHint(*value) for key, value in data.items()})
+
+  def save(self) -> None:
+    """変更があれば保存先に書き出す。途中で中断しても壊れないよう、一時ファイル経由で置き換える。"""
+    with self._lock:
+      if self.path is None or not self._dirty:
+        return
+      data = {key: list(hint) for key, hint in self._hints.items()}
+      self._dirty = False
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+      json.dump(data, file, ensure_ascii=False, indent=2)
+    Path(tmp_path).replace(self.path)
+
+  def close(self) -> None:
+    """変更を保存する。"""
+    self.save()
+
+  def lookup(self, key: str) -> LocationHint | None:
+    """前回の一致位置を返す。"""
+    with self._lock:
+      return self._hints.get(key)
+
+  def region(self, hint: LocationHint, screen_size: tuple[int, int]) -> tuple[int, int, int, int]:
+    """ヒントの周辺の探索領域 (left, top, right, bottom) を画面内に収めて返す。"""
+    width, height = screen_size
+    return (
+      max(0, hint.x - self.margin),
+      max(0, hint.y - self.margin),
+      min(width, hint.x + hint.width + self.margin),
+      min(height, hint.y + hint.height + self.margin),
+    )
+
+  def record(self, key: str, hint: LocationHint, *, hit: bool, cold: bool = False) -> None:
+    """一致位置を記録し、ヒントが命中したかどうかを集計する。
+
+    `cold` はヒントがないまま画面全体を探したことを表し、命中にも外れにも数えない。
+    """
+    with self._lock:
+      if cold:
+        self._cold += 1
+      elif hit:
+        self._hits += 1
+      else:
+        self._misses += 1
+      if self._hints.get(key) != hint:
+        self._hints[key] = hint
+        self._dirty = True
+
+  def record_miss(self, key: str, *, cold: bool = False) -> None:
+    """見つからなかったことを集計し、古いヒントを破棄する。"""
+    with self._lock:
+      if cold:
+        self._cold += 1
+      else:
+        self._misses += 1
+      if self._hints.pop(key, None) is not None:
+        self._dirty = True
+
+  @property
+  def stats(self) -> HintStats:
+    """命中統計を返す。"""
+    with self._lock:
+      return HintStats(hits=self._hits, misses=self._misses, cold=self._cold)
+
+  def reset_stats(self) -> None:
+    """命中統計をリセットする。"""
+    with self._lock:
+      self._hits = 0
+      self._misses = 0
+      self._cold = 0
+
+  def clear(self) -> None:
+    """すべてのヒントを破棄する。"""
+    with self._lock:
+      self._dirty = self._dirty or len(self._hints) > 0
+      self._hints.clear()
+
+
+__all__ = [
+  "DEFAULT_MARGIN",
+  "HintStats",
+  "LocationHint",
+  "LocationHintCache",
+]
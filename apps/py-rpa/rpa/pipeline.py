@@ -0,0 +1,185 @@
+"""入力データを 1 件ずつ処理し、中断しても続きから再開できるようにするモジュール。
+
+結果は JSONL ファイルに 1 行ずつ追記し、チェックポイントには次に処理するデータの番号と、
+その時点の結果ファイルの長さを記録する。再開時は結果ファイルをその長さに切り詰めてから続きを処理するため、
+チェックポイントの更新前に中断したデータは結果ファイルに重複せず、もう一度処理される。
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple, TypedDict
+
+if TYPE_CHECKING:
+  from collections.abc import Callable, Iterable
+
+CHECKPOINT_SUFFIX = ".checkpoint"
+
+
+class CheckpointState(TypedDict):
+  """チェックポイントの内容"""
+
+  next_index: int
+  sink_offset: int
+
+
+class PipelineReport(NamedTuple):
+  """処理結果の集計"""
+
+  # 前回までに完了していたため読み飛ばした件数
+  skipped: int
+  succeeded: int
+  failed: int
+  elapsed_sec: float
+
+  @property
+  def processed(self) -> int:
+    """今回処理した件数を返す。"""
+    return self.succeeded + self.failed
+
+  @property
+  def throughput(self) -> float:
+    """1 秒あたりの処理件数を返す。"""
+    if self.elapsed_sec <= 0:
+      return 0.0
+    return self.processed / self.elapsed_sec
+
+  def summary(self) -> str:
+    """集計結果を 1 行の文字列で返す。"""
+    return (
+      f"skipped={self.skipped} succeeded={self.succeeded} failed={self.failed} "
+      f"elapsed={self.elapsed_sec:.1f}s throughput={self.throughput:.2f}/s"
+    )
+
+
+class Checkpoint:
+  """次に処理するデータの番号を、一時ファイル経由の置き換えで保存する。"""
+
+  def __init__(self, path: str | Path) -> None:
+    self.path = Path(path)
+
+  def load(self) -> CheckpointState:
+    """保存した状態を返す。存在しない場合は先頭からの状態を返す。"""
+    try:
+      data = json.loads(self.path.read_text(encoding="utf-8"))
+      return CheckpointState(
+        next_index=int(data["next_index"]),
+        sink_offset=int(data["sink_offset"]),
+      )
+    except FileNotFoundError:
+      return CheckpointState(next_index=0, sink_offset=0)
+
+  def save(self, state: CheckpointState) -> None:
+    """状態を保存する。"""
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+      json.dump(state, file)
+      file.flush()
+      os.fsync(file.fileno())
+    Path(tmp_path).replace(self.path)
+
+  def clear(self) -> None:
+    """チェックポイントを削除する。"""
+    self.path.unlink(missing_ok=True)
+
+
+class JsonlSink:
+  """結果を JSONL ファイルに 1 行ずつ追記する。"""
+
+  def __init__(self, path: str | Path, *, durable: bool = True) -> None:
+    self.path = Path(path)
+    self.durable = durable
+    self._file: Any = None
+
+  def open(self, offset: int) -> None:
+    """`offset` バイトより後ろ (未確定の結果) を切り詰めて追記用に開く。"""
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    self._file = self.path.open("ab")
+    self._file.truncate(offset)
+
+  def write(self, record: dict[str, Any]) -> int:
+    """1 件追記し、追記後のファイルの長さを返す。"""
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    self._file.write(line.encode("utf-8"))
+    self._file.flush()
+    if self.durable:
+      os.fsync(self._file.fileno())
+    return self._file.tell()
+
+  def close(self) -> None:
+    """ファイルを閉じる。"""
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+
+
+def run_pipeline[R, T](  # noqa: PLR0913
+  robot: R,
+  rows: Iterable[T],
+  flow: Callable[[R, T], Any],
+  *,
+  output_path: str | Path,
+  checkpoint_path: str | Path | None = None,
+  durable: bool = True,
+) -> PipelineReport:
+  """`rows` を 1 件ずつ `flow(robot, row)` で処理し、結果を `output_path` に追記する。
+
+  `rows` はジェネレータのまま 1 件ずつ読み出し、前回完了した件数分は処理せずに読み飛ばす。
+  `flow` が例外を送出したデータは失敗として記録して次へ進む。
+  チェックポイントは既定で `output_path` に ".checkpoint" を付けたパスに保存する。
+  """
+  started = time.perf_counter()
+  output_path = Path(output_path)
+  checkpoint = Checkpoint(
+    checkpoint_path or output_path.with_name(output_path.name + CHECKPOINT_SUFFIX),
+  )
+  state = checkpoint.load()
+  skipped = state["next_index"]
+  succeeded = failed = 0
+
+  sink = JsonlSink(output_path, durable=durable)
+  sink.open(state["sink_offset"])
+  try:
+    for index, row in enumerate(itertools.islice(rows, skipped, None), start=skipped):
+      row_started = time.perf_counter()
+      try:
+        value = flow(robot, row)
+      except Exception as exc:  # noqa: BLE001
+        error: str | None = f"{type(exc).__name__}: {exc}"
+        value = None
+        failed += 1
+        print(f"#{index} failed: {error}")
+      else:
+        error = None
+        succeeded += 1
+      offset = sink.write(
+        {
+          "index": index,
+          "ok": error is None,
+          "error": error,
+          "value": value,
+          "elapsed_sec": round(time.perf_counter() - row_started, 6),
+          "row": row,
+        },
+      )
+      checkpoint.save(CheckpointState(next_index=index + 1, sink_offset=offset))
+  finally:
+    sink.close()
+
+  return PipelineReport(skipped, succeeded, failed, time.perf_counter() - started)
+
+
+__all__ = [
+  "CHECKPOINT_SUFFIX",
+  "Checkpoint",
+  "CheckpointState",
+  "JsonlSink",
+  "PipelineReport",
+  "run_pipeline",
+]
@@ -0,0 +1,261 @@
+"""Playwright の同期版・asyncio 版ロボットで共有する設定・状態・補助処理。
+
+Playwright の呼び出しそのもの (同期か await か) だけを各ロボットに残し、
+待機結果の記録、キャッシュ・ルーティングの状態、ブラウザ種別の解決などはここにまとめる。
+"""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from enum import Enum
+from typing import TYPE_CHECKING, Any, NamedTuple, TypedDict
+
+from rpa.element_cache import ElementCache, ElementCacheStats
+from rpa.route_profiles import RouteInterceptor, RouteProfile, RouteStats
+from rpa.session_store import SessionStore
+from rpa.tracing import annotate
+
+if TYPE_CHECKING:
+  from collections.abc import Mapping
+
+  from playwright.async_api import Frame as AsyncFrame  # type: ignore[import-untyped]
+  from playwright.async_api import Page as AsyncPage  # type: ignore[import-untyped]
+  from playwright.sync_api import Frame as SyncFrame  # type: ignore[import-untyped]
+  from playwright.sync_api import Page as SyncPage  # type: ignore[import-untyped]
+
+DEFAULT_DELAY_TIME_SEC = 0.5
+DEFAULT_WAIT_TIMEOUT_SEC = 5.0
+DEFAULT_DOM_QUIET_MS = 100
+MAX_WAIT_REPORTS = 1000
+
+# 現在位置からの相対量でスクロールする。位置の取得とスクロールを 1 回の実行で済ませる
+SCROLL_BY_SCRIPT = (
+  "([deltaX, deltaY]) => window.scrollTo(window.pageXOffset + deltaX, window.pageYOffset + deltaY)"
+)
+SCROLL_POSITION_SCRIPT = "() => [window.pageXOffset, window.pageYOffset]"
+
+
+class BrowserType(Enum):
+  """ブラウザタイプ"""
+
+  Edge = "msedge"
+  Chrome = "chrome"
+  Safari = "webkit"
+  FireFox = "firefox"
+
+
+class WaitPolicy(Enum):
+  """操作後の待機方法"""
+
+  # 常に delay_time_sec だけ待つ
+  Fixed = "fixed"
+  # wait_signals の状態になるまで待ち、タイムアウトした場合だけ delay_time_sec 待つ
+  Auto = "auto"
+
+
+class WaitSignal(Enum):
+  """Auto 待機で待つページの状態"""
+
+  Load = "load"
+  DomContentLoaded = "domcontentloaded"
+  NetworkIdle = "networkidle"
+  # DOM の変更が dom_quiet_ms の間止まる
+  DomQuiet = "domquiet"
+
+
+class WaitReport(NamedTuple):
+  """操作ごとの待機結果"""
+
+  action: str
+  elapsed_sec: float
+  timed_out: bool
+  signal: WaitSignal | None
+
+
+class RobotOptions(TypedDict, total=False):
+  """ロボットのコンストラクタに渡す設定"""
+
+  browser_type: BrowserType
+  headless: bool
+  delay_time_sec: float
+  wait_policy: WaitPolicy
+  wait_signals: tuple[WaitSignal, ...]
+  wait_timeout_sec: float
+  dom_quiet_ms: int
+  cdp_endpoint: str | None
+  session_store: SessionStore | None
+  route_profile: RouteInterceptor | RouteProfile | str | None
+
+
+class PlaywrightRobotBase[PlaywrightT, BrowserT, ContextT, PageT, LocatorT]:
+  """PlaywrightBrowserRobot と AsyncPlaywrightBrowserRobot の共通部分。
+
+  型引数は sync_api / async_api それぞれの Playwright・Browser・BrowserContext・Page・Locator。
+  """
+
+  def __init__(  # noqa: PLR0913
+    self,
+    *,
+    browser_type: BrowserType = BrowserType.Chrome,
+    headless: bool = False,
+    delay_time_sec: float = DEFAULT_DELAY_TIME_SEC,
+    wait_policy: WaitPolicy = WaitPolicy.Fixed,
+    wait_signals: tuple[WaitSignal, ...] = (WaitSignal.Load, WaitSignal.DomQuiet),
+    wait_timeout_sec: float = DEFAULT_WAIT_TIMEOUT_SEC,
+    dom_quiet_ms: int = DEFAULT_DOM_QUIET_MS,
+    cdp_endpoint: str | None = None,
+    session_store: SessionStore | None = None,
+    route_profile: RouteInterceptor | RouteProfile | str | None = None,
+  ) -> None:
+    self.delay_time_sec = delay_time_sec
+    self.wait_policy = wait_policy
+    self.wait_signals = wait_signals
+    self.wait_timeout_sec = wait_timeout_sec
+    self.dom_quiet_ms = dom_quiet_ms
+    self._wait_reports: deque[WaitReport] = deque(maxlen=MAX_WAIT_REPORTS)
+    self._browser_type = browser_type
+    self._headless = headless
+    self._cdp_endpoint = cdp_endpoint
+    self._session_store = session_store
+    self._route_interceptor = (
+      RouteInterceptor(route_profile)
+      if isinstance(route_profile, (RouteProfile, str))
+      else route_profile
+    )
+    self._element_cache: ElementCache[LocatorT] = ElementCache()
+    self._playwright: PlaywrightT | None = None
+    self._browser: BrowserT | None = None
+    self._context: ContextT | None = None
+    self._page: PageT | None = None
+    self._launched_browser_type: BrowserType | None = None
+
+  def get_route_stats(self) -> RouteStats | None:
+    """ルーティングプロファイルで中断・差し替えたリクエストと受信量の集計を返す。"""
+    if self._route_interceptor is None:
+      return None
+    return self._route_interceptor.stats()
+
+  def get_element_cache_stats(self) -> ElementCacheStats:
+    """要素のメタデータキャッシュの命中統計を返す。"""
+    return self._element_cache.stats
+
+  def get_wait_reports(self) -> list[WaitReport]:
+    """Auto 待機での操作ごとの待機結果を古い順に返す。"""
+    return list(self._wait_reports)
+
+  def _options(self) -> RobotOptions:
+    """同じ設定のロボットを作るための引数を返す。ルーティングプロファイルは含めない。"""
+    return {
+      "browser_type": self._browser_type,
+      "headless": self._headless,
+      "delay_time_sec": self.delay_time_sec,
+      "wait_policy": self.wait_policy,
+      "wait_signals": self.wait_signals,
+      "wait_timeout_sec": self.wait_timeout_sec,
+      "dom_quiet_ms": self.dom_quiet_ms,
+      "cdp_endpoint": self._cdp_endpoint,
+      "session_store": self._session_store,
+    }
+
+  def _get_session_store(self) -> SessionStore:
+    if self._session_store is None:
+      self._session_store = SessionStore()
+    return self._session_store
+
+  def _browser_engine(self) -> tuple[str, str | None]:
+    """起動に使う Playwright のブラウザ名 (chromium など) とチャネルを返す。"""
+    if self._browser_type in {BrowserType.Edge, BrowserType.Chrome}:
+      return "chromium", self._browser_type.value
+    if self._browser_type is BrowserType.Safari:
+      return "webkit", None
+    if self._browser_type is BrowserType.FireFox:
+      return "firefox", None
+    unsupported_msg = f"未対応のブラウザタイプです: {self._browser_type}"
+    raise ValueError(unsupported_msg)
+
+  def _configure_page(self, page: SyncPage | AsyncPage) -> None:
+    if self.wait_policy is WaitPolicy.Auto:
+      page.set_default_timeout(self.wait_timeout_sec * 1000)
+
+  def _watch_page(self, page: SyncPage | AsyncPage) -> None:
+    """遷移 (履歴 API による遷移を含む) やページを閉じたときにキャッシュを捨てる。"""
+    cache = self._element_cache
+
+    def on_navigated(frame: SyncFrame | AsyncFrame) -> None:
+      if frame.parent_frame is None:
+        cache.invalidate(page)
+
+    page.on("framenavigated", on_navigated)
+    page.on("close", lambda _: cache.drop(page))
+
+  def _remaining_ms(self, started: float) -> float:
+    return max(0.0, self.wait_timeout_sec - (time.perf_counter() - started)) * 1000
+
+  def _report_wait_timeout(self, action: str, signal: WaitSignal) -> None:
+    print(f"wait timeout: {action} ({signal.value})")
+    annotate(wait_timeout=signal.value)
+
+  def _record_wait(self, action: str, started: float, timed_out: WaitSignal | None) -> None:
+    self._wait_reports.append(
+      WaitReport(
+        action=action,
+        elapsed_sec=time.perf_counter() - started,
+        timed_out=timed_out is not None,
+        signal=timed_out,
+      ),
+    )
+
+
+def get_values_argument(ids: list[str]) -> dict[str, Any]:
+  """GET_VALUES_SCRIPT に渡す引数を作る。get_value と同じく textContent をそのまま返す。"""
+  return {"ids": ids, "textProperty": "textContent", "trimText": False}
+
+
+def viewport_size(viewport: Mapping[str, int] | None) -> tuple[int, int]:
+  """Page.viewport_size を (幅, 高さ) にする。"""
+  if viewport is None:
+    message = "ビューポートサイズを取得できませんでした。"
+    raise RuntimeError(message)
+  return viewport["width"], viewport["height"]
+
+
+def check_tab_index(index: int, count: int) -> None:
+  """タブのインデックスが 0 以上 `count` 未満であることを確かめる。"""
+  if index < 0 or index >= count:
+    message = f"指定したタブのインデックスが不正です: {index}"
+    raise IndexError(message)
+
+
+def check_closable(count: int) -> None:
+  """最後の 1 つのタブを閉じようとしていないことを確かめる。"""
+  if count <= 1:
+    message = "タブが1つしかないため、閉じることができません。"
+    raise RuntimeError(message)
+
+
+def report_missing(missing: list[str]) -> None:
+  """fill_form で入力できなかった要素を表示する。"""
+  if len(missing) > 0:
+    print(f"入力できなかった要素: {missing}")
+
+
+__all__ = [
+  "DEFAULT_DELAY_TIME_SEC",
+  "DEFAULT_DOM_QUIET_MS",
+  "DEFAULT_WAIT_TIMEOUT_SEC",
+  "MAX_WAIT_REPORTS",
+  "SCROLL_BY_SCRIPT",
+  "SCROLL_POSITION_SCRIPT",
+  "BrowserType",
+  "PlaywrightRobotBase",
+  "RobotOptions",
+  "WaitPolicy",
+  "WaitReport",
+  "WaitSignal",
+  "check_closable",
+  "check_tab_index",
+  "get_values_argument",
+  "report_missing",
+  "viewport_size",
+]
@@ -0,0 +1,276 @@
+"""ページの読み込み時に不要なリクエストを中断・差し替えるルーティングのプロファイル。
+
+Playwright の BrowserContext.route に登録し、リソースの種類と URL のパターンで判定する。
+中断したリクエストは送信しないためサイズが分からない。そこで通過させた応答の Content-Length を
+受信量として集計し、何も中断しない PASS_THROUGH と比べて削減できた通信量を求める
+(bench の routes で読み込み時間とあわせて計測する)。
+RouteInterceptor の `measure_saved_bytes` を有効にすると、中断・差し替えた URL に HEAD を
+バックグラウンドで送り、その Content-Length を削減量の見積もりとして集計する。
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, NamedTuple
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+  from playwright.async_api import Response as AsyncResponse  # type: ignore[import-untyped]
+  from playwright.async_api import Route as AsyncRoute
+  from playwright.sync_api import Request, Response, Route  # type: ignore[import-untyped]
+
+_STUB_CONTENT_TYPES = {
+  "stylesheet": "text/css",
+  "script": "application/javascript",
+}
+HEAD_TIMEOUT_SEC = 2.0
+MAX_HEAD_WORKERS = 4
+
+
+class RouteProfile(NamedTuple):
+  """中断・差し替えるリクエストの条件"""
+
+  name: str
+  # 中断するリソースの種類。request.resource_type の値で指定する
+  abort_types: frozenset[str] = frozenset()
+  # 空の応答に差し替えるリソースの種類。onload などを待つページを止めないために使う
+  stub_types: frozenset[str] = frozenset()
+  # 中断する URL の正規表現
+  abort_patterns: tuple[str, ...] = ()
+  # ページと異なるホストのスクリプトを中断する
+  block_third_party_scripts: bool = False
+
+
+# 何も中断しない。他のプロファイルと受信量や読み込み時間を比べる基準に使う
+PASS_THROUGH = RouteProfile("pass-through")
+NO_MEDIA = RouteProfile(
+  "no-media",
+  abort_types=frozenset({"image", "media", "font"}),
+)
+FORMS_ONLY = RouteProfile(
+  "forms-only",
+  abort_types=frozenset({"image", "media", "font", "manifest", "texttrack"}),
+  stub_types=frozenset({"stylesheet"}),
+  abort_patterns=(r"google-analytics\.com", r"googletagmanager\.com", r"doubleclick\.net"),
+  block_third_party_scripts=True,
+)
+PROFILES = {profile.name: profile for profile in (PASS_THROUGH, NO_MEDIA, FORMS_ONLY)}
+
+
+class RouteStats(NamedTuple):
+  """ルーティングの集計"""
+
+  profile: str
+  # 送信したリクエスト数
+  passed: int
+  # 中断したリクエストの種類ごとの件数
+  aborted: dict[str, int]
+  # 空の応答に差し替えたリクエストの種類ごとの件数
+  stubbed: dict[str, int]
+  # 中断・差し替えたリクエストの合計件数
+  blocked: int
+  # 受け取った応答の Content-Length の合計 (バイト)
+  received_bytes: int
+  # Content-Length のない応答の数。受信量に含まれていない
+  unsized_responses: int
+  # 判定にかかった時間の合計 (秒)。通過させたリクエストにも加わる遅延の目安
+  overhead_sec: float
+  # 中断・差し替えたリクエストの HEAD の Content-Length の合計 (バイト)。
+  # measure_saved_bytes が無効の場合と、HEAD の応答を待っている分は含まない
+  saved_bytes: int = 0
+  # HEAD でサイズが分からなかった、中断・差し替えたリクエストの数
+  unsized_blocked: int = 0
+
+
+class RouteInterceptor:
+  """プロファイルに従ってリクエストを判定し、件数を集計する。
+
+  `measure_saved_bytes` が True の場合、中断・差し替えた URL ごとに 1 回だけ HEAD を送り、
+  以降は同じ URL のサイズを使い回す。HEAD は Cookie を送らないため、削減量は見積もりである。
+  """
+
+  def __init__(self, profile: RouteProfile | str, *, measure_saved_bytes: bool = False) -> None:
+    if isinstance(profile, str):
+      if profile not in PROFILES:
+        message = f"未対応のルーティングプロファイルです: {profile}"
+        raise ValueError(message)
+      profile = PROFILES[profile]
+    self.profile = profile
+    self._patterns = [re.compile(pattern) for pattern in profile.abort_patterns]
+    self._passed = 0
+    self._aborted: dict[str, int] = {}
+    self._stubbed: dict[str, int] = {}
+    self._received_bytes = 0
+    self._unsized_responses = 0
+    self._overhead_sec = 0.0
+    self._saved_bytes = 0
+    self._unsized_blocked = 0
+    # URL → HEAD で得たサイズ (不明なら None)、URL → HEAD の応答待ちの件数
+    self._blocked_sizes: dict[str, int | None] = {}
+    self._pending_sizes: dict[str, int] = {}
+    self._executor = ThreadPoolExecutor(MAX_HEAD_WORKERS) if measure_saved_bytes else None
+    self._lock = threading.Lock()
+
+  def decide(self, request: Request) -> str:
+    """リクエストを "abort"、"stub"、"continue" のいずれで扱うかを返し、集計する。"""
+    started = time.perf_counter()
+    resource_type = request.resource_type
+    if resource_type in self.profile.abort_types or self._is_blocked_url(request):
+      action, counts = "abort", self._aborted
+    elif resource_type in self.profile.stub_types:
+      action, counts = "stub", self._stubbed
+    else:
+      action, counts = "continue", None
+    measure = False
+    with self._lock:
+      if counts is None:
+        self._passed += 1
+      else:
+        counts[resource_type] = counts.get(resource_type, 0) + 1
+        measure = self._count_saved_bytes(request.url)
+      self._overhead_sec += time.perf_counter() - started
+    if measure and self._executor is not None:
+      self._executor.submit(self._measure, request.url)
+    return action
+
+  def handle(self, route: Route) -> None:
+    """同期 API の BrowserContext.route に登録するハンドラ。"""
+    action = self.decide(route.request)
+    if action == "abort":
+      route.abort("blockedbyclient")
+    elif action == "stub":
+      route.fulfill(status=200, content_type=_stub_content_type(route.request), body="")
+    else:
+      route.continue_()
+
+  async def handle_async(self, route: AsyncRoute) -> None:
+    """非同期 API の BrowserContext.route に登録するハンドラ。"""
+    action = self.decide(route.request)
+    if action == "abort":
+      await route.abort("blockedbyclient")
+    elif action == "stub":
+      await route.fulfill(status=200, content_type=_stub_content_type(route.request), body="")
+    else:
+      await route.continue_()
+
+  def record_response(self, response: Response | AsyncResponse) -> None:
+    """BrowserContext の response イベントに登録し、応答の Content-Length を集計する。
+
+    ヘッダーは応答とともに届いているため、ブラウザへの問い合わせは発生しない。
+    """
+    length = response.headers.get("content-length")
+    with self._lock:
+      if length is not None and length.isdigit():
+        self._received_bytes += int(length)
+      else:
+        self._unsized_responses += 1
+
+  def stats(self) -> RouteStats:
+    """現在までの集計を返す。"""
+    with self._lock:
+      return RouteStats(
+        profile=self.profile.name,
+        passed=self._passed,
+        aborted=dict(self._aborted),
+        stubbed=dict(self._stubbed),
+        blocked=sum(self._aborted.values()) + sum(self._stubbed.values()),
+        received_bytes=self._received_bytes,
+        unsized_responses=self._unsized_responses,
+        overhead_sec=self._overhead_sec,
+        saved_bytes=self._saved_bytes,
+        unsized_blocked=self._unsized_blocked,
+      )
+
+  def reset_stats(self) -> None:
+    """集計をリセットする。"""
+    with self._lock:
+      self._passed = 0
+      self._aborted.clear()
+      self._stubbed.clear()
+      self._received_bytes = 0
+      self._unsized_responses = 0
+      self._overhead_sec = 0.0
+      self._saved_bytes = 0
+      self._unsized_blocked = 0
+      self._pending_sizes = dict.fromkeys(self._pending_sizes, 0)
+
+  def close(self) -> None:
+    """HEAD を送るスレッドを終了する。応答待ちの HEAD は待たずに取り消す。"""
+    if self._executor is not None:
+      self._executor.shutdown(wait=False, cancel_futures=True)
+
+  def _count_saved_bytes(self, url: str) -> bool:
+    """中断・差し替えた `url` のサイズを集計する。ロックを取得した状態で呼ぶ。
+
+    まだ HEAD を送っていない URL の場合は True を返す。
+    """
+    if self._executor is None:
+      return False
+    if url in self._blocked_sizes:
+      self._add_saved_bytes(self._blocked_sizes[url], 1)
+      return False
+    if url in self._pending_sizes:
+      self._pending_sizes[url] += 1
+      return False
+    self._pending_sizes[url] = 1
+    return True
+
+  def _measure(self, url: str) -> None:
+    size = _head_content_length(url)
+    with self._lock:
+      self._blocked_sizes[url] = size
+      self._add_saved_bytes(size, self._pending_sizes.pop(url, 0))
+
+  def _add_saved_bytes(self, size: int | None, count: int) -> None:
+    if size is None:
+      self._unsized_blocked += count
+    else:
+      self._saved_bytes += size * count
+
+  def _is_blocked_url(self, request: Request) -> bool:
+    url = request.url
+    if any(pattern.search(url) for pattern in self._patterns):
+      return True
+    if not self.profile.block_third_party_scripts or request.resource_type != "script":
+      return False
+    try:
+      page_host = urlsplit(request.frame.url).hostname
+    except Exception:  # noqa: BLE001
+      # Service Worker などフレームに属さないリクエストは判定しない
+      return False
+    return page_host is not None and urlsplit(url).hostname != page_host
+
+
+def _stub_content_type(request: Request) -> str:
+  return _STUB_CONTENT_TYPES.get(request.resource_type, "text/plain")
+
+
+def _head_content_length(url: str) -> int | None:
+  """HEAD で `url` の Content-Length を取得する。取得できない場合は None を返す。"""
+  if urlsplit(url).scheme not in {"http", "https"}:
+    return None
+  request = urllib.request.Request(url, method="HEAD")  # noqa: S310
+  try:
+    with urllib.request.urlopen(request, timeout=HEAD_TIMEOUT_SEC) as response:  # noqa: S310
+      length = response.headers.get("Content-Length")
+  except (OSError, urllib.error.URLError, ValueError):
+    return None
+  return int(length) if length is not None and length.isdigit() else None
+
+
+__all__ = [
+  "FORMS_ONLY",
+  "HEAD_TIMEOUT_SEC",
+  "MAX_HEAD_WORKERS",
+  "NO_MEDIA",
+  "PASS_THROUGH",
+  "PROFILES",
+  "RouteInterceptor",
+  "RouteProfile",
+  "RouteStats",
+]
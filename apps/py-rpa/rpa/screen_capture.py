@@ -0,0 +1,166 @@
+"""画面キャプチャのバックエンドを切り替えるモジュール。
+
+mss が使える環境では mss (Linux では XShm) で NumPy 配列を直接取得し、
+使えない環境では pyautogui.screenshot() にフォールバックする。
+カラー画像は BGRA、グレースケール画像は 2 次元の uint8 配列で返す。
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, NamedTuple, Protocol
+
+import cv2
+import numpy as np
+
+PRIMARY_MONITOR = 1
+
+
+class ScreenRect(NamedTuple):
+  """論理座標 (マウス操作と同じ座標系) での矩形"""
+
+  left: int
+  top: int
+  width: int
+  height: int
+
+
+class CaptureBackend(Protocol):
+  """画面キャプチャのバックエンド"""
+
+  def grab(self, region: ScreenRect | None = None, *, gray: bool = False) -> np.ndarray:
+    """画面または指定領域をキャプチャする。"""
+    ...
+
+  def logical_rect(self) -> ScreenRect:
+    """キャプチャ対象のモニタの論理座標での矩形を返す。"""
+    ...
+
+  def close(self) -> None:
+    """リソースを解放する。"""
+    ...
+
+
+class MssCapture:
+  """mss を利用したキャプチャ。
+
+  mss が grab ごとに確保する BGRA バッファを、コピーせずに NumPy 配列として参照して返す。
+  このためカラー画像は呼び出しごとに別の配列で、次の grab で上書きされることはない。
+  グレースケール変換はスレッドごとに使い回す出力バッファに書き込むため、`gray=True` で
+  返した配列は同じスレッドの次のグレースケールの grab で上書きされる。
+  保持する場合はコピーすること。
+  """
+
+  def __init__(self, monitor: int = PRIMARY_MONITOR) -> None:
+    import mss  # noqa: PLC0415
+
+    self.monitor = monitor
+    self._mss = mss
+    self._local = threading.local()
+
+  def grab(self, region: ScreenRect | None = None, *, gray: bool = False) -> np.ndarray:
+    """画面または指定領域をキャプチャする。"""
+    sct = self._instance()
+    if region is None:
+      target: dict[str, int] = sct.monitors[self.monitor]
+    else:
+      origin = sct.monitors[self.monitor]
+      target = {
+        "left": origin["left"] + region.left,
+        "top": origin["top"] + region.top,
+        "width": region.width,
+        "height": region.height,
+      }
+    shot = sct.grab(target)
+    frame = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+    if not gray:
+      return frame
+    return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY, dst=self._gray_buffer(frame.shape[:2]))
+
+  def logical_rect(self) -> ScreenRect:
+    """キャプチャ対象のモニタの論理座標での矩形を返す。"""
+    monitor = self._instance().monitors[self.monitor]
+    return ScreenRect(monitor["left"], monitor["top"], monitor["width"], monitor["height"])
+
+  def close(self) -> None:
+    """現在のスレッドの mss インスタンスを閉じる。"""
+    sct = getattr(self._local, "sct", None)
+    if sct is not None:
+      sct.close()
+      self._local.sct = None
+
+  def _instance(self) -> Any:  # noqa: ANN401
+    # mss のインスタンスはスレッド間で共有できない
+    sct = getattr(self._local, "sct", None)
+    if sct is None:
+      sct = self._mss.mss()
+      self._local.sct = sct
+    return sct
+
+  def _gray_buffer(self, shape: tuple[int, ...]) -> np.ndarray:
+    buffer = getattr(self._local, "gray", None)
+    if buffer is None or buffer.shape != shape:
+      buffer = np.empty(shape, dtype=np.uint8)
+      self._local.gray = buffer
+    return buffer
+
+
+class PyAutoGuiCapture:
+  """pyautogui.screenshot() を利用したキャプチャ (主モニタのみ)。
+
+  スクリーンショットは実ピクセルで返るため、論理座標の領域は表示倍率を掛けて切り出す。
+  """
+
+  def grab(self, region: ScreenRect | None = None, *, gray: bool = False) -> np.ndarray:
+    """画面または指定領域をキャプチャする。"""
+    import pyautogui  # noqa: PLC0415
+
+    rgb = np.asarray(pyautogui.screenshot())
+    if region is not None:
+      rgb = _crop_logical(rgb, region, pyautogui.size())
+    if gray:
+      return cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    return cv2.cvtColor(rgb, cv2.COLOR_RGB2BGRA)
+
+  def logical_rect(self) -> ScreenRect:
+    """主モニタの論理座標での矩形を返す。"""
+    import pyautogui  # noqa: PLC0415
+
+    width, height = pyautogui.size()
+    return ScreenRect(0, 0, width, height)
+
+  def close(self) -> None:
+    """解放するリソースはない。"""
+
+
+def _crop_logical(
+  frame: np.ndarray,
+  region: ScreenRect,
+  logical_size: tuple[int, int],
+) -> np.ndarray:
+  """画面全体の実ピクセルの画像から、論理座標の領域を切り出す。"""
+  height, width = frame.shape[:2]
+  scale_x = width / logical_size[0]
+  scale_y = height / logical_size[1]
+  left, top = round(region.left * scale_x), round(region.top * scale_y)
+  right = round((region.left + region.width) * scale_x)
+  bottom = round((region.top + region.height) * scale_y)
+  return np.ascontiguousarray(frame[top:bottom, left:right])
+
+
+def create_capture_backend(monitor: int = PRIMARY_MONITOR) -> CaptureBackend:
+  """利用可能な中で最も速いバックエンドを返す。"""
+  try:
+    return MssCapture(monitor)
+  except ImportError:
+    return PyAutoGuiCapture()
+
+
+__all__ = [
+  "PRIMARY_MONITOR",
+  "CaptureBackend",
+  "MssCapture",
+  "PyAutoGuiCapture",
+  "ScreenRect",
+  "create_capture_backend",
+]
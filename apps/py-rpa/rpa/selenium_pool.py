@@ -0,0 +1,280 @@
+"""ワーカープロセスごとに SeleniumBrowserRobot を持たせてジョブを並列に処理するモジュール。
+
+ジョブとロボットの生成関数はワーカープロセスへ渡すため、モジュールの最上位で定義した
+関数 (または functools.partial) にすること。
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import time
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from selenium.common.exceptions import WebDriverException
+
+from rpa.context_pool import DEFAULT_RETRIES, DEFAULT_WORKERS, JobResult, RunReport
+
+if TYPE_CHECKING:
+  from collections.abc import Callable, Iterable, Iterator
+  from multiprocessing.context import SpawnProcess
+
+  from rpa.browser_robot_selenium import SeleniumBrowserRobot
+
+DEFAULT_MAX_RESTARTS = 3
+# ワーカーの死活を確認する間隔
+POLL_INTERVAL_SEC = 0.5
+_TASKS_PER_WORKER = 2
+
+type RobotFactory = Callable[[], SeleniumBrowserRobot]
+type SeleniumJob[T] = Callable[[SeleniumBrowserRobot, T], Any]
+
+
+class SeleniumProcessPool:
+  """`processes` 個のワーカープロセスでジョブを並列に処理する。
+
+  各ワーカーは起動時に `robot_factory()` でロボットを作ってドライバを起動しておき、
+  キューから受け取ったデータを `job(robot, item)` で処理する。
+  ジョブが WebDriverException を送出した場合はドライバを作り直して `retries` 回まで再実行する。
+  ワーカープロセス自体が終了した場合は処理中のデータを再投入して新しいワーカーを起動する
+  (再起動は合計 `max_restarts` 回まで)。
+  """
+
+  def __init__(
+    self,
+    robot_factory: RobotFactory,
+    *,
+    processes: int = DEFAULT_WORKERS,
+    retries: int = DEFAULT_RETRIES,
+    max_restarts: int = DEFAULT_MAX_RESTARTS,
+  ) -> None:
+    if processes < 1:
+      message = f"processes は 1 以上を指定してください: {processes}"
+      raise ValueError(message)
+    self.robot_factory = robot_factory
+    self.processes = processes
+    self.retries = retries
+    self.max_restarts = max_restarts
+    # fork ではドライバのソケットなどを引き継いでしまうため、OS によらず spawn を使う
+    self.mp_context = multiprocessing.get_context("spawn")
+
+  def run[T](self, items: Iterable[T], job: SeleniumJob[T]) -> RunReport:
+    """すべてのデータを処理し、入力順に並べた処理結果を返す。
+
+    各ワーカーに割り当てる未完了のデータは 2 件までに抑え、データは少しずつ読み出す。
+    """
+    started = time.perf_counter()
+    run = _PoolRun(self, job, enumerate(items))
+    try:
+      for _ in range(self.processes):
+        run.start_worker()
+      while run.workers:
+        run.dispatch()
+        if run.done:
+          break
+        run.collect()
+        run.reap()
+      # 再起動の上限に達してワーカーがなくなった場合、残りのデータは失敗として記録する
+      run.fail_remaining()
+    finally:
+      run.shutdown()
+
+    results = sorted(run.finished, key=lambda result: result.index)
+    return RunReport(results, self.processes, time.perf_counter() - started)
+
+
+class _Worker(NamedTuple):
+  process: SpawnProcess
+  tasks: multiprocessing.Queue[Any]
+  assigned: set[int]
+
+
+class _PoolRun:
+  """1 回の run の状態。ワーカーは起動ごとに新しい番号を振る。"""
+
+  def __init__(
+    self,
+    pool: SeleniumProcessPool,
+    job: SeleniumJob[Any],
+    source: Iterator[Any],
+  ) -> None:
+    self.pool = pool
+    self.job = job
+    self.source = source
+    self.results = pool.mp_context.Queue()
+    self.workers: dict[int, _Worker] = {}
+    self.pending: dict[int, Any] = {}
+    self.attempts: dict[int, int] = {}
+    self.retry: list[int] = []
+    self.finished: list[JobResult] = []
+    self.restarts = 0
+    self.exhausted = False
+    self._next_no = 0
+
+  @property
+  def done(self) -> bool:
+    return self.exhausted and not self.retry and not self.pending
+
+  def start_worker(self) -> None:
+    no = self._next_no
+    self._next_no += 1
+    tasks = self.pool.mp_context.Queue()
+    process = self.pool.mp_context.Process(
+      target=_worker_main,
+      args=(no, self.pool.robot_factory, self.job, tasks, self.results, self.pool.retries),
+      daemon=True,
+    )
+    process.start()
+    self.workers[no] = _Worker(process, tasks, set())
+
+  def dispatch(self) -> None:
+    for worker in self.workers.values():
+      while len(worker.assigned) < _TASKS_PER_WORKER and (index := self._next_index()) is not None:
+        self.attempts[index] = self.attempts.get(index, 0) + 1
+        worker.assigned.add(index)
+        worker.tasks.put((index, self.pending[index]))
+
+  def collect(self) -> None:
+    try:
+      entry = self.results.get(timeout=POLL_INTERVAL_SEC)
+    except queue.Empty:
+      return
+    self._record(entry)
+
+  def drain(self) -> None:
+    """待たずに受け取れる処理結果をすべて記録する。"""
+    while True:
+      try:
+        entry = self.results.get_nowait()
+      except queue.Empty:
+        return
+      self._record(entry)
+
+  def reap(self) -> None:
+    """終了したワーカーを取り除き、割り当てていたデータを再投入して新しいワーカーを起動する。
+
+    ワーカーは処理結果を送った直後に終了することがあるため、先に届いている結果を記録してから
+    未完了のデータだけを再投入する。
+    """
+    dead = [no for no, worker in self.workers.items() if not worker.process.is_alive()]
+    if not dead:
+      return
+    self.drain()
+    for no in dead:
+      worker = self.workers.pop(no)
+      error = f"ワーカープロセスが終了しました (exitcode={worker.process.exitcode})"
+      for index in worker.assigned:
+        if index not in self.pending:
+          continue
+        if self.attempts[index] <= self.pool.retries:
+          self.retry.append(index)
+        else:
+          self._fail(index, no, error)
+      if self.restarts < self.pool.max_restarts:
+        self.restarts += 1
+        print(f"[worker {no}] restart ({self.restarts}/{self.pool.max_restarts})")
+        self.start_worker()
+
+  def fail_remaining(self) -> None:
+    self.retry.clear()
+    for index, item in self.source:
+      self.pending[index] = item
+    for index in list(self.pending):
+      self._fail(index, -1, "利用できるワーカーがありません")
+
+  def shutdown(self) -> None:
+    for worker in self.workers.values():
+      worker.tasks.put(None)
+    for worker in self.workers.values():
+      worker.process.join(timeout=10)
+      if worker.process.is_alive():
+        worker.process.terminate()
+
+  def _next_index(self) -> int | None:
+    while self.retry:
+      index = self.retry.pop()
+      # 再投入した後に処理結果が届いたデータは飛ばす
+      if index in self.pending:
+        return index
+    entry = None if self.exhausted else next(self.source, None)
+    if entry is None:
+      self.exhausted = True
+      return None
+    index, item = entry
+    self.pending[index] = item
+    return index
+
+  def _record(self, entry: tuple[int, int, Any, str | None, float, int]) -> None:
+    no, index, value, error, elapsed_sec, tried = entry
+    if no in self.workers:
+      self.workers[no].assigned.discard(index)
+    if index not in self.pending:
+      return
+    if index in self.retry:
+      self.retry.remove(index)
+    item = self.pending.pop(index)
+    attempts = self.attempts.pop(index) - 1 + tried
+    if error is not None:
+      print(f"[worker {no}] #{index} failed: {error}")
+    self.finished.append(
+      JobResult(index, item, error is None, error, attempts, no, elapsed_sec, value),
+    )
+
+  def _fail(self, index: int, no: int, error: str) -> None:
+    print(f"[worker {no}] #{index} failed: {error}")
+    item = self.pending.pop(index)
+    attempts = self.attempts.pop(index, 0)
+    self.finished.append(
+      JobResult(index, item, ok=False, error=error, attempts=attempts, worker=no, elapsed_sec=0.0),
+    )
+
+
+def _worker_main[T](  # noqa: PLR0913, PLR0917
+  no: int,
+  robot_factory: RobotFactory,
+  job: SeleniumJob[T],
+  tasks: multiprocessing.Queue[Any],
+  results: multiprocessing.Queue[Any],
+  retries: int,
+) -> None:
+  robot = robot_factory()
+  try:
+    robot.start_driver()
+    while (entry := tasks.get()) is not None:
+      index, item = entry
+      started = time.perf_counter()
+      value: Any = None
+      error: str | None = None
+      tried = 0
+      while tried <= retries:
+        tried += 1
+        try:
+          value = job(robot, item)
+        except WebDriverException as exc:
+          # ドライバが落ちている可能性があるため、作り直してから再実行する
+          error = f"{type(exc).__name__}: {exc.msg}"
+          robot.close_browser()
+          try:
+            robot.start_driver()
+          except WebDriverException as restart_exc:
+            # 作り直せない場合はこのデータを失敗とし、次のデータの処理時に改めて起動する
+            error = f"{error} (再起動に失敗: {type(restart_exc).__name__}: {restart_exc.msg})"
+            break
+        except Exception as exc:  # noqa: BLE001
+          error = f"{type(exc).__name__}: {exc}"
+          break
+        else:
+          error = None
+          break
+      results.put((no, index, value, error, time.perf_counter() - started, tried))
+  finally:
+    robot.close()
+
+
+__all__ = [
+  "DEFAULT_MAX_RESTARTS",
+  "POLL_INTERVAL_SEC",
+  "RobotFactory",
+  "SeleniumJob",
+  "SeleniumProcessPool",
+]
@@ -0,0 +1,133 @@
+"""ブラウザのセッション状態を名前付きのスナップショットとして保存・復元するモジュール。
+
+スナップショットは Playwright の storage_state (Cookie と localStorage) に、
+sessionStorage と保存時の URL を加えたもので、1 件ずつ JSON ファイルに保存する。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, TypedDict
+
+DEFAULT_SESSION_DIR = Path("~/.cache/py-rpa/sessions")
+DEFAULT_TTL_SEC = 60 * 60
+
+# 復元済みであることを示す sessionStorage のキー。遷移のたびに上書きしないために使う
+RESTORED_MARKER_KEY = "__rpa_session_restored__"
+
+# [origin, {key: value}] を返す
+SESSION_STORAGE_SCRIPT = """
+() => [location.origin, Object.fromEntries(Object.entries(window.sessionStorage))]
+"""
+
+_NAME_PATTERN = re.compile(r"[\w.-]+")
+
+
+class SessionSnapshot(TypedDict):
+  """セッションのスナップショット"""
+
+  storage_state: dict[str, Any]
+  session_storage: dict[str, dict[str, str]]
+  url: str
+  saved_at: float
+
+
+class SessionStore:
+  """スナップショットを `directory` に保存し、`ttl_sec` を過ぎたものは期限切れとして扱う。"""
+
+  def __init__(
+    self,
+    directory: str | Path = DEFAULT_SESSION_DIR,
+    *,
+    ttl_sec: float = DEFAULT_TTL_SEC,
+  ) -> None:
+    self.directory = Path(directory).expanduser()
+    self.ttl_sec = ttl_sec
+
+  def path(self, name: str) -> Path:
+    """スナップショットのファイルパスを返す。"""
+    if _NAME_PATTERN.fullmatch(name) is None:
+      message = f"スナップショット名に使えない文字が含まれています: {name}"
+      raise ValueError(message)
+    return self.directory / f"{name}.json"
+
+  def load(self, name: str) -> SessionSnapshot | None:
+    """スナップショットを読み込む。存在しない、壊れている、または期限切れの場合は None を返す。"""
+    path = self.path(name)
+    try:
+      snapshot: SessionSnapshot = json.loads(path.read_text(encoding="utf-8"))
+      saved_at = float(snapshot["saved_at"])
+    except (OSError, ValueError, KeyError, TypeError):
+      return None
+    if time.time() - saved_at > self.ttl_sec:
+      return None
+    return snapshot
+
+  def save(
+    self,
+    name: str,
+    storage_state: dict[str, Any],
+    session_storage: dict[str, dict[str, str]],
+    url: str,
+  ) -> SessionSnapshot:
+    """スナップショットを保存する。途中で中断しても壊れないよう、一時ファイル経由で置き換える。"""
+    path = self.path(name)
+    snapshot = SessionSnapshot(
+      storage_state=storage_state,
+      session_storage=session_storage,
+      url=url,
+      saved_at=time.time(),
+    )
+    self.directory.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+      json.dump(snapshot, file, ensure_ascii=False)
+    Path(tmp_path).replace(path)
+    return snapshot
+
+  def delete(self, name: str) -> None:
+    """スナップショットを削除する。"""
+    self.path(name).unlink(missing_ok=True)
+
+  def clear(self) -> None:
+    """すべてのスナップショットを削除する。"""
+    for path in self.directory.glob("*.json"):
+      path.unlink(missing_ok=True)
+
+
+def build_restore_script(session_storage: dict[str, dict[str, str]]) -> str:
+  """ページの読み込み前に sessionStorage を復元する初期化スクリプトを返す。
+
+  sessionStorage はタブごとに保持されるため、新しいタブで最初に同じオリジンを開いたときに
+  一度だけ書き込む。
+  """
+  data = json.dumps(session_storage, ensure_ascii=False)
+  marker = json.dumps(RESTORED_MARKER_KEY)
+  return f"""
+(() => {{
+  const items = {data}[window.location.origin];
+  if (items === undefined || window.sessionStorage.getItem({marker}) !== null) {{
+    return;
+  }}
+  for (const [key, value] of Object.entries(items)) {{
+    window.sessionStorage.setItem(key, value);
+  }}
+  window.sessionStorage.setItem({marker}, "1");
+}})();
+"""
+
+
+__all__ = [
+  "DEFAULT_SESSION_DIR",
+  "DEFAULT_TTL_SEC",
+  "RESTORED_MARKER_KEY",
+  "SESSION_STORAGE_SCRIPT",
+  "SessionSnapshot",
+  "SessionStore",
+  "build_restore_script",
+]
@@ -0,0 +1,184 @@
+"""テンプレート画像のキャッシュとバンドルを扱うモジュール。
+
+PNG のデコードとグレースケール化はパスと更新時刻ごとに 1 回だけ行い、LRU で保持する。
+IMAGE_PATH ディレクトリを丸ごと `.npz` バンドルに変換しておけば、
+起動時に PNG をデコードせずにメモリマップで読み込める。
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, NamedTuple
+
+import numpy as np
+from PIL import Image
+
+from rpa.image_matcher import ScaledTemplate
+
+DEFAULT_MAX_SIZE = 128
+BUNDLE_SUFFIX = ".npz"
+TEMPLATE_PATTERN = "*.png"
+
+_META_KEY = "__meta__"
+_ZIP_LOCAL_HEADER_SIZE = 30
+_ZIP_NAME_LENGTH_OFFSET = 26
+
+
+class _BundleEntry(NamedTuple):
+  mtime_ns: int
+  gray: np.ndarray
+
+
+class TemplateStore:
+  """前処理済みテンプレートの LRU キャッシュ。"""
+
+  def __init__(self, max_size: int = DEFAULT_MAX_SIZE) -> None:
+    self.max_size = max_size
+    self._cache: OrderedDict[tuple[str, int], ScaledTemplate] = OrderedDict()
+    self._bundle: dict[str, _BundleEntry] = {}
+    self._lock = threading.Lock()
+
+  def get(self, image_path: str | Path) -> ScaledTemplate:
+    """テンプレートを取得する。未読み込みまたは更新されていればデコードする。"""
+    path = Path(image_path).expanduser().resolve()
+    bundled = self._bundle.get(str(path))
+    try:
+      mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+      if bundled is None:
+        raise
+      mtime_ns = bundled.mtime_ns
+
+    key = (str(path), mtime_ns)
+    with self._lock:
+      template = self._cache.get(key)
+      if template is not None:
+        self._cache.move_to_end(key)
+        return template
+
+    if bundled is not None and bundled.mtime_ns == mtime_ns:
+      template = ScaledTemplate(bundled.gray)
+    else:
+      template = ScaledTemplate(load_gray(path))
+
+    with self._lock:
+      self._cache[key] = template
+      self._cache.move_to_end(key)
+      while len(self._cache) > self.max_size:
+        self._cache.popitem(last=False)
+    return template
+
+  def load_bundle(self, bundle_path: str | Path, image_dir: str | Path | None = None) -> int:
+    """`compile_bundle` で作ったバンドルを読み込み、登録したテンプレート数を返す。
+
+    `image_dir` を省略した場合はバンドル作成時のディレクトリを基準にする。
+    """
+    arrays, meta = _open_bundle(Path(bundle_path))
+    root = Path(image_dir or meta["root"]).expanduser().resolve()
+    entries = {
+      str(root / name): _BundleEntry(mtime_ns, arrays[name])
+      for name, mtime_ns in meta["entries"].items()
+    }
+    with self._lock:
+      self._bundle.update(entries)
+    return len(entries)
+
+  def clear(self) -> None:
+    """キャッシュとバンドルを破棄する。"""
+    with self._lock:
+      self._cache.clear()
+      self._bundle.clear()
+
+  def __len__(self) -> int:
+    """キャッシュしているテンプレート数を返す。"""
+    return len(self._cache)
+
+
+def load_gray(image_path: str | Path) -> np.ndarray:
+  """画像ファイルをデコードしてグレースケール配列で返す。"""
+  with Image.open(image_path) as image:
+    return np.asarray(image.convert("L"))
+
+
+def compile_bundle(image_dir: str | Path, bundle_path: str | Path | None = None) -> Path:
+  """ディレクトリ内の PNG をグレースケール化して 1 つの `.npz` にまとめる。"""
+  root = Path(image_dir).expanduser().resolve()
+  target = Path(bundle_path) if bundle_path is not None else root.with_suffix(BUNDLE_SUFFIX)
+
+  arrays: dict[str, np.ndarray] = {}
+  entries: dict[str, int] = {}
+  for path in sorted(root.rglob(TEMPLATE_PATTERN)):
+    name = path.relative_to(root).as_posix()
+    arrays[name] = load_gray(path)
+    entries[name] = path.stat().st_mtime_ns
+
+  meta = json.dumps({"root": str(root), "entries": entries})
+  # メモリマップできるよう無圧縮で保存する
+  with target.open("wb") as file:
+    np.savez(file, **arrays, **{_META_KEY: np.array(meta)})
+  return target
+
+
+def _open_bundle(bundle_path: Path) -> tuple[dict[str, np.ndarray], dict]:
+  """無圧縮の `.npz` の各メンバーを読み込まずにメモリマップする。"""
+  arrays: dict[str, np.ndarray] = {}
+  meta: dict | None = None
+  with zipfile.ZipFile(bundle_path) as archive, bundle_path.open("rb") as file:
+    for info in archive.infolist():
+      name = info.filename.removesuffix(".npy")
+      if name == _META_KEY:
+        meta = json.loads(str(np.load(archive.open(info))))
+        continue
+      if info.compress_type != zipfile.ZIP_STORED:
+        message = f"圧縮されたバンドルはメモリマップできません: {bundle_path}"
+        raise ValueError(message)
+      file.seek(info.header_offset + _ZIP_NAME_LENGTH_OFFSET)
+      name_len = int.from_bytes(file.read(2), "little")
+      extra_len = int.from_bytes(file.read(2), "little")
+      file.seek(info.header_offset + _ZIP_LOCAL_HEADER_SIZE + name_len + extra_len)
+      shape, fortran_order, dtype = _read_npy_header(file)
+      arrays[name] = np.memmap(
+        bundle_path,
+        dtype=dtype,
+        mode="r",
+        offset=file.tell(),
+        shape=shape,
+        order="F" if fortran_order else "C",
+      )
+  if meta is None:
+    message = f"テンプレートバンドルではありません: {bundle_path}"
+    raise ValueError(message)
+  return arrays, meta
+
+
+def _read_npy_header(file: BinaryIO) -> tuple[tuple[int, ...], bool, np.dtype]:
+  version = np.lib.format.read_magic(file)
+  if version == (1, 0):
+    return np.lib.format.read_array_header_1_0(file)
+  return np.lib.format.read_array_header_2_0(file)
+
+
+def main() -> None:
+  """`python -m rpa.template_store <image_dir> [bundle_path]` でバンドルを作成する。"""
+  if len(sys.argv) < 2:  # noqa: PLR2004
+    print("usage: python -m rpa.template_store <image_dir> [bundle_path]")
+    sys.exit(1)
+  bundle = compile_bundle(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)  # noqa: PLR2004
+  print(f"bundle: {bundle}")
+
+
+__all__ = [
+  "DEFAULT_MAX_SIZE",
+  "TemplateStore",
+  "compile_bundle",
+  "load_gray",
+]
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,364 @@
+"""ロボットの操作ごとの所要時間をスパンとして記録するモジュール。
+
+既定では無効で、`tracer.enable()` を呼ぶまでは `traced` を付けた関数は
+有効かどうかの判定だけをして元の関数を呼び、`tracer.span()` は共有の何もしない
+コンテキストマネージャーを返す。
+
+    from rpa.tracing import tracer
+
+    tracer.enable()
+    ...  # ロボットを操作する
+    tracer.export_jsonl("trace.jsonl")
+    tracer.export_chrome_trace("trace.json")  # chrome://tracing や Perfetto で開ける
+    print(tracer.format_summary())
+
+スパンの親子関係は contextvars で管理するため、asyncio のタスクは呼び出し元の操作に紐づく。
+ThreadPoolExecutor などのスレッドはコンテキストを引き継がないため、
+`contextvars.copy_context().run` を通して実行した場合だけ紐づく (ImageLocator.locate_all など)。
+スパンには時間の内訳 (rpa.cost_report) に使う分類 (SpanCategory) を付けられる。
+分類のないスパンは親の分類を引き継ぐ。
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+if TYPE_CHECKING:
+  from collections.abc import Callable, Iterator
+
+# 記録するスパン数の上限。超えた分は古いものから捨てずに記録をやめる
+DEFAULT_MAX_SPANS = 100_000
+
+
+class SpanCategory(Enum):
+  """スパンの時間の分類"""
+
+  # 固定時間のスリープ (delay_time_sec、滑らかなマウス移動、スクリプトの sleep など)
+  FixedDelay = "fixed_delay"
+  # ブラウザ・ドライバ・OS とのやり取り
+  RoundTrip = "round_trip"
+  # 画面のキャプチャと画像の照合
+  ImageSearch = "image_search"
+  # スクリプト自体の処理
+  Script = "script"
+
+
+class Span(NamedTuple):
+  """記録した 1 回の操作"""
+
+  span_id: int
+  parent_id: int | None
+  name: str
+  category: SpanCategory | None
+  # トレース開始からの経過秒数
+  start_sec: float
+  duration_sec: float
+  attributes: dict[str, Any]
+  # 操作が送出した例外の型名とメッセージ
+  error: str | None
+  thread_id: int
+
+
+class ActionSummary(NamedTuple):
+  """操作の種類ごとの所要時間の集計"""
+
+  name: str
+  count: int
+  errors: int
+  total_sec: float
+  p50_sec: float
+  p95_sec: float
+  max_sec: float
+
+
+class _ActiveSpan:
+  __slots__ = ("attributes", "span_id")
+
+  def __init__(self, span_id: int, attributes: dict[str, Any]) -> None:
+    self.span_id = span_id
+    self.attributes = attributes
+
+
+class _NoopSpan:
+  """記録しないときに返すコンテキストマネージャー。状態を持たないため共有する。"""
+
+  __slots__ = ()
+
+  def __enter__(self) -> dict[str, Any]:
+    return {}
+
+  def __exit__(self, *_: object) -> None:
+    return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar[_ActiveSpan | None] = contextvars.ContextVar(
+  "rpa_current_span",
+  default=None,
+)
+
+
+class Tracer:
+  """スパンを記録し、JSONL や Chrome のトレースイベント形式で出力する。"""
+
+  def __init__(self, *, max_spans: int = DEFAULT_MAX_SPANS) -> None:
+    self.enabled = False
+    self.max_spans = max_spans
+    self._spans: list[Span] = []
+    self._ids = itertools.count(1)
+    self._lock = threading.Lock()
+    self._origin = time.perf_counter()
+    self._origin_epoch = time.time()
+
+  def enable(self) -> None:
+    """記録を開始する。"""
+    self.enabled = True
+
+  def disable(self) -> None:
+    """記録を停止する。記録済みのスパンは残す。"""
+    self.enabled = False
+
+  def clear(self) -> None:
+    """記録済みのスパンを捨て、経過時間の基準を現在時刻にする。"""
+    with self._lock:
+      self._spans.clear()
+      self._origin = time.perf_counter()
+      self._origin_epoch = time.time()
+
+  @property
+  def elapsed_sec(self) -> float:
+    """経過時間の基準 (生成時または clear() の呼び出し時) からの経過時間を返す。"""
+    return time.perf_counter() - self._origin
+
+  def span(
+    self,
+    name: str,
+    *,
+    category: SpanCategory | None = None,
+    **attributes: Any,  # noqa: ANN401
+  ) -> contextlib.AbstractContextManager[dict[str, Any]]:
+    """ブロックの所要時間をスパンとして記録する。
+
+    返した辞書に書き込んだ値はスパンの属性になる。無効な場合は何も記録しない。
+    """
+    if not self.enabled:
+      return _NOOP_SPAN
+    return self._record_span(name, category, attributes)
+
+  @contextlib.contextmanager
+  def _record_span(
+    self,
+    name: str,
+    category: SpanCategory | None,
+    attributes: dict[str, Any],
+  ) -> Iterator[dict[str, Any]]:
+    active = _ActiveSpan(next(self._ids), attributes)
+    parent = _current_span.get()
+    token = _current_span.set(active)
+    error: str | None = None
+    started = time.perf_counter()
+    try:
+      yield attributes
+    except BaseException as exc:
+      error = f"{type(exc).__name__}: {exc}"
+      raise
+    finally:
+      ended = time.perf_counter()
+      _current_span.reset(token)
+      self._record(
+        Span(
+          span_id=active.span_id,
+          parent_id=None if parent is None else parent.span_id,
+          name=name,
+          category=category,
+          start_sec=started - self._origin,
+          duration_sec=ended - started,
+          attributes=attributes,
+          error=error,
+          thread_id=threading.get_ident(),
+        ),
+      )
+
+  @property
+  def spans(self) -> list[Span]:
+    """記録済みのスパンを終了順に返す。"""
+    with self._lock:
+      return list(self._spans)
+
+  def summary(self) -> list[ActionSummary]:
+    """操作の種類ごとに所要時間を集計し、合計時間の長い順に返す。"""
+    durations: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    for span in self.spans:
+      durations.setdefault(span.name, []).append(span.duration_sec)
+      if span.error is not None:
+        errors[span.name] = errors.get(span.name, 0) + 1
+    summaries = []
+    for name, values in durations.items():
+      values.sort()
+      summaries.append(
+        ActionSummary(
+          name=name,
+          count=len(values),
+          errors=errors.get(name, 0),
+          total_sec=sum(values),
+          p50_sec=percentile(values, 50),
+          p95_sec=percentile(values, 95),
+          max_sec=values[-1],
+        ),
+      )
+    return sorted(summaries, key=lambda summary: summary.total_sec, reverse=True)
+
+  def format_summary(self) -> str:
+    """summary() の結果を表形式の文字列で返す。"""
+    lines = [f"{'action':<48} {'count':>6} {'errors':>6} {'total':>9} {'p50':>9} {'p95':>9}"]
+    lines.extend(
+      f"{summary.name:<48} {summary.count:>6} {summary.errors:>6} "
+      f"{summary.total_sec:>8.3f}s {summary.p50_sec:>8.3f}s {summary.p95_sec:>8.3f}s"
+      for summary in self.summary()
+    )
+    return "\n".join(lines)
+
+  def export_jsonl(self, path: str | Path) -> None:
+    """スパンを 1 行 1 件の JSON で書き出す。"""
+    with Path(path).open("w", encoding="utf-8") as file:
+      file.writelines(
+        json.dumps(span._asdict(), ensure_ascii=False, default=str) + "\n" for span in self.spans
+      )
+
+  def export_chrome_trace(self, path: str | Path) -> None:
+    """スパンを Chrome のトレースイベント形式 (JSON) で書き出す。"""
+    pid = os.getpid()
+    events = []
+    for span in self.spans:
+      args = {**span.attributes, "span_id": span.span_id, "parent_id": span.parent_id}
+      if span.error is not None:
+        args["error"] = span.error
+      events.append(
+        {
+          "name": span.name,
+          "cat": "rpa" if span.category is None else span.category.value,
+          "ph": "X",
+          "ts": round(span.start_sec * 1_000_000, 3),
+          "dur": round(span.duration_sec * 1_000_000, 3),
+          "pid": pid,
+          "tid": span.thread_id,
+          "args": args,
+        },
+      )
+    data = {
+      "traceEvents": events,
+      "displayTimeUnit": "ms",
+      "otherData": {"origin_epoch": self._origin_epoch},
+    }
+    Path(path).write_text(json.dumps(data, ensure_ascii=False, default=str), encoding="utf-8")
+
+  def _record(self, span: Span) -> None:
+    with self._lock:
+      if len(self._spans) < self.max_spans:
+        self._spans.append(span)
+
+
+# ロボットの操作を記録する既定のトレーサー
+tracer = Tracer()
+
+
+def annotate(**attributes: Any) -> None:  # noqa: ANN401
+  """実行中のスパンに属性 (リトライ回数など) を追加する。記録中でなければ何もしない。"""
+  active = _current_span.get()
+  if active is not None:
+    active.attributes.update(attributes)
+
+
+def step(name: str, **attributes: Any) -> contextlib.AbstractContextManager[dict[str, Any]]:  # noqa: ANN401
+  """スクリプトの手順をスパンとして記録する。
+
+  手順の中で呼んだ操作の時間は rpa.cost_report で手順ごとに集計される。
+  """
+  return tracer.span(name, category=SpanCategory.Script, step=True, **attributes)
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+  """昇順に並んだ値の百分位数 (最近接順位法) を返す。"""
+  if len(sorted_values) == 0:
+    return 0.0
+  rank = max(1, math.ceil(percent / 100 * len(sorted_values)))
+  return sorted_values[rank - 1]
+
+
+def traced[F: Callable[..., Any]](
+  name: str | None = None,
+  *,
+  category: SpanCategory = SpanCategory.RoundTrip,
+  **attribute_params: str,
+) -> Callable[[F], F]:
+  """関数の呼び出しを `tracer` のスパンとして記録するデコレーター。
+
+  ロボットの操作に付けるため、分類は既定で SpanCategory.RoundTrip とする。
+  `name` を省略した場合は関数の修飾名をスパン名にする。`attribute_params` には
+  属性名と引数名の対応を渡す (例: `@traced(target="attr_id")`)。
+  コルーチン関数にも使える。無効な場合は元の関数をそのまま呼ぶ。
+  """
+
+  def decorator(func: F) -> F:
+    span_name = name or func.__qualname__
+    signature = inspect.signature(func) if attribute_params else None
+
+    def attributes(args: tuple[Any, ...], kwargs: dict[str, Any]) -> dict[str, Any]:
+      if signature is None:
+        return {}
+      arguments = signature.bind_partial(*args, **kwargs).arguments
+      return {
+        attribute: arguments[param]
+        for attribute, param in attribute_params.items()
+        if param in arguments
+      }
+
+    if inspect.iscoroutinefunction(func):
+
+      @functools.wraps(func)
+      async def async_wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+        if not tracer.enabled:
+          return await func(*args, **kwargs)
+        with tracer.span(span_name, category=category, **attributes(args, kwargs)):
+          return await func(*args, **kwargs)
+
+      return async_wrapper  # type: ignore[return-value]
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+      if not tracer.enabled:
+        return func(*args, **kwargs)
+      with tracer.span(span_name, category=category, **attributes(args, kwargs)):
+        return func(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+  return decorator
+
+
+__all__ = [
+  "DEFAULT_MAX_SPANS",
+  "ActionSummary",
+  "Span",
+  "SpanCategory",
+  "Tracer",
+  "annotate",
+  "percentile",
+  "step",
+  "traced",
+  "tracer",
+]
@@ -0,0 +1,103 @@
+"""期限と適応的なポーリング間隔で条件を待つモジュール。"""
+
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+from rpa.tracing import SpanCategory, annotate, tracer
+
+if TYPE_CHECKING:
+  from collections.abc import Callable
+
+DEFAULT_INITIAL_INTERVAL_SEC = 0.02
+DEFAULT_MAX_INTERVAL_SEC = 0.5
+DEFAULT_BACKOFF_FACTOR = 1.5
+
+
+class Deadline:
+  """待機の期限。複数の待機で同じ期限を共有できる。"""
+
+  def __init__(self, timeout_sec: float) -> None:
+    self.timeout_sec = timeout_sec
+    self._end = time.monotonic() + timeout_sec
+
+  def remaining(self) -> float:
+    """残り時間 (秒) を返す。"""
+    return max(0.0, self._end - time.monotonic())
+
+  @property
+  def expired(self) -> bool:
+    """期限を過ぎたかどうかを返す。"""
+    return time.monotonic() >= self._end
+
+
+class PollScheduler:
+  """ポーリング間隔を短い間隔から指数的に伸ばしていくスケジューラ。"""
+
+  def __init__(
+    self,
+    initial_interval_sec: float = DEFAULT_INITIAL_INTERVAL_SEC,
+    max_interval_sec: float = DEFAULT_MAX_INTERVAL_SEC,
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR,
+  ) -> None:
+    self.initial_interval_sec = initial_interval_sec
+    self.max_interval_sec = max_interval_sec
+    self.backoff_factor = backoff_factor
+    self._interval = initial_interval_sec
+
+  def reset(self) -> None:
+    """間隔を初期値に戻す。"""
+    self._interval = self.initial_interval_sec
+
+  def sleep(self, deadline: Deadline) -> bool:
+    """次の間隔だけ待機する。期限を過ぎていれば待たずに False を返す。"""
+    remaining = deadline.remaining()
+    if remaining <= 0:
+      return False
+    time.sleep(min(self._interval, remaining))
+    self._interval = min(self._interval * self.backoff_factor, self.max_interval_sec)
+    return True
+
+
+def sleep(seconds: float) -> None:
+  """固定時間待つ。トレース中は固定時間の待機として記録する。"""
+  with tracer.span("sleep", category=SpanCategory.FixedDelay, seconds=seconds):
+    time.sleep(seconds)
+
+
+def poll_until[T](
+  predicate: Callable[[], T | None],
+  timeout_sec: float,
+  *,
+  deadline: Deadline | None = None,
+  scheduler: PollScheduler | None = None,
+) -> T | None:
+  """`predicate` が None / False 以外を返すまで繰り返し呼び、その値を返す。
+
+  `deadline` を渡した場合は `timeout_sec` より優先し、呼び出し元の待機と期限を共有する。
+  期限内に条件を満たさなかった場合は None を返す。
+  """
+  deadline = deadline or Deadline(timeout_sec)
+  scheduler = scheduler or PollScheduler()
+  polls = 0
+  while True:
+    polls += 1
+    result = predicate()
+    if result is not None and result is not False:
+      annotate(polls=polls)
+      return result
+    if not scheduler.sleep(deadline):
+      annotate(polls=polls, timed_out=True)
+      return None
+
+
+__all__ = [
+  "DEFAULT_BACKOFF_FACTOR",
+  "DEFAULT_INITIAL_INTERVAL_SEC",
+  "DEFAULT_MAX_INTERVAL_SEC",
+  "Deadline",
+  "PollScheduler",
+  "poll_until",
+  "sleep",
+]
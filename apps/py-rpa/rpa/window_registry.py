@@ -0,0 +1,173 @@
+"""ウィンドウの列挙結果をキャッシュし、アプリ名やタイトルで引けるようにするモジュール。"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, NamedTuple
+
+import pywinctl
+
+DEFAULT_TTL_SEC = 1.0
+
+
+class WindowBounds(NamedTuple):
+  """ウィンドウの位置とサイズ"""
+
+  x: int
+  y: int
+  width: int
+  height: int
+
+
+class WindowHandle:
+  """ウィンドウを列挙し直さずに繰り返し操作するためのハンドル。"""
+
+  def __init__(self, window: Any, app_name: str) -> None:  # noqa: ANN401
+    self.window = window
+    self.app_name = app_name
+
+  @property
+  def title(self) -> str:
+    """ウィンドウタイトルを返す。"""
+    return self.window.title
+
+  @property
+  def is_alive(self) -> bool:
+    """ウィンドウがまだ存在するかどうかを返す。"""
+    try:
+      return bool(self.window.isAlive)
+    except Exception:  # noqa: BLE001
+      return False
+
+  def bounds(self) -> WindowBounds:
+    """ウィンドウの位置とサイズを返す。"""
+    topleft = self.window.topleft
+    return WindowBounds(topleft.x, topleft.y, self.window.width, self.window.height)
+
+  def activate(self) -> None:
+    """ウィンドウをアクティブ化する。"""
+    self.window.activate()
+
+  def move_to(self, x: int, y: int) -> None:
+    """ウィンドウを指定した位置へ移動する。"""
+    self.window.moveTo(x, y)
+
+  def resize_to(self, width: int, height: int) -> None:
+    """ウィンドウをリサイズする。"""
+    self.window.resizeTo(width, height)
+
+
+class WindowRegistry:
+  """アプリ名とタイトルで索引したウィンドウの一覧。
+
+  一覧は `ttl_sec` の間使い回し、期限切れや見つけたウィンドウが閉じていた場合に更新する。
+  更新時は既知のウィンドウのアプリ名を再取得しないため、getAppName() は新しいウィンドウにだけ呼ぶ。
+  """
+
+  def __init__(self, ttl_sec: float = DEFAULT_TTL_SEC) -> None:
+    self.ttl_sec = ttl_sec
+    self._handles: dict[Any, WindowHandle] = {}
+    self._by_app: dict[str, list[WindowHandle]] = {}
+    self._by_title: dict[str, list[WindowHandle]] | None = None
+    self._refreshed_at: float | None = None
+    self._lock = threading.Lock()
+
+  def find(
+    self,
+    app_name: str | None = None,
+    title: str | None = None,
+    *,
+    exact_title: bool = True,
+  ) -> WindowHandle | None:
+    """条件に合う最初のウィンドウを返す。"""
+    fresh = self._refresh_if_stale()
+    handle = self._lookup(app_name, title, exact_title=exact_title)
+    if handle is None and not fresh:
+      # キャッシュにない、または閉じていた場合は一覧を更新して探し直す
+      self.refresh()
+      handle = self._lookup(app_name, title, exact_title=exact_title)
+    return handle
+
+  def refresh(self) -> None:
+    """ウィンドウ一覧を取得し直す。"""
+    windows = pywinctl.getAllWindows()
+    with self._lock:
+      handles: dict[Any, WindowHandle] = {}
+      for window in windows:
+        key = _window_key(window)
+        known = self._handles.get(key)
+        handles[key] = known if known is not None else WindowHandle(window, window.getAppName())
+
+      by_app: dict[str, list[WindowHandle]] = {}
+      for handle in handles.values():
+        by_app.setdefault(handle.app_name, []).append(handle)
+
+      self._handles = handles
+      self._by_app = by_app
+      # タイトルの索引はタイトルで検索されたときに作る
+      self._by_title = None
+      self._refreshed_at = time.monotonic()
+
+  def invalidate(self) -> None:
+    """次の検索で必ず一覧を更新させる。"""
+    with self._lock:
+      self._refreshed_at = None
+
+  def _refresh_if_stale(self) -> bool:
+    refreshed_at = self._refreshed_at
+    if refreshed_at is not None and time.monotonic() - refreshed_at < self.ttl_sec:
+      return False
+    self.refresh()
+    return True
+
+  def _lookup(
+    self,
+    app_name: str | None,
+    title: str | None,
+    *,
+    exact_title: bool,
+  ) -> WindowHandle | None:
+    with self._lock:
+      if app_name is not None:
+        candidates = list(self._by_app.get(app_name, []))
+      elif title is not None and exact_title:
+        candidates = list(self._title_index().get(title, []))
+      else:
+        candidates = list(self._handles.values())
+
+    for handle in candidates:
+      if title is not None and not _title_matches(handle.title, title, exact=exact_title):
+        continue
+      if handle.is_alive:
+        return handle
+    return None
+
+  def _title_index(self) -> dict[str, list[WindowHandle]]:
+    if self._by_title is None:
+      by_title: dict[str, list[WindowHandle]] = {}
+      for handle in self._handles.values():
+        by_title.setdefault(handle.title, []).append(handle)
+      self._by_title = by_title
+    return self._by_title
+
+
+def _window_key(window: Any) -> Any:  # noqa: ANN401
+  try:
+    key = window.getHandle()
+    hash(key)
+  except Exception:  # noqa: BLE001
+    return id(window)
+  return key
+
+
+def _title_matches(actual: str, expected: str, *, exact: bool) -> bool:
+  return actual == expected if exact else expected in actual
+
+
+__all__ = [
+  "DEFAULT_TTL_SEC",
+  "WindowBounds",
+  "WindowHandle",
+  "WindowRegistry",
+]
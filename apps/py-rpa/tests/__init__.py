@@ -0,0 +1 @@
+"""rpa パッケージのテスト"""
@@ -0,0 +1,119 @@
+"""rpa.cost_report の自身の時間の振り分けと手順ごとの集計のテスト。"""
+
+from __future__ import annotations
+
+import pytest
+
+from rpa.cost_report import build_cost_report
+from rpa.tracing import Span, SpanCategory
+
+FIXED = SpanCategory.FixedDelay
+ROUND_TRIP = SpanCategory.RoundTrip
+IMAGE = SpanCategory.ImageSearch
+SCRIPT = SpanCategory.Script
+
+
+def make_span(  # noqa: PLR0913
+  span_id: int,
+  parent_id: int | None,
+  name: str,
+  category: SpanCategory | None,
+  duration_sec: float,
+  *,
+  step: bool = False,
+) -> Span:
+  return Span(
+    span_id=span_id,
+    parent_id=parent_id,
+    name=name,
+    category=category,
+    start_sec=0.0,
+    duration_sec=duration_sec,
+    attributes={"step": True} if step else {},
+    error=None,
+    thread_id=0,
+  )
+
+
+def test_self_time_excludes_children() -> None:
+  spans = [
+    # click (1.0s) の中で sleep (0.3s) と画像検索 (0.5s) を行う
+    make_span(1, None, "click", ROUND_TRIP, 1.0),
+    make_span(2, 1, "sleep", FIXED, 0.3),
+    make_span(3, 1, "locate", IMAGE, 0.5),
+    # 分類のない子スパンは親 (画像検索) の分類を引き継ぐ
+    make_span(4, 3, "capture", None, 0.2),
+  ]
+  report = build_cost_report(spans, wall_sec=1.5)
+  assert report.by_category[ROUND_TRIP] == pytest.approx(0.2)
+  assert report.by_category[FIXED] == pytest.approx(0.3)
+  assert report.by_category[IMAGE] == pytest.approx(0.5)
+  # どのスパンにも含まれない 0.5 秒はスクリプトの処理
+  assert report.by_category[SCRIPT] == pytest.approx(0.5)
+  assert sum(report.by_category.values()) == pytest.approx(1.5)
+
+
+def test_children_longer_than_parent_do_not_go_negative() -> None:
+  # 並行して実行した子スパンの合計が親より長い場合、親の自身の時間は 0 とする
+  spans = [
+    make_span(1, None, "gather", None, 1.0),
+    make_span(2, 1, "fetch", ROUND_TRIP, 0.8),
+    make_span(3, 1, "fetch", ROUND_TRIP, 0.9),
+  ]
+  report = build_cost_report(spans, wall_sec=1.0)
+  assert report.by_category[ROUND_TRIP] == pytest.approx(1.7)
+  assert report.by_category[SCRIPT] == 0.0
+
+
+def test_orphan_span_counts_as_root() -> None:
+  # 親が記録されていない (上限を超えたなど) スパンは最上位として扱う
+  spans = [make_span(5, 99, "type", None, 0.4)]
+  report = build_cost_report(spans, wall_sec=0.4)
+  assert report.by_category[SCRIPT] == pytest.approx(0.4)
+  assert [step.name for step in report.steps] == ["type"]
+
+
+def test_steps_group_nested_actions() -> None:
+  spans = [
+    make_span(1, None, "login", SCRIPT, 2.0, step=True),
+    make_span(2, 1, "click", ROUND_TRIP, 0.6),
+    make_span(3, 2, "sleep", FIXED, 0.5),
+    make_span(4, 1, "enter", SCRIPT, 0.9, step=True),
+    make_span(5, 4, "sleep", FIXED, 0.8),
+    make_span(6, None, "login", SCRIPT, 1.0, step=True),
+    # 手順の外の操作は最上位のスパンの名前で集計する
+    make_span(7, None, "screenshot", ROUND_TRIP, 0.25),
+  ]
+  report = build_cost_report(spans, wall_sec=4.0)
+  steps = {step.name: step for step in report.steps}
+  assert set(steps) == {"login", "enter", "screenshot"}
+
+  login = steps["login"]
+  assert login.count == 2
+  assert login.by_category[FIXED] == pytest.approx(0.5)
+  assert login.by_category[ROUND_TRIP] == pytest.approx(0.1)
+  assert login.by_category[SCRIPT] == pytest.approx(0.5 + 1.0)
+  assert login.total_sec == pytest.approx(2.1)
+
+  enter = steps["enter"]
+  assert enter.fixed_delay_sec == pytest.approx(0.8)
+  assert enter.fixed_delay_ratio == pytest.approx(0.8 / 0.9)
+  # 固定時間の待機が長い順に並ぶ
+  assert [step.name for step in report.steps] == ["enter", "login", "screenshot"]
+  assert steps["screenshot"].fixed_delay_ratio == 0.0
+
+
+def test_format_lists_top_steps() -> None:
+  spans = [make_span(i, None, f"step{i}", FIXED, float(i), step=True) for i in range(1, 4)]
+  text = build_cost_report(spans, wall_sec=6.0).format(top=2)
+  assert text.startswith("wall: 6.000s")
+  assert "step3" in text
+  assert "step2" in text
+  assert "step1" not in text
+
+
+def test_empty_report() -> None:
+  report = build_cost_report([], wall_sec=0.0)
+  assert report.steps == []
+  assert set(report.by_category.values()) == {0.0}
+  assert "wall: 0.000s" in report.format()
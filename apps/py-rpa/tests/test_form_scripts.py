@@ -0,0 +1,133 @@
+"""rpa.form_scripts のスクリプトをヘッドレス Chromium で実行するテスト。
+
+Playwright のブラウザがインストールされていない環境ではスキップする。
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError  # type: ignore[import-untyped]
+from playwright.sync_api import sync_playwright
+
+from rpa.form_scripts import FILL_FORM_SCRIPT, GET_VALUES_SCRIPT, as_selenium_script
+
+if TYPE_CHECKING:
+  from collections.abc import Iterator
+
+  from playwright.sync_api import Page
+
+FORM_HTML = """
+<form>
+  <input id="name" type="text">
+  <input id="age" type="number">
+  <input id="birthday" type="date">
+  <select id="color">
+    <option value="r">Red</option>
+    <option value="g">Green</option>
+  </select>
+  <select id="size">
+    <option value="s">Small</option>
+    <option value="l">Large</option>
+  </select>
+  <input id="agree" type="checkbox">
+  <input id="plan-pro" type="radio" name="plan" value="pro">
+</form>
+<script>
+  window.changes = [];
+  document.addEventListener("change", (event) => window.changes.push(event.target.id));
+</script>
+"""
+
+
+@pytest.fixture(scope="module")
+def page() -> Iterator[Page]:
+  with sync_playwright() as playwright:
+    try:
+      browser = playwright.chromium.launch(headless=True)
+    except PlaywrightError as error:
+      pytest.skip(f"Chromium を起動できません: {error}")
+    yield browser.new_page()
+    browser.close()
+
+
+@pytest.fixture
+def form(page: Page) -> Page:
+  page.set_content(FORM_HTML)
+  return page
+
+
+def test_fill_form_sets_each_input_type(form: Page) -> None:
+  missing = form.evaluate(
+    FILL_FORM_SCRIPT,
+    {
+      "name": "山田",
+      "age": "42",
+      "birthday": "2024-02-29",
+      "color": "Green",
+      "size": "l",
+      "agree": "true",
+      "plan-pro": "pro",
+      "nothing": "x",
+    },
+  )
+
+  assert missing == ["nothing"]
+  values = form.evaluate(
+    """() => ({
+      name: document.getElementById("name").value,
+      age: document.getElementById("age").value,
+      birthday: document.getElementById("birthday").value,
+      color: document.getElementById("color").value,
+      size: document.getElementById("size").value,
+      agree: document.getElementById("agree").checked,
+      plan: document.getElementById("plan-pro").checked,
+    })""",
+  )
+  assert values == {
+    "name": "山田",
+    "age": "42",
+    "birthday": "2024-02-29",
+    "color": "g",
+    "size": "l",
+    "agree": True,
+    "plan": True,
+  }
+  assert form.evaluate("() => window.changes") == [
+    "name",
+    "age",
+    "birthday",
+    "color",
+    "size",
+    "agree",
+    "plan-pro",
+  ]
+
+
+def test_fill_form_unchecks_and_reports_unknown_check_values(form: Page) -> None:
+  form.evaluate(FILL_FORM_SCRIPT, {"agree": "on"})
+
+  missing = form.evaluate(FILL_FORM_SCRIPT, {"agree": "false", "plan-pro": "maybe"})
+
+  assert missing == ["plan-pro"]
+  assert form.evaluate("() => document.getElementById('agree').checked") is False
+
+
+def test_fill_form_reports_unknown_option(form: Page) -> None:
+  assert form.evaluate(FILL_FORM_SCRIPT, {"color": "Blue"}) == ["color"]
+
+
+def test_get_values_reads_selected_label(form: Page) -> None:
+  form.evaluate(FILL_FORM_SCRIPT, {"name": "a", "color": "r"})
+
+  values = form.evaluate(
+    GET_VALUES_SCRIPT,
+    {"ids": ["name", "color", "nothing"], "textProperty": "textContent", "trimText": False},
+  )
+
+  assert values == {"name": "a", "color": "Red", "nothing": None}
+
+
+def test_as_selenium_script_passes_first_argument() -> None:
+  assert as_selenium_script("\n(x) => x\n") == "return ((x) => x)(arguments[0]);"
@@ -0,0 +1,129 @@
+"""rpa.image_matcher のマルチスケール探索のテスト。
+
+画像ピラミッドのレベルが切り替わる境界と、探索スケールの境界での挙動を確かめる。
+"""
+
+from __future__ import annotations
+
+import cv2
+import numpy as np
+import pytest
+
+from rpa.image_matcher import (
+  COARSE_MIN_SIDE,
+  MIN_TEMPLATE_SIDE,
+  PYRAMID_MIN_SIDE,
+  ScaledTemplate,
+  _select_level,
+  build_pyramid,
+  find_best_match,
+  resize_template,
+)
+
+
+def make_texture(height: int, width: int, seed: int = 0) -> np.ndarray:
+  """ピラミッドで縮小しても特徴が残る、なめらかな濃淡のテクスチャを作る。"""
+  rng = np.random.default_rng(seed)
+  coarse = rng.integers(0, 256, size=(max(2, height // 8), max(2, width // 8)), dtype=np.uint8)
+  return cv2.resize(coarse, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+def make_screen(height: int, width: int) -> np.ndarray:
+  return np.full((height, width), 128, dtype=np.uint8)
+
+
+def paste(screen: np.ndarray, image: np.ndarray, x: int, y: int) -> np.ndarray:
+  screen = screen.copy()
+  screen[y : y + image.shape[0], x : x + image.shape[1]] = image
+  return screen
+
+
+def test_build_pyramid_stops_at_min_side() -> None:
+  assert len(build_pyramid(make_screen(100, PYRAMID_MIN_SIDE * 2))) == 1
+  pyramid = build_pyramid(make_screen(100, PYRAMID_MIN_SIDE * 2 + 2))
+  assert len(pyramid) == 2
+  assert pyramid[1].shape == (50, PYRAMID_MIN_SIDE + 1)
+
+
+def test_select_level_keeps_coarse_min_side() -> None:
+  pyramid = build_pyramid(make_screen(1200, 2000))
+  assert len(pyramid) == 3
+  assert _select_level(pyramid, COARSE_MIN_SIDE * 2 - 0.5) == 0
+  assert _select_level(pyramid, COARSE_MIN_SIDE * 2) == 1
+  assert _select_level(pyramid, COARSE_MIN_SIDE * 4) == 2
+  # ピラミッドの段数より粗いレベルは選ばない
+  assert _select_level(pyramid, COARSE_MIN_SIDE * 64) == 2
+
+
+def test_resize_template_rejects_too_small() -> None:
+  template = make_texture(40, 40)
+  assert resize_template(template, 1.0) is template
+  assert resize_template(template, MIN_TEMPLATE_SIDE / 40) is not None
+  assert resize_template(template, (MIN_TEMPLATE_SIDE - 1) / 40) is None
+
+
+def test_scaled_template_caches_each_scale() -> None:
+  template = ScaledTemplate(make_texture(40, 40))
+  first = template.at(0.5)
+  assert first is not None
+  assert template.at(0.5000001) is first
+  assert template.at(0.1) is None
+
+
+@pytest.mark.parametrize(
+  ("size", "x", "y"),
+  [
+    # 原寸レベルだけで評価する大きさ
+    (COARSE_MIN_SIDE * 2 - 1, 300, 200),
+    # 1 段粗いレベルで評価してから原寸で再評価する大きさ
+    (COARSE_MIN_SIDE * 2, 301, 203),
+    (COARSE_MIN_SIDE * 8, 777, 411),
+  ],
+)
+def test_find_best_match_across_pyramid_levels(size: int, x: int, y: int) -> None:
+  template = make_texture(size, size)
+  screen = paste(make_screen(1200, 2000), template, x, y)
+  result = find_best_match(screen, template, scales=(1.0,))
+  assert result is not None
+  assert (result.x, result.y, result.width, result.height) == (x, y, size, size)
+  assert result.scale == 1.0
+  assert result.score > 0.99
+
+
+def test_find_best_match_at_screen_edge() -> None:
+  # 再評価する周辺領域が画面の端で切り詰められても位置がずれない
+  template = make_texture(64, 96)
+  screen = make_screen(1200, 2000)
+  screen = paste(screen, template, 2000 - 96, 1200 - 64)
+  result = find_best_match(screen, template, scales=(1.0,))
+  assert result is not None
+  assert (result.x, result.y) == (2000 - 96, 1200 - 64)
+
+
+@pytest.mark.parametrize("scale", [0.5, 1.5])
+def test_find_best_match_picks_scale(scale: float) -> None:
+  template = make_texture(80, 80)
+  scaled = resize_template(template, scale)
+  assert scaled is not None
+  screen = paste(make_screen(1200, 2000), scaled, 640, 480)
+  result = find_best_match(screen, template, scales=(1.0, 0.5, 1.5))
+  assert result is not None
+  assert result.scale == scale
+  assert (result.x, result.y) == (640, 480)
+  assert result.width == scaled.shape[1]
+
+
+def test_find_best_match_skips_scales_outside_screen() -> None:
+  template = make_texture(80, 80)
+  screen = paste(make_screen(100, 100), template, 10, 10)
+  # 画面より大きくなるスケールと、MIN_TEMPLATE_SIDE 未満になるスケールは評価しない
+  result = find_best_match(screen, template, scales=(2.0, 0.05, 1.0))
+  assert result is not None
+  assert result.scale == 1.0
+  assert find_best_match(screen, template, scales=(2.0, 0.05)) is None
+
+
+def test_find_best_match_below_confidence() -> None:
+  template = make_texture(40, 40)
+  screen = paste(make_screen(400, 400), make_texture(40, 40, seed=1), 100, 100)
+  assert find_best_match(screen, template, scales=(1.0,), confidence=0.99) is None
@@ -0,0 +1,131 @@
+"""rpa.pipeline のチェックポイントと JSONL の切り詰め・再開のテスト。"""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any
+
+import pytest
+
+from rpa.pipeline import (
+  CHECKPOINT_SUFFIX,
+  Checkpoint,
+  CheckpointState,
+  JsonlSink,
+  run_pipeline,
+)
+
+if TYPE_CHECKING:
+  from collections.abc import Iterator
+  from pathlib import Path
+
+
+class Interrupted(BaseException):
+  """Ctrl+C のように、flow の失敗として記録されずに処理を中断させる例外。"""
+
+
+def read_records(path: Path) -> list[dict[str, Any]]:
+  return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_checkpoint_round_trip(tmp_path: Path) -> None:
+  checkpoint = Checkpoint(tmp_path / "state" / "run.checkpoint")
+  assert checkpoint.load() == CheckpointState(next_index=0, sink_offset=0)
+  checkpoint.save(CheckpointState(next_index=3, sink_offset=120))
+  assert checkpoint.load() == CheckpointState(next_index=3, sink_offset=120)
+  # 一時ファイルは置き換えで消えている
+  assert [path.name for path in checkpoint.path.parent.iterdir()] == ["run.checkpoint"]
+  checkpoint.clear()
+  checkpoint.clear()
+  assert checkpoint.load()["next_index"] == 0
+
+
+def test_sink_truncates_uncommitted_tail(tmp_path: Path) -> None:
+  path = tmp_path / "out.jsonl"
+  sink = JsonlSink(path, durable=False)
+  sink.open(0)
+  first = sink.write({"index": 0})
+  second = sink.write({"index": 1})
+  sink.close()
+  assert second == path.stat().st_size > first
+
+  with path.open("ab") as file:
+    file.write(b'{"index": 2, "va')
+  sink.open(second)
+  sink.write({"index": 2})
+  sink.close()
+  assert [record["index"] for record in read_records(path)] == [0, 1, 2]
+
+  sink.open(first)
+  sink.close()
+  assert [record["index"] for record in read_records(path)] == [0]
+
+
+def test_run_pipeline_records_failures(tmp_path: Path) -> None:
+  output = tmp_path / "out.jsonl"
+
+  def flow(_robot: None, row: int) -> int:
+    if row == 2:
+      message = "bad row"
+      raise ValueError(message)
+    return row * 10
+
+  report = run_pipeline(None, range(4), flow, output_path=output, durable=False)
+  assert (report.skipped, report.succeeded, report.failed) == (0, 3, 1)
+  records = read_records(output)
+  assert [record["value"] for record in records] == [0, 10, None, 30]
+  assert records[2]["error"] == "ValueError: bad row"
+  state = Checkpoint(output.with_name(output.name + CHECKPOINT_SUFFIX)).load()
+  assert state == CheckpointState(next_index=4, sink_offset=output.stat().st_size)
+
+
+@pytest.mark.parametrize("durable", [True, False])
+def test_run_pipeline_resumes_after_interruption(tmp_path: Path, *, durable: bool) -> None:
+  output = tmp_path / "out.jsonl"
+  checkpoint_path = tmp_path / "run.checkpoint"
+  calls: list[int] = []
+
+  def interrupted_flow(_robot: None, row: int) -> int:
+    if row == 3:
+      raise Interrupted
+    calls.append(row)
+    return row
+
+  with pytest.raises(Interrupted):
+    run_pipeline(
+      None,
+      range(6),
+      interrupted_flow,
+      output_path=output,
+      checkpoint_path=checkpoint_path,
+      durable=durable,
+    )
+  assert Checkpoint(checkpoint_path).load()["next_index"] == 3
+  # チェックポイントを更新する前に書きかけた結果を模す
+  with output.open("ab") as file:
+    file.write(b'{"index": 3, "ok": true}\n{"ind')
+
+  def rows() -> Iterator[int]:
+    yield from range(6)
+
+  def flow(_robot: None, row: int) -> int:
+    calls.append(row)
+    return row
+
+  report = run_pipeline(
+    None,
+    rows(),
+    flow,
+    output_path=output,
+    checkpoint_path=checkpoint_path,
+    durable=durable,
+  )
+  assert report.skipped == 3
+  assert report.succeeded == 3
+  assert calls == [0, 1, 2, 3, 4, 5]
+  assert [record["index"] for record in read_records(output)] == [0, 1, 2, 3, 4, 5]
+
+  # 完了後にもう一度実行しても何も処理しない
+  report = run_pipeline(None, rows(), flow, output_path=output, checkpoint_path=checkpoint_path)
+  assert (report.skipped, report.processed) == (6, 0)
+  assert len(read_records(output)) == 6
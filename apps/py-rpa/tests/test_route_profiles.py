@@ -0,0 +1,152 @@
+"""rpa.route_profiles の判定と集計のテスト。"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+
+import pytest
+
+from rpa import route_profiles
+from rpa.route_profiles import (
+  FORMS_ONLY,
+  NO_MEDIA,
+  PASS_THROUGH,
+  RouteInterceptor,
+  RouteProfile,
+)
+
+PAGE_URL = "https://example.com/form"
+
+
+@dataclass
+class FakeFrame:
+  """Playwright の Frame の代わり"""
+
+  url: str = PAGE_URL
+
+
+class DetachedFrame:
+  """Service Worker のリクエストのように、フレームを参照すると失敗する。"""
+
+  @property
+  def url(self) -> str:
+    """Playwright と同じく例外を送出する。"""
+    message = "Service Worker requests do not have an associated frame."
+    raise RuntimeError(message)
+
+
+@dataclass
+class FakeRequest:
+  """Playwright の Request の代わり"""
+
+  resource_type: str
+  url: str
+  frame: FakeFrame | DetachedFrame = field(default_factory=FakeFrame)
+
+
+@pytest.mark.parametrize(
+  ("resource_type", "url", "expected"),
+  [
+    ("document", PAGE_URL, "continue"),
+    ("image", "https://example.com/logo.png", "abort"),
+    ("font", "https://example.com/a.woff2", "abort"),
+    ("stylesheet", "https://example.com/site.css", "continue"),
+  ],
+)
+def test_no_media(resource_type: str, url: str, expected: str) -> None:
+  assert RouteInterceptor(NO_MEDIA).decide(FakeRequest(resource_type, url)) == expected
+
+
+@pytest.mark.parametrize(
+  ("request_", "expected"),
+  [
+    (FakeRequest("stylesheet", "https://example.com/site.css"), "stub"),
+    (FakeRequest("manifest", "https://example.com/app.webmanifest"), "abort"),
+    (FakeRequest("xhr", "https://www.google-analytics.com/collect"), "abort"),
+    (FakeRequest("script", "https://example.com/app.js"), "continue"),
+    (FakeRequest("script", "https://cdn.example.net/lib.js"), "abort"),
+    # サードパーティの判定はスクリプトだけに行う
+    (FakeRequest("xhr", "https://api.example.net/data"), "continue"),
+    # フレームのないリクエストはサードパーティとして扱わない
+    (FakeRequest("script", "https://cdn.example.net/sw.js", DetachedFrame()), "continue"),
+  ],
+)
+def test_forms_only(request_: FakeRequest, expected: str) -> None:
+  assert RouteInterceptor(FORMS_ONLY).decide(request_) == expected
+
+
+def test_abort_takes_precedence_over_stub() -> None:
+  profile = RouteProfile(
+    "custom",
+    stub_types=frozenset({"stylesheet"}),
+    abort_patterns=(r"/ads/",),
+  )
+  interceptor = RouteInterceptor(profile)
+  assert interceptor.decide(FakeRequest("stylesheet", "https://example.com/ads/a.css")) == "abort"
+  assert interceptor.decide(FakeRequest("stylesheet", "https://example.com/b.css")) == "stub"
+
+
+def test_profile_by_name() -> None:
+  assert RouteInterceptor("forms-only").profile is FORMS_ONLY
+  with pytest.raises(ValueError, match="未対応"):
+    RouteInterceptor("unknown")
+
+
+def test_stats_counts_each_decision() -> None:
+  interceptor = RouteInterceptor(FORMS_ONLY)
+  for request_ in [
+    FakeRequest("document", PAGE_URL),
+    FakeRequest("image", "https://example.com/a.png"),
+    FakeRequest("image", "https://example.com/b.png"),
+    FakeRequest("stylesheet", "https://example.com/site.css"),
+  ]:
+    interceptor.decide(request_)
+  stats = interceptor.stats()
+  assert stats.profile == "forms-only"
+  assert stats.passed == 1
+  assert stats.aborted == {"image": 2}
+  assert stats.stubbed == {"stylesheet": 1}
+  assert stats.blocked == 3
+  assert stats.saved_bytes == 0
+  interceptor.reset_stats()
+  assert interceptor.stats().blocked == 0
+
+
+def test_pass_through_blocks_nothing() -> None:
+  interceptor = RouteInterceptor(PASS_THROUGH)
+  for resource_type in ["image", "font", "stylesheet", "script"]:
+    assert (
+      interceptor.decide(FakeRequest(resource_type, "https://cdn.example.net/x")) == "continue"
+    )
+  assert interceptor.stats().passed == 4
+
+
+def test_saved_bytes_sends_one_head_per_url(monkeypatch: pytest.MonkeyPatch) -> None:
+  released = threading.Event()
+  heads: list[str] = []
+  sizes = {"https://example.com/a.png": 1000, "https://example.com/b.png": None}
+
+  def head_content_length(url: str) -> int | None:
+    heads.append(url)
+    released.wait(5)
+    return sizes[url]
+
+  monkeypatch.setattr(route_profiles, "_head_content_length", head_content_length)
+  interceptor = RouteInterceptor(NO_MEDIA, measure_saved_bytes=True)
+  image_a = FakeRequest("image", "https://example.com/a.png")
+  image_b = FakeRequest("image", "https://example.com/b.png")
+  interceptor.decide(image_a)
+  interceptor.decide(image_a)
+  interceptor.decide(image_b)
+  # HEAD の応答待ちの間は削減量に含めない
+  assert interceptor.stats().saved_bytes == 0
+
+  released.set()
+  assert interceptor._executor is not None
+  interceptor._executor.shutdown(wait=True)
+  interceptor.decide(image_a)
+  stats = interceptor.stats()
+  assert sorted(heads) == sorted(sizes)
+  assert stats.saved_bytes == 3000
+  assert stats.unsized_blocked == 1
@@ -0,0 +1,86 @@
+"""rpa.session_store の保存・読み込みと有効期限のテスト。"""
+
+from __future__ import annotations
+
+import types
+from typing import TYPE_CHECKING
+
+import pytest
+
+from rpa import session_store
+from rpa.session_store import SessionStore
+
+if TYPE_CHECKING:
+  from pathlib import Path
+
+STORAGE_STATE = {"cookies": [{"name": "sid", "value": "abc"}], "origins": []}
+SESSION_STORAGE = {"https://example.com": {"token": "t"}}
+
+
+@pytest.fixture
+def now(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+  """session_store が参照する現在時刻。要素を書き換えると時刻が進む。"""
+  current = [1_700_000_000.0]
+  monkeypatch.setattr(session_store, "time", types.SimpleNamespace(time=lambda: current[0]))
+  return current
+
+
+def test_save_and_load(tmp_path: Path, now: list[float]) -> None:
+  store = SessionStore(tmp_path, ttl_sec=60)
+  saved = store.save("login", STORAGE_STATE, SESSION_STORAGE, "https://example.com/home")
+  assert saved["saved_at"] == now[0]
+  assert store.load("login") == saved
+  assert list(tmp_path.iterdir()) == [tmp_path / "login.json"]
+
+
+def test_load_expires_after_ttl(tmp_path: Path, now: list[float]) -> None:
+  store = SessionStore(tmp_path, ttl_sec=60)
+  store.save("login", STORAGE_STATE, SESSION_STORAGE, "https://example.com/")
+  now[0] += 60
+  assert store.load("login") is not None
+  now[0] += 0.001
+  assert store.load("login") is None
+  # 期限はファイルではなく読み込む側の ttl_sec で判定する
+  assert SessionStore(tmp_path, ttl_sec=120).load("login") is not None
+
+
+def test_save_refreshes_expiry(tmp_path: Path, now: list[float]) -> None:
+  store = SessionStore(tmp_path, ttl_sec=60)
+  store.save("login", STORAGE_STATE, SESSION_STORAGE, "https://example.com/")
+  now[0] += 100
+  store.save("login", STORAGE_STATE, {}, "https://example.com/next")
+  snapshot = store.load("login")
+  assert snapshot is not None
+  assert snapshot["url"] == "https://example.com/next"
+
+
+@pytest.mark.parametrize("content", ["", "{", '{"url": "x"}', '{"saved_at": "soon"}', "[]"])
+def test_load_ignores_broken_files(tmp_path: Path, content: str) -> None:
+  store = SessionStore(tmp_path)
+  store.path("login").write_text(content, encoding="utf-8")
+  assert store.load("login") is None
+
+
+def test_missing_snapshot(tmp_path: Path) -> None:
+  store = SessionStore(tmp_path / "missing")
+  assert store.load("login") is None
+  store.delete("login")
+  store.clear()
+
+
+def test_rejects_unsafe_names(tmp_path: Path) -> None:
+  store = SessionStore(tmp_path)
+  for name in ["../login", "a/b", ""]:
+    with pytest.raises(ValueError, match="使えない文字"):
+      store.path(name)
+
+
+def test_delete_and_clear(tmp_path: Path) -> None:
+  store = SessionStore(tmp_path)
+  for name in ["a", "b", "c"]:
+    store.save(name, STORAGE_STATE, {}, "https://example.com/")
+  store.delete("a")
+  assert store.load("a") is None
+  assert store.load("b") is not None
+  store.clear()
+  assert list(tmp_path.iterdir()) == []
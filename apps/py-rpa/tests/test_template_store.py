@@ -0,0 +1,124 @@
+"""rpa.template_store のバンドル作成・メモリマップ読み込みのテスト。"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import struct
+import zipfile
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from rpa.template_store import (
+  _META_KEY,
+  TemplateStore,
+  _open_bundle,
+  compile_bundle,
+  load_gray,
+)
+
+if TYPE_CHECKING:
+  from pathlib import Path
+
+
+def write_png(path: Path, height: int, width: int, seed: int) -> np.ndarray:
+  rng = np.random.default_rng(seed)
+  rgb = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+  path.parent.mkdir(parents=True, exist_ok=True)
+  Image.fromarray(rgb).save(path)
+  return load_gray(path)
+
+
+def npy_bytes(array: np.ndarray) -> bytes:
+  buffer = io.BytesIO()
+  np.save(buffer, array)
+  return buffer.getvalue()
+
+
+@pytest.fixture
+def image_dir(tmp_path: Path) -> Path:
+  root = tmp_path / "images"
+  write_png(root / "button.png", 12, 30, seed=0)
+  write_png(root / "dialog" / "ok.png", 25, 17, seed=1)
+  return root
+
+
+def test_bundle_round_trip(image_dir: Path, tmp_path: Path) -> None:
+  bundle = compile_bundle(image_dir, tmp_path / "images.npz")
+  arrays, meta = _open_bundle(bundle)
+
+  assert meta["root"] == str(image_dir.resolve())
+  assert set(arrays) == {"button.png", "dialog/ok.png"} == set(meta["entries"])
+  for name, array in arrays.items():
+    assert isinstance(array, np.memmap)
+    np.testing.assert_array_equal(array, load_gray(image_dir / name))
+    assert meta["entries"][name] == (image_dir / name).stat().st_mtime_ns
+
+
+def test_open_bundle_skips_local_extra_field(tmp_path: Path) -> None:
+  # ローカルヘッダーの拡張フィールドの長さを読んでデータの開始位置を求める
+  bundle = tmp_path / "extra.npz"
+  expected = np.arange(24, dtype=np.uint8).reshape(4, 6)
+  with zipfile.ZipFile(bundle, "w", zipfile.ZIP_STORED) as archive:
+    info = zipfile.ZipInfo("a.npy")
+    info.extra = struct.pack("<HH", 0xCAFE, 5) + b"12345"
+    archive.writestr(info, npy_bytes(expected))
+    meta = json.dumps({"root": str(tmp_path), "entries": {"a": 0}})
+    archive.writestr(f"{_META_KEY}.npy", npy_bytes(np.array(meta)))
+
+  arrays, _ = _open_bundle(bundle)
+  np.testing.assert_array_equal(arrays["a"], expected)
+
+
+def test_open_bundle_rejects_compressed(image_dir: Path, tmp_path: Path) -> None:
+  bundle = tmp_path / "compressed.npz"
+  np.savez_compressed(
+    bundle,
+    a=load_gray(image_dir / "button.png"),
+    **{_META_KEY: np.array(json.dumps({"root": "", "entries": {}}))},
+  )
+  with pytest.raises(ValueError, match="圧縮"):
+    _open_bundle(bundle)
+
+
+def test_open_bundle_requires_meta(tmp_path: Path) -> None:
+  bundle = tmp_path / "plain.npz"
+  np.savez(bundle, a=np.zeros((2, 2), dtype=np.uint8))
+  with pytest.raises(ValueError, match="バンドルではありません"):
+    _open_bundle(bundle)
+
+
+def test_store_uses_bundle_without_png(image_dir: Path, tmp_path: Path) -> None:
+  bundle = compile_bundle(image_dir, tmp_path / "images.npz")
+  expected = load_gray(image_dir / "button.png")
+  (image_dir / "button.png").unlink()
+
+  store = TemplateStore()
+  assert store.load_bundle(bundle) == 2
+  template = store.get(image_dir / "button.png")
+  np.testing.assert_array_equal(template.gray, expected)
+  assert store.get(image_dir / "button.png") is template
+
+
+def test_store_decodes_updated_png(image_dir: Path, tmp_path: Path) -> None:
+  bundle = compile_bundle(image_dir, tmp_path / "images.npz")
+  path = image_dir / "button.png"
+  updated = write_png(path, 12, 30, seed=2)
+  stat = path.stat()
+  os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+  store = TemplateStore()
+  store.load_bundle(bundle)
+  np.testing.assert_array_equal(store.get(path).gray, updated)
+
+
+def test_store_evicts_least_recently_used(image_dir: Path) -> None:
+  store = TemplateStore(max_size=1)
+  first = store.get(image_dir / "button.png")
+  store.get(image_dir / "dialog" / "ok.png")
+  assert len(store) == 1
+  assert store.get(image_dir / "button.png") is not first
@@ -0,0 +1,129 @@
+"""rpa.tracing の百分位数とスパンの親子関係のテスト。"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+import pytest
+
+from rpa.tracing import SpanCategory, annotate, percentile, step, traced, tracer
+
+if TYPE_CHECKING:
+  from collections.abc import Iterator
+
+  from rpa.tracing import Span
+
+
+@pytest.fixture
+def recording() -> Iterator[None]:
+  tracer.clear()
+  tracer.enable()
+  yield
+  tracer.disable()
+  tracer.clear()
+
+
+def by_name(spans: list[Span]) -> dict[str, Span]:
+  return {span.name: span for span in spans}
+
+
+@traced("child", target="value")
+def child(value: int) -> int:
+  annotate(doubled=value * 2)
+  return value * 2
+
+
+@traced("parent")
+def parent_in_threads(values: list[int]) -> list[int]:
+  with ThreadPoolExecutor(2) as executor:
+    futures = [executor.submit(contextvars.copy_context().run, child, value) for value in values]
+    # コンテキストを渡さないスレッドのスパンは親に紐づかない
+    futures.append(executor.submit(child, 0))
+    return [future.result() for future in futures]
+
+
+@pytest.mark.parametrize(
+  ("percent", "expected"),
+  [(0, 1.0), (1, 1.0), (10, 1.0), (11, 2.0), (50, 5.0), (95, 10.0), (100, 10.0)],
+)
+def test_percentile_nearest_rank(percent: float, expected: float) -> None:
+  values = [float(value) for value in range(1, 11)]
+  assert percentile(values, percent) == expected
+
+
+def test_percentile_edge_cases() -> None:
+  assert percentile([], 50) == 0.0
+  assert percentile([3.0], 0) == 3.0
+  assert percentile([3.0], 100) == 3.0
+  assert percentile([1.0, 2.0], 50) == 1.0
+  assert percentile([1.0, 2.0], 50.1) == 2.0
+
+
+@pytest.mark.usefixtures("recording")
+def test_traced_links_parent_across_copy_context() -> None:
+  assert parent_in_threads([1, 2]) == [2, 4, 0]
+  spans = tracer.spans
+  parent = by_name(spans)["parent"]
+  children = [span for span in spans if span.name == "child"]
+  assert parent.parent_id is None
+  assert parent.category is SpanCategory.RoundTrip
+  linked = sorted(
+    (span.attributes["target"], span.attributes["doubled"])
+    for span in children
+    if span.parent_id == parent.span_id
+  )
+  assert linked == [(1, 2), (2, 4)]
+  orphans = [span for span in children if span.parent_id is None]
+  assert [span.attributes["target"] for span in orphans] == [0]
+  assert all(span.thread_id != threading.get_ident() for span in children)
+
+
+@pytest.mark.usefixtures("recording")
+def test_traced_links_asyncio_tasks() -> None:
+  @traced("fetch")
+  async def fetch(value: int) -> int:
+    await asyncio.sleep(0)
+    return value
+
+  async def main() -> list[int]:
+    with step("load"):
+      return list(await asyncio.gather(fetch(1), fetch(2)))
+
+  assert asyncio.run(main()) == [1, 2]
+  spans = tracer.spans
+  load = by_name(spans)["load"]
+  assert load.category is SpanCategory.Script
+  assert load.attributes == {"step": True}
+  assert [span.parent_id for span in spans if span.name == "fetch"] == [load.span_id] * 2
+
+
+@pytest.mark.usefixtures("recording")
+def test_span_records_error_and_restores_parent() -> None:
+  @traced("failing")
+  def fail() -> None:
+    message = "boom"
+    raise ValueError(message)
+
+  with tracer.span("outer"):
+    with pytest.raises(ValueError, match="boom"):
+      fail()
+    with tracer.span("sibling"):
+      pass
+  spans = by_name(tracer.spans)
+  assert spans["failing"].error == "ValueError: boom"
+  assert spans["failing"].parent_id == spans["outer"].span_id
+  assert spans["sibling"].parent_id == spans["outer"].span_id
+  assert spans["outer"].error is None
+
+
+def test_disabled_tracer_records_nothing() -> None:
+  tracer.clear()
+  assert not tracer.enabled
+  assert child(3) == 6
+  with tracer.span("ignored") as attributes:
+    attributes["x"] = 1
+  assert tracer.spans == []
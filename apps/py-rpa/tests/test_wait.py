@@ -0,0 +1,108 @@
+"""rpa.wait の期限とポーリング間隔のテスト。
+
+time モジュールを仮想時計に差し替え、実際には待たずに間隔と期限を確かめる。
+"""
+
+from __future__ import annotations
+
+import types
+
+import pytest
+
+from rpa import wait
+from rpa.wait import Deadline, PollScheduler, poll_until
+
+
+class FakeClock:
+  """sleep で進む仮想時計。"""
+
+  def __init__(self) -> None:
+    self.now = 1000.0
+    self.sleeps: list[float] = []
+
+  def monotonic(self) -> float:
+    """現在の仮想時刻を返す。"""
+    return self.now
+
+  def sleep(self, seconds: float) -> None:
+    """待たずに仮想時刻を進める。"""
+    self.sleeps.append(seconds)
+    self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+  fake = FakeClock()
+  monkeypatch.setattr(
+    wait,
+    "time",
+    types.SimpleNamespace(monotonic=fake.monotonic, sleep=fake.sleep),
+  )
+  return fake
+
+
+def test_deadline_remaining_and_expired(clock: FakeClock) -> None:
+  deadline = Deadline(1.0)
+  assert deadline.remaining() == 1.0
+  assert not deadline.expired
+  clock.now += 0.75
+  assert deadline.remaining() == pytest.approx(0.25)
+  clock.now += 0.25
+  assert deadline.remaining() == 0.0
+  assert deadline.expired
+  clock.now += 5
+  assert deadline.remaining() == 0.0
+
+
+def test_scheduler_backs_off_up_to_max(clock: FakeClock) -> None:
+  scheduler = PollScheduler(initial_interval_sec=0.1, max_interval_sec=0.3, backoff_factor=2)
+  deadline = Deadline(10)
+  for _ in range(4):
+    assert scheduler.sleep(deadline)
+  assert clock.sleeps == pytest.approx([0.1, 0.2, 0.3, 0.3])
+  scheduler.reset()
+  scheduler.sleep(deadline)
+  assert clock.sleeps[-1] == pytest.approx(0.1)
+
+
+def test_scheduler_never_sleeps_past_deadline(clock: FakeClock) -> None:
+  scheduler = PollScheduler(initial_interval_sec=0.4, max_interval_sec=1, backoff_factor=2)
+  deadline = Deadline(1.0)
+  assert scheduler.sleep(deadline)
+  assert scheduler.sleep(deadline)
+  assert not scheduler.sleep(deadline)
+  assert clock.sleeps == pytest.approx([0.4, 0.6])
+  assert deadline.expired
+
+
+def test_poll_until_returns_first_truthy_value(clock: FakeClock) -> None:
+  results = iter([None, False, 0, "done"])
+  assert poll_until(lambda: next(results), 5) == 0
+  assert len(clock.sleeps) == 2
+
+
+def test_poll_until_times_out(clock: FakeClock) -> None:
+  calls: list[float] = []
+
+  def predicate() -> None:
+    calls.append(clock.now)
+
+  assert poll_until(predicate, 1.0) is None
+  assert sum(clock.sleeps) == pytest.approx(1.0)
+  # 期限ちょうどにもう一度だけ判定してから諦める
+  assert calls[-1] == pytest.approx(1001.0)
+
+
+def test_poll_until_shares_deadline(clock: FakeClock) -> None:
+  deadline = Deadline(0.5)
+  clock.now += 0.5
+  calls = 0
+
+  def predicate() -> None:
+    nonlocal calls
+    calls += 1
+
+  # 共有した期限が切れていれば timeout_sec に関係なく 1 回だけ判定する
+  assert poll_until(predicate, 10, deadline=deadline) is None
+  assert calls == 1
+  assert clock.sleeps == []
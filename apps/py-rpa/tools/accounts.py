@@ -0,0 +1,24 @@
+"""アカウント登録用の CSV データ"""
+
+from pathlib import Path
+
+DEFAULT_DATA_PATH = Path(__file__).parent / "../../dummy-gui/frontend/public/data.csv"
+
+# CSV の列名 → フォームの要素 ID
+FIELDS = {
+  "氏名": "name",
+  "年齢": "age",
+  "性別": "gender",
+  "住所": "address",
+  "メールアドレス": "email",
+  "携帯電話番号": "phone",
+  "生年月日": "birthday",
+}
+GENDER_LABELS = {"男": "男性", "女": "女性"}
+
+
+def to_form_values(row: dict[str, str]) -> dict[str, str]:
+  """CSV の 1 行をフォームの入力値に変換する。"""
+  values = {attr_id: row[column] for column, attr_id in FIELDS.items()}
+  values["gender"] = GENDER_LABELS.get(values["gender"], "その他")
+  return values
@@ -0,0 +1,23 @@
+"""実行時間の内訳の表示"""
+
+import contextlib
+import os
+from collections.abc import Iterator
+
+from rpa.cost_report import build_cost_report
+from rpa.tracing import tracer
+
+
+@contextlib.contextmanager
+def report_costs() -> Iterator[None]:
+  """環境変数 COST_REPORT が設定されていれば、ブロック内の実行時間の内訳を表示する。"""
+  if os.environ.get("COST_REPORT") is None:
+    yield
+    return
+  tracer.clear()
+  tracer.enable()
+  try:
+    yield
+  finally:
+    tracer.disable()
+    print(build_cost_report().format())